@@ -4,7 +4,21 @@ Handles demo mode indicators and other request processing
 """
 
 from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # Optional dependency: gzip only without it
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+# Only data responses are compressed: HTML pages carry CSRF tokens, and compressing a
+# secret next to reflected input leaks it through the compressed length (BREACH)
+COMPRESSIBLE_CONTENT_TYPES = ('application/json', 'application/x-ndjson', 'text/csv')
 
 
 class DemoModeMiddleware(MiddlewareMixin):
@@ -23,4 +37,36 @@ class DemoModeMiddleware(MiddlewareMixin):
             # Do not mutate HTML content here; banner is injected in the view layer
             # to avoid breaking SPA markup or hydration.
         
-        return response 
\ No newline at end of file
+        return response 
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compresses JSON, NDJSON and CSV responses of at least RESPONSE_COMPRESSION_MIN_BYTES:
+    with Brotli when the brotli package is installed and the client accepts it, otherwise
+    with gzip. Streaming responses (such as the transaction export) are gzipped chunk by
+    chunk. Other content types, HTML in particular, are sent as they are.
+    """
+    brotli_quality = 5  # Fast enough for dynamic responses, still well ahead of gzip
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').split(';')[0].strip().lower() not in COMPRESSIBLE_CONTENT_TYPES:
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'RESPONSE_COMPRESSION_MIN_BYTES', 1024):
+            return response
+        if (brotli is None or response.streaming or response.has_header('Content-Encoding')
+                or not re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed_content = brotli.compress(response.content, quality=self.brotli_quality)
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+        # Like GZipMiddleware: the compressed body is no longer byte-identical to a strong ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -80,6 +80,7 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files
+    'FundFlow.middleware.CompressionMiddleware',  # gzip/Brotli for API responses
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -200,6 +201,16 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# Opt-in: encode API responses with orjson when it is installed (see FundFlow/renderers.py)
+if os.getenv('FAST_JSON_RENDERER', 'false').lower() == 'true':
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'FundFlow.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+
+# Responses smaller than this are sent uncompressed (see FundFlow/middleware.py)
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+
 # JWT settings
 from datetime import timedelta
 
@@ -257,6 +268,10 @@ STORAGES = {
 # Tell Django where to find the React build
 REACT_BUILD_DIR = os.path.join(BASE_DIR, 'frontend', 'build')
 
+# Uploaded files (CSV imports waiting for the import worker)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
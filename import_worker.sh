@@ -0,0 +1,19 @@
+#!/bin/bash
+
+# =============================================================================
+# FundFlow Import Worker
+# Processes queued CSV imports and Up Bank syncs (background=true requests).
+# Started next to Gunicorn by startup.sh and the Docker image; restarted if it exits.
+# Set RUN_IMPORT_WORKER=false when the worker runs as its own process instead.
+# =============================================================================
+
+if [ "${RUN_IMPORT_WORKER:-true}" != "true" ]; then
+    echo "ℹ️  Import worker disabled (RUN_IMPORT_WORKER=${RUN_IMPORT_WORKER})"
+    exit 0
+fi
+
+while true; do
+    python manage.py run_import_worker
+    echo "⚠️  Import worker exited with status $?, restarting in 5s..."
+    sleep 5
+done
@@ -0,0 +1,179 @@
+# integrations/fake_up_api.py
+"""
+Local stand-in for the Up Bank API, for load tests and benchmarks of the sync.
+
+FakeUpApi is a plain WSGI app serving the endpoints the sync uses (util/ping, accounts,
+transactions, transactions/{id}) with Up's JSON:API shapes and cursor pagination. The N
+synthetic transactions are derived from their index, so any page can be rendered without
+holding the data set in memory. Latency and error injection simulate a slow or flaky API.
+
+    app = FakeUpApi(transaction_count=10_000, latency=0.02, error_rate=0.01)
+    with serve_fake_up_api(app) as base_url:
+        ...  # point integrations.services.UP_API_BASE_URL at base_url
+"""
+
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from socketserver import ThreadingMixIn
+from typing import Iterator
+from urllib.parse import parse_qs, urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+MERCHANTS = [
+    'Woolworths', 'Coles', 'Aldi', 'Bunnings Warehouse', 'Uber *Eats', 'Netflix.com', 'Spotify',
+    'Kmart', 'JB Hi-Fi', 'Shell Coles Express', 'Amazon Mktplace', 'Transfer to Savings',
+]
+FOREIGN_CURRENCIES = ['EUR', 'USD', 'GBP', 'JPY', 'NZD']
+# Transactions are spaced this far apart, newest first, ending at the app's `now`
+TRANSACTION_SPACING = timedelta(minutes=7)
+
+
+class FakeUpApi:
+    """WSGI app imitating the parts of the Up API used by FundFlow."""
+
+    def __init__(self, transaction_count: int, accounts: int = 1, latency: float = 0.0, error_rate: float = 0.0,
+                 foreign_ratio: float = 0.2, seed: int = 0, now: datetime = None):
+        self.transaction_count = transaction_count
+        self.account_ids = [f"fake-account-{n}" for n in range(max(accounts, 1))]
+        self.latency = latency
+        self.error_rate = error_rate
+        self.foreign_ratio = foreign_ratio
+        self.seed = seed
+        self.now = (now or datetime.now(timezone.utc)).replace(microsecond=0)
+        self.request_count = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # --- Synthetic data ---
+
+    def created_at(self, index: int) -> datetime:
+        return self.now - index * TRANSACTION_SPACING
+
+    def transaction(self, index: int) -> dict:
+        """The transaction at position `index` (0 is the newest)."""
+        rng = random.Random(self.seed * 1_000_003 + index)
+        aud_cents = rng.randint(100, 50_000)
+        is_credit = rng.random() < 0.1
+        attributes = {
+            'status': 'SETTLED',
+            'description': f"{rng.choice(MERCHANTS)} {rng.randint(1, 400)}",
+            'amount': {
+                'currencyCode': 'AUD',
+                'value': f"{'' if is_credit else '-'}{aud_cents / 100:.2f}",
+                'valueInBaseUnits': aud_cents if is_credit else -aud_cents,
+            },
+            'foreignAmount': None,
+            'createdAt': self.created_at(index).isoformat(),
+            'settledAt': self.created_at(index).isoformat(),
+        }
+        if not is_credit and rng.random() < self.foreign_ratio:
+            foreign_cents = int(aud_cents * rng.uniform(0.5, 0.7))
+            attributes['foreignAmount'] = {
+                'currencyCode': rng.choice(FOREIGN_CURRENCIES),
+                'value': f"-{foreign_cents / 100:.2f}",
+                'valueInBaseUnits': -foreign_cents,
+            }
+        return {
+            'type': 'transactions',
+            'id': f"fake-tx-{self.seed}-{index}",
+            'attributes': attributes,
+            'relationships': {
+                'account': {'data': {'type': 'accounts', 'id': self.account_ids[index % len(self.account_ids)]}},
+            },
+        }
+
+    def _index_range(self, query: dict) -> range:
+        """Indexes matching filter[since]/filter[until], newest first."""
+        start, stop = 0, self.transaction_count
+        if query.get('filter[until]'):
+            until = datetime.fromisoformat(query['filter[until]'])
+            start = max(start, -((until - self.now) // TRANSACTION_SPACING))
+        if query.get('filter[since]'):
+            since = datetime.fromisoformat(query['filter[since]'])
+            stop = min(stop, (self.now - since) // TRANSACTION_SPACING + 1)
+        return range(start, max(start, stop))
+
+    # --- WSGI ---
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.request_count += 1
+            fail = self.error_rate and self._rng.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+
+        if not environ.get('HTTP_AUTHORIZATION', '').startswith('Bearer '):
+            return self._respond(start_response, '401 Unauthorized', {'errors': [{'status': '401', 'title': 'Not Authorized'}]})
+        if fail:
+            return self._respond(start_response, '503 Service Unavailable',
+                                 {'errors': [{'status': '503', 'title': 'Service Unavailable'}]}, [('Retry-After', '0')])
+
+        path = environ.get('PATH_INFO', '').rstrip('/')
+        query = {key: values[-1] for key, values in parse_qs(environ.get('QUERY_STRING', '')).items()}
+        segments = path.split('/')
+
+        if path.endswith('/util/ping'):
+            return self._respond(start_response, '200 OK', {'meta': {'id': 'fake-up-user'}})
+        if path.endswith('/accounts'):
+            return self._respond(start_response, '200 OK', {
+                'data': [{'type': 'accounts', 'id': account_id, 'attributes': {'displayName': account_id}}
+                         for account_id in self.account_ids],
+                'links': {'prev': None, 'next': None},
+            })
+        if path.endswith('/transactions'):
+            account_id = segments[-2] if len(segments) >= 3 and segments[-3] == 'accounts' else None
+            return self._respond(start_response, '200 OK', self._transactions_page(environ, path, query, account_id))
+        if len(segments) >= 2 and segments[-2] == 'transactions' and segments[-1].startswith(f"fake-tx-{self.seed}-"):
+            index = int(segments[-1].rsplit('-', 1)[1])
+            if 0 <= index < self.transaction_count:
+                return self._respond(start_response, '200 OK', {'data': self.transaction(index)})
+        return self._respond(start_response, '404 Not Found', {'errors': [{'status': '404', 'title': 'Not Found'}]})
+
+    def _transactions_page(self, environ, path: str, query: dict, account_id: str = None) -> dict:
+        page_size = min(int(query.get('page[size]', 10)), 100)
+        indexes = self._index_range(query)
+        if account_id is not None:
+            account_position = self.account_ids.index(account_id) if account_id in self.account_ids else -1
+            first = indexes.start + (account_position - indexes.start) % len(self.account_ids)
+            indexes = range(first, indexes.stop, len(self.account_ids)) if account_position >= 0 else range(0)
+
+        # The cursor is the position in `indexes` where the page starts
+        position = int(query.get('page[after]', 0))
+        page = indexes[position:position + page_size]
+        next_link = None
+        if position + page_size < len(indexes):
+            next_query = dict(query, **{'page[after]': position + page_size, 'page[size]': page_size})
+            next_link = f"{environ['wsgi.url_scheme']}://{environ['HTTP_HOST']}{path}?{urlencode(next_query)}"
+        return {'data': [self.transaction(index) for index in page], 'links': {'prev': None, 'next': next_link}}
+
+    @staticmethod
+    def _respond(start_response, status: str, payload: dict, extra_headers: list = None):
+        body = json.dumps(payload).encode('utf-8')
+        start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))] + (extra_headers or []))
+        return [body]
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+@contextmanager
+def serve_fake_up_api(app: FakeUpApi, host: str = '127.0.0.1', port: int = 0) -> Iterator[str]:
+    """Serve the app from a background thread; yields its API base URL (ending in '/')."""
+    server = make_server(host, port, app, server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_address[1]}/api/v1/"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,25 +1,86 @@
 # integrations/logic.py
 import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal, ROUND_HALF_UP
+from typing import Callable, Optional
 from dateutil.parser import isoparse
 
 from django.contrib.auth import get_user_model
-from django.db import transaction as db_transaction
+from django.db import DatabaseError, IntegrityError, transaction as db_transaction
+from django.db.models import Q
 from requests.exceptions import RequestException, HTTPError
 
 from .models import UpIntegration
 from .utils import decrypt_token
-from .services import get_transactions as get_up_transactions
+from .services import (
+    get_accounts as get_up_accounts,
+    get_transaction as get_up_transaction,
+    get_transaction_pages as get_up_transaction_pages,
+)
 from transactions.models import Transaction, BASE_CURRENCY_FOR_CONVERSION
 from transactions.services import get_historical_rate
+from transactions.typeahead import invalidate_typeahead_index
+from transactions.vendor_names import extract_original_vendor_name
+from transactions.view_engine import sync_custom_view_membership
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
 DEFAULT_INITIAL_SYNC_DAYS = 90
+# A sync holds the per-user lock for this long after its last stored page; a lock left
+# behind by a crashed process expires and can be taken over
+SYNC_LOCK_TTL = timedelta(minutes=15)
+# Fetch each Up account's transactions concurrently (accounts/{id}/transactions) instead of
+# paging through the global transactions endpoint; pass per_account to override per sync
+UP_SYNC_PER_ACCOUNT = os.getenv('UP_SYNC_PER_ACCOUNT', 'false').lower() == 'true'
+UP_ACCOUNT_FETCH_WORKERS = int(os.getenv('UP_ACCOUNT_FETCH_WORKERS', '4'))
 
-def sync_up_transactions_for_user(user_id: int, initial_sync: bool = False, since_date_str: str = None, until_date_str: str = None) -> dict:
+
+def acquire_sync_lock(user_id: int) -> bool:
+    """
+    Take the per-user sync lock. The conditional update makes the lock safe across
+    threads, worker processes and web servers. Returns False if another sync holds it.
+    """
+    now = datetime.now(timezone.utc)
+    return bool(UpIntegration.objects.filter(
+        Q(sync_locked_until__isnull=True) | Q(sync_locked_until__lt=now), user_id=user_id
+    ).update(sync_locked_until=now + SYNC_LOCK_TTL))
+
+
+def refresh_sync_lock(user_id: int) -> None:
+    """Extend the lock of a sync that is still making progress."""
+    UpIntegration.objects.filter(user_id=user_id).update(sync_locked_until=datetime.now(timezone.utc) + SYNC_LOCK_TTL)
+
+
+def release_sync_lock(user_id: int) -> None:
+    UpIntegration.objects.filter(user_id=user_id).update(sync_locked_until=None)
+
+
+def sync_up_transactions_for_user(user_id: int, initial_sync: bool = False, since_date_str: str = None, until_date_str: str = None,
+                                  per_account: bool = None, progress_callback: Optional[Callable[[dict], None]] = None) -> dict:
+    """
+    Sync the user's Up Bank transactions, unless a sync for the same user is already running.
+    per_account fetches the accounts concurrently (defaults to UP_SYNC_PER_ACCOUNT).
+    progress_callback is called with the running counts after each stored page.
+    """
+    if not acquire_sync_lock(user_id):
+        if UpIntegration.objects.filter(user_id=user_id).exists():
+            logger.warning(f"[Sync User {user_id}]: Another sync is already running. Skipping.")
+            return {'success': False, 'message': 'A sync for this account is already in progress.', 'created_count': 0, 'duplicate_count': 0, 'skipped_conversion_error':0, 'conversion_failures': [], 'error': 'sync_in_progress'}
+        # No integration to lock: the sync reports the missing user or integration
+        return _sync_up_transactions(user_id, initial_sync, since_date_str, until_date_str, per_account, progress_callback)
+    try:
+        return _sync_up_transactions(user_id, initial_sync, since_date_str, until_date_str, per_account, progress_callback)
+    finally:
+        release_sync_lock(user_id)
+
+
+def _sync_up_transactions(user_id: int, initial_sync: bool, since_date_str: str, until_date_str: str, per_account: bool = None,
+                          progress_callback: Optional[Callable[[dict], None]] = None) -> dict:
     try:
         user = User.objects.get(pk=user_id)
         integration = UpIntegration.objects.select_related('user').get(user=user)
@@ -85,248 +146,457 @@ def sync_up_transactions_for_user(user_id: int, initial_sync: bool = False, sinc
             min_date_for_db_query = default_since.date()
             logger.warning(f"[Sync User {user_id}]: last_synced_at is null and no valid since_date provided. Defaulting to {DEFAULT_INITIAL_SYNC_DAYS}-day lookback (UTC start of day): {since_filter_iso}")
 
+    # Resume an interrupted sync of the default window from its checkpoint
+    fetch_kwargs = {'since_iso': since_filter_iso, 'until_iso': until_filter_iso}
+    checkpointing = not since_date_str and not until_date_str
+    resuming = checkpointing and bool(integration.sync_resume_url)
+    watermark = None # Newest createdAt stored by this sync (pages arrive newest first)
+    if resuming:
+        fetch_kwargs['start_url'] = integration.sync_resume_url
+        watermark = integration.sync_resume_watermark
+        logger.info(f"[Sync User {user_id}]: Resuming interrupted sync from its checkpoint (watermark: {watermark}).")
+
+    counts = {
+        'created_count': 0, 'duplicate_count': 0, 'vendor_identified_count': 0, 'vendor_created_count': 0,
+        'auto_categorized_count': 0, 'skipped_conversion_error': 0, 'conversion_failures': [],
+    }
+    if per_account is None:
+        per_account = UP_SYNC_PER_ACCOUNT
+    page_count = 0
     try:
-        logger.info(f"[Sync User {user_id}]: Calling get_up_transactions service (since={since_filter_iso}, until={until_filter_iso})...")
-        up_transactions_data = get_up_transactions(pat, since_iso=since_filter_iso, until_iso=until_filter_iso)
-        logger.info(f"[Sync User {user_id}]: Fetched {len(up_transactions_data)} transactions from Up API.")
-    except HTTPError as e: # ... (error handling as before, with skipped_conversion_error) ...
+        # An interrupted global sync is finished first; its checkpoint is a global cursor
+        accounts = get_up_accounts(pat) if per_account and not resuming else []
+        if accounts:
+            logger.info(f"[Sync User {user_id}]: Fetching {len(accounts)} accounts concurrently (since={since_filter_iso}, until={until_filter_iso})...")
+            watermark, page_count = _sync_up_accounts(user, integration, pat, accounts, since_filter_iso, until_filter_iso,
+                                                      use_account_watermarks=not since_date_str, counts=counts,
+                                                      progress_callback=progress_callback)
+        else:
+            logger.info(f"[Sync User {user_id}]: Calling get_up_transaction_pages service (since={since_filter_iso}, until={until_filter_iso})...")
+            for up_transactions_page, next_url in get_up_transaction_pages(pat, **fetch_kwargs):
+                page_count += 1
+                page_latest = _store_up_transactions_page(user, up_transactions_page, counts)
+                refresh_sync_lock(user_id)
+                if progress_callback is not None:
+                    progress_callback(counts)
+                if page_latest and (watermark is None or page_latest > watermark):
+                    watermark = page_latest
+                if checkpointing and next_url:
+                    integration.sync_resume_url = next_url
+                    integration.sync_resume_watermark = watermark
+                    integration.save(update_fields=['sync_resume_url', 'sync_resume_watermark'])
+    except HTTPError as e:
         error_code = 'api_http_error'
         message = f"Error communicating with Up Bank (HTTP {e.response.status_code})."
         if e.response.status_code == 401: message, error_code = "Up Bank token is invalid or expired. Please relink.", 'invalid_token'
         logger.error(f"[Sync User {user_id}]: HTTP error fetching Up transactions: {e.response.status_code} - {e.response.text[:200]}")
-        return {'success': False, 'message': message, 'created_count': 0, 'duplicate_count': 0, 'skipped_conversion_error':0, 'conversion_failures': [], 'error': error_code}
-    except RequestException as e: # ... (error handling as before, with skipped_conversion_error) ...
+        return _interrupted_sync_result(integration, resuming and page_count == 0, message, error_code, counts)
+    except RequestException as e:
         logger.error(f"[Sync User {user_id}]: Network error fetching Up transactions: {e}")
-        return {'success': False, 'message': 'Network error connecting to Up Bank.', 'created_count': 0, 'duplicate_count': 0, 'skipped_conversion_error':0, 'conversion_failures': [], 'error': 'api_network_error'}
+        return _interrupted_sync_result(integration, resuming and page_count == 0, 'Network error connecting to Up Bank.', 'api_network_error', counts)
+    except DatabaseError as e:
+        logger.exception(f"[Sync User {user_id}]: Database error during bulk creation: {e}")
+        return _interrupted_sync_result(integration, False, 'Database error saving new transactions.', 'db_bulk_create_error', counts)
     except Exception as e:
         logger.exception(f"[Sync User {user_id}]: Unexpected error during Up transaction fetch: {e}")
-        return {'success': False, 'message': 'An unexpected error occurred during sync.', 'created_count': 0, 'duplicate_count': 0, 'skipped_conversion_error':0, 'conversion_failures': [], 'error': 'sync_fetch_error'}
+        return _interrupted_sync_result(integration, resuming and page_count == 0, 'An unexpected error occurred during sync.', 'sync_fetch_error', counts)
 
-    if not up_transactions_data: # ... (handling as before) ...
+    logger.info(f"[Sync User {user_id}]: Processed {page_count} pages. New: {counts['created_count']}. Duplicates: {counts['duplicate_count']}. Conversion errors: {counts['skipped_conversion_error']}.")
+
+    try:
+        timestamp_to_save = watermark if watermark else sync_start_time
+        integration.last_synced_at = timestamp_to_save
+        integration.sync_resume_url = None
+        integration.sync_resume_watermark = None
+        integration.save(update_fields=['last_synced_at', 'sync_resume_url', 'sync_resume_watermark'])
+        logger.info(f"[Sync User {user_id}]: Updated last_synced_at to {timestamp_to_save.isoformat()}")
+    except Exception as e:
+        logger.exception(f"[Sync User {user_id}]: Failed to update last_synced_at: {e}")
+
+    if counts['created_count'] == 0 and counts['duplicate_count'] == 0 and counts['skipped_conversion_error'] == 0:
         logger.info(f"[Sync User {user_id}]: No new Up transactions found since {since_filter_iso}.")
-        integration.last_synced_at = sync_start_time
-        integration.save(update_fields=['last_synced_at'])
-        return {'success': True, 'message': 'No new transactions from Up Bank found.', 'created_count': 0, 'duplicate_count': 0, 'skipped_conversion_error':0, 'conversion_failures': [], 'error': None}
+        return {'success': True, 'message': 'No new transactions from Up Bank found.', 'error': None, **counts}
+
+    message = f"Up Bank sync complete. Imported {counts['created_count']} new transactions."
+    if counts['duplicate_count'] > 0: message += f" Skipped {counts['duplicate_count']} duplicates."
+    if counts['vendor_identified_count'] > 0: message += f" Identified vendors for {counts['vendor_identified_count']} transactions."
+    if counts['vendor_created_count'] > 0: message += f" Created {counts['vendor_created_count']} new vendors."
+    if counts['auto_categorized_count'] > 0: message += f" Auto-categorized {counts['auto_categorized_count']} transactions using vendor rules."
+    if counts['skipped_conversion_error'] > 0: message += f" {counts['skipped_conversion_error']} transactions could not be converted to {BASE_CURRENCY_FOR_CONVERSION} due to missing exchange rates."
+    return {'success': True, 'message': message, 'error': None, **counts}
+
+
+def _sync_up_accounts(user, integration: UpIntegration, pat: str, accounts: list, since_iso: str, until_iso: str,
+                      use_account_watermarks: bool, counts: dict,
+                      progress_callback: Optional[Callable[[dict], None]] = None) -> tuple:
+    """
+    Fetch the transactions of each account concurrently and store them as the pages arrive.
+
+    Worker threads only talk to the Up API; their pages are handed over through a bounded
+    queue and stored on the calling thread, which owns the database connection. Pages are
+    de-duplicated by bank_transaction_id against what is already stored, so a transaction
+    listed under two accounts is stored once. Each account is fetched from its own
+    watermark (unless use_account_watermarks is False, e.g. for a custom since date).
 
+    An account's watermark only moves once all of its pages are stored, since pages arrive
+    newest first. When an account fails the others still complete and record their
+    watermarks, then the first error is raised.
 
-    fetched_bank_ids = {tx['id'] for tx in up_transactions_data}
+    Returns:
+        tuple: (newest createdAt stored, number of pages stored).
+    """
+    user_id = user.id
+    account_watermarks = dict(integration.account_watermarks or {})
+    pages = queue.Queue(maxsize=UP_ACCOUNT_FETCH_WORKERS * 2)
+    stop = threading.Event()
+
+    def hand_over(item) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch_account(account_id: str, account_since_iso: str) -> None:
+        try:
+            for transactions_page, _ in get_up_transaction_pages(pat, since_iso=account_since_iso, until_iso=until_iso, account_id=account_id):
+                if not hand_over((account_id, transactions_page, None)):
+                    return
+        except Exception as e:
+            hand_over((account_id, None, e))
+            return
+        hand_over((account_id, None, None))
+
+    newest_by_account = {}
+    errors = {}
+    page_count = 0
+    account_ids = [account['id'] for account in accounts]
+    with ThreadPoolExecutor(max_workers=max(1, min(UP_ACCOUNT_FETCH_WORKERS, len(account_ids))),
+                            thread_name_prefix=f"up-sync-{user_id}") as executor:
+        try:
+            for account_id in account_ids:
+                account_since_iso = since_iso
+                if use_account_watermarks and account_watermarks.get(account_id):
+                    account_since_iso = (isoparse(account_watermarks[account_id]) + timedelta(seconds=1)).isoformat()
+                executor.submit(fetch_account, account_id, account_since_iso)
+
+            pending = len(account_ids)
+            while pending:
+                account_id, transactions_page, error = pages.get()
+                if transactions_page is None:
+                    pending -= 1
+                    if error is not None:
+                        logger.error(f"[Sync User {user_id}]: Fetching account {account_id} failed: {type(error).__name__} - {error}")
+                        errors[account_id] = error
+                    continue
+                page_count += 1
+                page_latest = _store_up_transactions_page(user, transactions_page, counts)
+                refresh_sync_lock(user_id)
+                if progress_callback is not None:
+                    progress_callback(counts)
+                if page_latest and (account_id not in newest_by_account or page_latest > newest_by_account[account_id]):
+                    newest_by_account[account_id] = page_latest
+        finally:
+            stop.set() # Lets the workers exit if storing a page failed
+
+    for account_id, newest in newest_by_account.items():
+        previous = account_watermarks.get(account_id)
+        if account_id not in errors and (previous is None or newest > isoparse(previous)):
+            account_watermarks[account_id] = newest.isoformat()
+    integration.account_watermarks = account_watermarks
+    integration.save(update_fields=['account_watermarks'])
+    logger.info(f"[Sync User {user_id}]: Stored {page_count} pages from {len(account_ids)} accounts; {len(errors)} accounts failed.")
+
+    if errors:
+        raise next(iter(errors.values()))
+    return max(newest_by_account.values(), default=None), page_count
+
+
+def _interrupted_sync_result(integration: UpIntegration, discard_checkpoint: bool, message: str, error_code: str, counts: dict) -> dict:
+    """
+    Result for a sync that stopped part-way. Pages stored before the error are kept and the
+    checkpoint lets the next sync continue; a checkpoint that fails before yielding a single
+    page is dropped, so the next sync starts over from last_synced_at instead.
+    """
+    if discard_checkpoint:
+        integration.sync_resume_url = None
+        integration.sync_resume_watermark = None
+        integration.save(update_fields=['sync_resume_url', 'sync_resume_watermark'])
+    if counts['created_count'] > 0:
+        message += f" {counts['created_count']} new transactions were saved before the error; the next sync continues from there."
+    return {'success': False, 'message': message, 'error': error_code, **counts}
+
+
+def _build_up_transaction(user, tx_data: dict) -> Transaction | None:
+    """Build an unsaved Transaction from Up API data, or None if its amount is not in AUD."""
+    bank_id = tx_data['id']
+    attributes = tx_data['attributes']
+    user_id = user.id
+
+    transaction_date_obj = isoparse(attributes['createdAt']).date()
+
+    # --- FIXED: Use Up Bank's actual AUD amounts ---
+    # Up Bank API provides:
+    # - 'amount': Actual AUD amount charged to account (authoritative)
+    # - 'foreignAmount': Original foreign currency amount (for reference only)
+
+    # Get the actual AUD amount that Up Bank charged
+    actual_aud_amount_details = attributes['amount']
+    actual_aud_amount_cents = actual_aud_amount_details['valueInBaseUnits']
+    actual_aud_currency = actual_aud_amount_details['currencyCode'].upper()
+
+    # Verify this is AUD (Up Bank should always charge in AUD)
+    if actual_aud_currency != 'AUD':
+        logger.error(f"[Sync User {user_id}]: Unexpected currency in 'amount' field: {actual_aud_currency}. Expected AUD.")
+        return None
+
+    actual_aud_decimal = Decimal(actual_aud_amount_cents) / 100
+    direction = 'DEBIT' if actual_aud_decimal < 0 else 'CREDIT'
+    abs_aud_amount = abs(actual_aud_decimal)
+
+    # Get original currency info for reference
+    foreign_amount_details = attributes.get('foreignAmount')
+    if foreign_amount_details and foreign_amount_details.get('valueInBaseUnits') is not None:
+        # This was a foreign currency transaction - store original currency for reference
+        original_amount_cents = foreign_amount_details['valueInBaseUnits']
+        original_currency_code = foreign_amount_details['currencyCode'].upper()
+        original_amount_decimal = abs(Decimal(original_amount_cents) / 100)
+
+        # Calculate the effective exchange rate that Up Bank used
+        if original_amount_decimal > 0:
+            effective_rate = abs_aud_amount / original_amount_decimal
+        else:
+            effective_rate = Decimal("1.0")  # Fallback
+
+        logger.debug(f"[Sync User {user_id}]: Tx {bank_id} foreign transaction: {original_amount_decimal} {original_currency_code} -> {abs_aud_amount} AUD (effective rate: {effective_rate})")
+    else:
+        # Domestic AUD transaction
+        original_amount_decimal = abs_aud_amount
+        original_currency_code = 'AUD'
+        effective_rate = Decimal("1.0")
+        logger.debug(f"[Sync User {user_id}]: Tx {bank_id} domestic AUD transaction: {abs_aud_amount} AUD")
+
+    description = attributes['description']
+
+    # --- NEW VENDOR MAPPING LOGIC ---
+    # Extract original vendor name from Up Bank description
+    original_vendor_name = extract_original_vendor_name(description, default='Up Bank Transaction')
+
+    # For Up Bank transactions, initially use the same name for both fields
+    # Later, vendor identification and mapping will update these
+    vendor_name = original_vendor_name
+    # --- END VENDOR MAPPING LOGIC ---
+
+    # Create the Transaction object using actual Up Bank AUD amounts
+    new_tx = Transaction(
+        user=user,
+        bank_transaction_id=bank_id,
+        source='up_bank',
+        transaction_date=transaction_date_obj,
+        description=description,
+        original_amount=original_amount_decimal,  # Store original foreign amount for reference
+        original_currency=original_currency_code,  # Store original currency for reference
+        direction=direction,
+        aud_amount=abs_aud_amount,  # Use Up Bank's actual AUD charge (authoritative)
+        exchange_rate_to_aud=effective_rate,  # Store Up Bank's effective rate
+        # New vendor name fields
+        original_vendor_name=original_vendor_name,
+        vendor_name=vendor_name,
+        auto_categorized=False,  # Will be set to True by auto-categorization if a rule is applied
+    )
+    new_tx.dedup_fingerprint = new_tx.build_dedup_fingerprint()
+    return new_tx
+
+
+def _store_up_transactions_page(user, up_transactions_page: list, counts: dict) -> datetime | None:
+    """
+    De-duplicate, build and bulk-create one page of Up transactions, then run vendor
+    identification and auto-categorization on the new rows. Updates counts in place and
+    returns the newest createdAt on the page.
+    """
+    user_id = user.id
+    latest_created_at = None
+    fetched_bank_ids = {tx['id'] for tx in up_transactions_page}
     existing_bank_ids_in_db = set(
         Transaction.objects.filter(
             user=user, source='up_bank', bank_transaction_id__in=fetched_bank_ids
         ).values_list('bank_transaction_id', flat=True)
-    )
-    logger.info(f"[Sync User {user_id}]: Found {len(existing_bank_ids_in_db)} existing Up transaction IDs in DB matching fetched IDs.")
+    ) if fetched_bank_ids else set()
 
     transactions_to_create = []
-    duplicate_count = 0
-    skipped_conversion_error_count = 0
-    conversion_failures = []  # Track detailed conversion failure information
-    latest_transaction_api_created_at = None
-
-    for tx_data in up_transactions_data:
+    for tx_data in up_transactions_page:
         bank_id = tx_data['id']
-        attributes = tx_data['attributes']
-
         if bank_id in existing_bank_ids_in_db:
-            duplicate_count += 1
+            counts['duplicate_count'] += 1
             continue
 
         try:
-            api_created_at_str = attributes['createdAt']
-            api_created_at_dt = isoparse(api_created_at_str)
-            transaction_date_obj = api_created_at_dt.date()
-
-            if latest_transaction_api_created_at is None or api_created_at_dt > latest_transaction_api_created_at:
-                latest_transaction_api_created_at = api_created_at_dt
-
-            # --- FIXED: Use Up Bank's actual AUD amounts ---
-            # Up Bank API provides:
-            # - 'amount': Actual AUD amount charged to account (authoritative)
-            # - 'foreignAmount': Original foreign currency amount (for reference only)
-            
-            # Get the actual AUD amount that Up Bank charged
-            actual_aud_amount_details = attributes['amount']
-            actual_aud_amount_cents = actual_aud_amount_details['valueInBaseUnits']
-            actual_aud_currency = actual_aud_amount_details['currencyCode'].upper()
-            
-            # Verify this is AUD (Up Bank should always charge in AUD)
-            if actual_aud_currency != 'AUD':
-                logger.error(f"[Sync User {user_id}]: Unexpected currency in 'amount' field: {actual_aud_currency}. Expected AUD.")
-                skipped_conversion_error_count += 1
-                continue
-            
-            actual_aud_decimal = Decimal(actual_aud_amount_cents) / 100
-            direction = 'DEBIT' if actual_aud_decimal < 0 else 'CREDIT'
-            abs_aud_amount = abs(actual_aud_decimal)
-            
-            # Get original currency info for reference
-            foreign_amount_details = attributes.get('foreignAmount')
-            if foreign_amount_details and foreign_amount_details.get('valueInBaseUnits') is not None:
-                # This was a foreign currency transaction - store original currency for reference
-                original_amount_cents = foreign_amount_details['valueInBaseUnits'] 
-                original_currency_code = foreign_amount_details['currencyCode'].upper()
-                original_amount_decimal = abs(Decimal(original_amount_cents) / 100)
-                
-                # Calculate the effective exchange rate that Up Bank used
-                if original_amount_decimal > 0:
-                    effective_rate = abs_aud_amount / original_amount_decimal
-                else:
-                    effective_rate = Decimal("1.0")  # Fallback
-                    
-                logger.debug(f"[Sync User {user_id}]: Tx {bank_id} foreign transaction: {original_amount_decimal} {original_currency_code} -> {abs_aud_amount} AUD (effective rate: {effective_rate})")
-            else:
-                # Domestic AUD transaction
-                original_amount_decimal = abs_aud_amount
-                original_currency_code = 'AUD'
-                effective_rate = Decimal("1.0")
-                logger.debug(f"[Sync User {user_id}]: Tx {bank_id} domestic AUD transaction: {abs_aud_amount} AUD")
-            
-            description = attributes['description']
-
-            # --- NEW VENDOR MAPPING LOGIC ---
-            # Extract original vendor name from Up Bank description
-            original_vendor_name = description.split(' - ')[0].split(' | ')[0].strip()
-            if not original_vendor_name:
-                original_vendor_name = 'Up Bank Transaction'
-            
-            # For Up Bank transactions, initially use the same name for both fields
-            # Later, vendor identification and mapping will update these
-            vendor_name = original_vendor_name
-            # --- END VENDOR MAPPING LOGIC ---
-
-            # Create the Transaction object using actual Up Bank AUD amounts
-            new_tx = Transaction(
-                user=user, 
-                bank_transaction_id=bank_id, 
-                source='up_bank',
-                transaction_date=transaction_date_obj, 
-                description=description,
-                original_amount=original_amount_decimal,  # Store original foreign amount for reference
-                original_currency=original_currency_code,  # Store original currency for reference
-                direction=direction, 
-                aud_amount=abs_aud_amount,  # Use Up Bank's actual AUD charge (authoritative)
-                exchange_rate_to_aud=effective_rate,  # Store Up Bank's effective rate
-                # New vendor name fields
-                original_vendor_name=original_vendor_name,
-                vendor_name=vendor_name,
-                auto_categorized=False,  # Will be set to True by auto-categorization if a rule is applied
-            )
-            transactions_to_create.append(new_tx)
-
+            api_created_at_dt = isoparse(tx_data['attributes']['createdAt'])
+            if latest_created_at is None or api_created_at_dt > latest_created_at:
+                latest_created_at = api_created_at_dt
+            new_tx = _build_up_transaction(user, tx_data)
         except (KeyError, TypeError, ValueError) as e:
-            logger.error(f"[Sync User {user_id}]: Error transforming Up transaction data for bank_id {bank_id}: {e}. Data: {attributes}", exc_info=True)
-            
+            logger.error(f"[Sync User {user_id}]: Error transforming Up transaction data for bank_id {bank_id}: {e}. Data: {tx_data.get('attributes')}", exc_info=True)
+
             # Track data parsing failures
-            conversion_failures.append({
+            counts['conversion_failures'].append({
                 'currency': 'UNKNOWN',
                 'date': 'UNKNOWN',
                 'amount': 'UNKNOWN',
                 'description': f'Data parsing error for transaction {bank_id}',
                 'reason': 'data_parsing_error'
             })
-            skipped_conversion_error_count += 1
+            counts['skipped_conversion_error'] += 1
             continue
+        if new_tx is None:
+            counts['skipped_conversion_error'] += 1
+            continue
+        transactions_to_create.append(new_tx)
 
-    logger.info(f"[Sync User {user_id}]: Processed API data. Duplicates: {duplicate_count}. New: {len(transactions_to_create)}. Conversion errors: {skipped_conversion_error_count}.")
+    if not transactions_to_create:
+        return latest_created_at
 
-    created_count = 0
-    auto_categorized_count = 0
-    if transactions_to_create: # ... (bulk create logic as before) ...
-        try:
-            with db_transaction.atomic():
-                created_objects = Transaction.objects.bulk_create(transactions_to_create)
-                created_count = len(created_objects)
-            logger.info(f"[Sync User {user_id}]: Successfully bulk created {created_count} new Up transactions.")
-            
-            # Get the newly created transaction IDs for subsequent processing
-            new_transaction_ids = [obj.id for obj in created_objects if obj.id] if created_count > 0 else []
-            
-            # Apply vendor identification to newly created transactions
-            vendor_identified_count = 0
-            vendor_created_count = 0
-            if created_count > 0:
-                logger.info(f"[Sync User {user_id}]: Starting vendor identification for {created_count} new Up Bank transactions...")
-                try:
-                    from transactions.vendor_identification_service import identify_vendors_for_user_transactions
-                    
-                    # Create queryset of newly created transactions for vendor identification
-                    new_transactions_qs = Transaction.objects.filter(
-                        id__in=new_transaction_ids,
-                        user=user
-                    )
-                    
-                    # Apply vendor identification to the new transactions
-                    vendor_result = identify_vendors_for_user_transactions(
-                        user,
-                        transactions=new_transactions_qs
-                    )
-                    vendor_identified_count = vendor_result.identified_count
-                    vendor_created_count = vendor_result.created_vendors_count
-                    
-                    logger.info(f"[Sync User {user_id}]: Vendor identification complete. "
-                               f"Identified: {vendor_identified_count}, "
-                               f"Created: {vendor_created_count}, "
-                               f"Skipped: {vendor_result.skipped_count}, "
-                               f"Errors: {vendor_result.error_count}")
-                except Exception as e:
-                    logger.error(f"[Sync User {user_id}]: Vendor identification failed during Up Bank sync: {e}", exc_info=True)
-                    # Don't fail the entire sync if vendor identification fails
-            
-            # Apply auto-categorization to newly created transactions
-            if created_count > 0:
-                logger.info(f"[Sync User {user_id}]: Starting auto-categorization for {created_count} new Up Bank transactions...")
-                try:
-                    from transactions.auto_categorization_service import auto_categorize_user_transactions
-                    
-                    if new_transaction_ids:
-                        # Create queryset of newly created transactions for auto-categorization
-                        new_transactions_qs = Transaction.objects.filter(
-                            id__in=new_transaction_ids,
-                            user=user
-                        )
-                        
-                        # Apply auto-categorization only to the new transactions
-                        categorization_result = auto_categorize_user_transactions(
-                            user,
-                            transactions=new_transactions_qs
-                        )
-                        auto_categorized_count = categorization_result.categorized_count
-                        
-                        logger.info(f"[Sync User {user_id}]: Auto-categorized {auto_categorized_count} "
-                                   f"out of {created_count} new Up Bank transactions. "
-                                   f"Skipped: {categorization_result.skipped_count}, "
-                                   f"Errors: {categorization_result.error_count}")
-                    else:
-                        logger.warning(f"[Sync User {user_id}]: No transaction IDs available for auto-categorization")
-                        
-                except Exception as e:
-                    logger.error(f"[Sync User {user_id}]: Auto-categorization failed during Up Bank sync: {e}", exc_info=True)
-                    # Don't fail the entire sync if auto-categorization fails
-                    
-        except Exception as e:
-            logger.exception(f"[Sync User {user_id}]: Database error during bulk creation: {e}")
-            return {'success': False, 'message': 'Database error saving new transactions.', 'created_count': 0, 'duplicate_count': duplicate_count, 'skipped_conversion_error': skipped_conversion_error_count, 'conversion_failures': conversion_failures, 'error': 'db_bulk_create_error'}
+    with db_transaction.atomic():
+        # A webhook may have stored some of the page since the check above
+        page_bank_ids = [tx.bank_transaction_id for tx in transactions_to_create]
+        stored_meanwhile = set(
+            Transaction.objects.filter(
+                user=user, source='up_bank', bank_transaction_id__in=page_bank_ids
+            ).values_list('bank_transaction_id', flat=True)
+        )
+        transactions_to_create = [tx for tx in transactions_to_create if tx.bank_transaction_id not in stored_meanwhile]
+        counts['duplicate_count'] += len(stored_meanwhile)
+        # Rows a webhook stores after that check are skipped by the unique constraint
+        Transaction.objects.bulk_create(transactions_to_create, ignore_conflicts=True)
+        # ignore_conflicts leaves the primary keys unset, so the stored rows are fetched back
+        created_objects = list(Transaction.objects.filter(
+            user=user, source='up_bank',
+            bank_transaction_id__in=[tx.bank_transaction_id for tx in transactions_to_create],
+        ))
+    if not created_objects:
+        return latest_created_at
+    created_count = len(created_objects)
+    counts['created_count'] += created_count
+    invalidate_typeahead_index(user_id)  # bulk_create sends no post_save
+    sync_custom_view_membership(user_id, created_objects)
+    logger.info(f"[Sync User {user_id}]: Bulk created {created_count} new Up transactions from this page.")
 
-    try: # ... (update last_synced_at logic as before) ...
-        timestamp_to_save = latest_transaction_api_created_at if latest_transaction_api_created_at else sync_start_time
-        integration.last_synced_at = timestamp_to_save
-        integration.save(update_fields=['last_synced_at'])
-        logger.info(f"[Sync User {user_id}]: Updated last_synced_at to {timestamp_to_save.isoformat()}")
+    new_transaction_ids = [obj.id for obj in created_objects if obj.id]
+    if not new_transaction_ids:
+        logger.warning(f"[Sync User {user_id}]: No transaction IDs available for vendor identification and auto-categorization")
+        return latest_created_at
+    process_new_up_transactions(user, new_transaction_ids, counts)
+    return latest_created_at
+
+
+def process_new_up_transactions(user, transaction_ids: list, counts: dict) -> None:
+    """
+    Run vendor identification and auto-categorization on newly stored Up transactions.
+    Adds to the vendor_identified_count, vendor_created_count and auto_categorized_count
+    entries of counts; failures are logged and do not fail the caller.
+    """
+    user_id = user.id
+
+    # Apply vendor identification to newly created transactions
+    try:
+        from transactions.vendor_identification_service import identify_vendors_for_user_transactions
+
+        vendor_result = identify_vendors_for_user_transactions(
+            user,
+            transactions=Transaction.objects.filter(id__in=transaction_ids, user=user)
+        )
+        counts['vendor_identified_count'] = counts.get('vendor_identified_count', 0) + vendor_result.identified_count
+        counts['vendor_created_count'] = counts.get('vendor_created_count', 0) + vendor_result.created_vendors_count
+        logger.info(f"[Sync User {user_id}]: Vendor identification complete. "
+                   f"Identified: {vendor_result.identified_count}, "
+                   f"Created: {vendor_result.created_vendors_count}, "
+                   f"Skipped: {vendor_result.skipped_count}, "
+                   f"Errors: {vendor_result.error_count}")
     except Exception as e:
-        logger.exception(f"[Sync User {user_id}]: Failed to update last_synced_at: {e}")
+        logger.error(f"[Sync User {user_id}]: Vendor identification failed during Up Bank sync: {e}", exc_info=True)
+        # Don't fail the entire sync if vendor identification fails
+
+    # Apply auto-categorization to newly created transactions
+    try:
+        from transactions.auto_categorization_service import auto_categorize_user_transactions
+
+        categorization_result = auto_categorize_user_transactions(
+            user,
+            transactions=Transaction.objects.filter(id__in=transaction_ids, user=user)
+        )
+        counts['auto_categorized_count'] = counts.get('auto_categorized_count', 0) + categorization_result.categorized_count
+        logger.info(f"[Sync User {user_id}]: Auto-categorized {categorization_result.categorized_count} "
+                   f"out of {len(transaction_ids)} new Up Bank transactions. "
+                   f"Skipped: {categorization_result.skipped_count}, "
+                   f"Errors: {categorization_result.error_count}")
+    except Exception as e:
+        logger.error(f"[Sync User {user_id}]: Auto-categorization failed during Up Bank sync: {e}", exc_info=True)
+        # Don't fail the entire sync if auto-categorization fails
+
+
+# --- Webhook ingestion ---
+
+WEBHOOK_TRANSACTION_EVENTS = ('TRANSACTION_CREATED', 'TRANSACTION_SETTLED')
+
+
+def ingest_up_transaction(user, tx_data: dict) -> Transaction | None:
+    """
+    Store one Up transaction unless it is already stored. Returns the new Transaction, or
+    None for duplicates and transactions that cannot be mapped.
+    """
+    if Transaction.objects.filter(user=user, source='up_bank', bank_transaction_id=tx_data['id']).exists():
+        return None
+    try:
+        new_tx = _build_up_transaction(user, tx_data)
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"[Webhook User {user.id}]: Error transforming Up transaction data for bank_id {tx_data.get('id')}: {e}", exc_info=True)
+        return None
+    if new_tx is None:
+        return None
+    try:
+        with db_transaction.atomic():
+            new_tx.save()
+    except IntegrityError:
+        # Another event or a sync stored it after the check above (unique per user for up_bank)
+        if Transaction.objects.filter(user=user, source='up_bank', bank_transaction_id=tx_data['id']).exists():
+            logger.info(f"[Webhook User {user.id}]: Up transaction {tx_data['id']} was stored concurrently.")
+            return None
+        raise
+    return new_tx
+
+
+def handle_up_webhook_event(integration: UpIntegration, payload: dict) -> dict:
+    """
+    Process a verified Up webhook event. Transaction events fetch and store that single
+    transaction, then queue vendor identification and auto-categorization for it.
+
+    Raises:
+        HTTPError, RequestException: When the transaction cannot be fetched; Up redelivers
+        events that are not acknowledged.
+        KeyError, ValueError: For malformed payloads.
+    """
+    from transactions.import_jobs import enqueue_up_transaction_processing
+
+    user = integration.user
+    event = payload['data']
+    event_type = event['attributes']['eventType']
+    if event_type not in WEBHOOK_TRANSACTION_EVENTS:
+        logger.info(f"[Webhook User {user.id}]: Acknowledged {event_type} event {event.get('id')}.")
+        return {'status': 'ignored', 'event_type': event_type}
+
+    bank_id = event['relationships']['transaction']['data']['id']
+    pat = decrypt_token(integration.personal_access_token_encrypted)
+    if not pat:
+        raise ValueError('Could not decrypt the Up Personal Access Token.')
+
+    new_tx = ingest_up_transaction(user, get_up_transaction(pat, bank_id))
+    if new_tx is None:
+        logger.info(f"[Webhook User {user.id}]: {event_type} for {bank_id}: already stored or not importable.")
+        return {'status': 'skipped', 'event_type': event_type, 'bank_transaction_id': bank_id}
 
-    message = f"Up Bank sync complete. Imported {created_count} new transactions." # ... (message building as before) ...
-    if duplicate_count > 0: message += f" Skipped {duplicate_count} duplicates."
-    if vendor_identified_count > 0: message += f" Identified vendors for {vendor_identified_count} transactions."
-    if vendor_created_count > 0: message += f" Created {vendor_created_count} new vendors."
-    if auto_categorized_count > 0: message += f" Auto-categorized {auto_categorized_count} transactions using vendor rules."
-    if skipped_conversion_error_count > 0: message += f" {skipped_conversion_error_count} transactions could not be converted to {BASE_CURRENCY_FOR_CONVERSION} due to missing exchange rates."
-    return {
-        'success': True, 'message': message, 'created_count': created_count,
-        'duplicate_count': duplicate_count, 
-        'vendor_identified_count': vendor_identified_count, 
-        'vendor_created_count': vendor_created_count,
-        'auto_categorized_count': auto_categorized_count,
-        'skipped_conversion_error': skipped_conversion_error_count, 
-        'conversion_failures': conversion_failures, 'error': None
-    }
\ No newline at end of file
+    job = enqueue_up_transaction_processing(user, [new_tx.id])
+    logger.info(f"[Webhook User {user.id}]: {event_type} stored {bank_id} as transaction {new_tx.id}; queued job {job.id}.")
+    return {'status': 'created', 'event_type': event_type, 'bank_transaction_id': bank_id,
+            'transaction_id': new_tx.id, 'job_id': job.id}
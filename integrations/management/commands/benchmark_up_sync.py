@@ -0,0 +1,98 @@
+import time
+import tracemalloc
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from integrations import services
+from integrations.fake_up_api import FakeUpApi, serve_fake_up_api
+from integrations.logic import sync_up_transactions_for_user
+from integrations.models import UpIntegration
+from integrations.utils import encrypt_token
+
+User = get_user_model()
+
+
+class _QueryCounter:
+    """Database execute wrapper counting queries without keeping their SQL."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ('Measures end-to-end Up Bank sync time, query count and peak memory against a local '
+            'fake Up API. Creates a temporary user per run and deletes it afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Comma-separated transaction counts to sync (default: 1000,10000,100000).')
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help='Seconds the fake API waits before each response (default: 0).')
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Fraction of fake API requests answered with a retryable 503 (default: 0).')
+        parser.add_argument('--foreign-ratio', type=float, default=0.2,
+                            help='Fraction of debits with a foreignAmount (default: 0.2).')
+        parser.add_argument('--accounts', type=int, default=1,
+                            help='Accounts the fake transactions are spread over (default: 1).')
+        parser.add_argument('--per-account', action='store_true',
+                            help='Fetch the accounts concurrently instead of paging the global transactions endpoint.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the benchmark users and their transactions.')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers.')
+        if not sizes or min(sizes) <= 0:
+            raise CommandError('--sizes must contain positive transaction counts.')
+        if options['accounts'] < 1:
+            raise CommandError('--accounts must be at least 1.')
+        if not 0 <= options['error_rate'] < 1:
+            raise CommandError('--error-rate must be between 0 and 1.')
+
+        self.stdout.write(f"{'transactions':>12} {'seconds':>9} {'tx/s':>9} {'queries':>9} {'peak MiB':>9} {'API calls':>9}")
+        for size in sizes:
+            row = self._run(size, options)
+            self.stdout.write(
+                f"{size:>12,} {row['seconds']:>9.2f} {size / row['seconds']:>9,.0f} {row['queries']:>9,} "
+                f"{row['peak_mib']:>9.1f} {row['api_calls']:>9,}"
+            )
+            if not row['result'].get('success') or row['result'].get('created_count') != size:
+                self.stderr.write(self.style.WARNING(f"  Sync of {size:,} did not complete: {row['result'].get('message')}"))
+
+    def _run(self, size, options):
+        app = FakeUpApi(size, accounts=options['accounts'], latency=options['latency'], error_rate=options['error_rate'],
+                        foreign_ratio=options['foreign_ratio'], seed=options['seed'])
+        user = User.objects.create_user(username=f"up_benchmark_{uuid.uuid4().hex[:12]}")
+        UpIntegration.objects.create(user=user, personal_access_token_encrypted=encrypt_token('up:benchmark:token'))
+        original_base_url = services.UP_API_BASE_URL
+        counter = _QueryCounter()
+        try:
+            with serve_fake_up_api(app) as base_url:
+                services.UP_API_BASE_URL = base_url
+                services.up_api_metrics.reset()
+                tracemalloc.start()
+                start = time.perf_counter()
+                with connection.execute_wrapper(counter):
+                    result = sync_up_transactions_for_user(user.id, initial_sync=True, since_date_str='2000-01-01',
+                                                           per_account=options['per_account'])
+                seconds = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+        finally:
+            services.UP_API_BASE_URL = original_base_url
+            if not options['keep']:
+                user.delete()
+        return {
+            'seconds': seconds, 'queries': counter.count, 'peak_mib': peak / 2 ** 20,
+            'api_calls': services.up_api_metrics.snapshot()['calls'], 'result': result,
+        }
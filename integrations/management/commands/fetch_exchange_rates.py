@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from integrations.services import CURRENCY_RATE_FETCH_WORKERS, get_api_metrics, prefetch_exchange_rates
+from transactions.models import BASE_CURRENCY_FOR_CONVERSION, Transaction
+
+
+class Command(BaseCommand):
+    help = ('Stores historical exchange rates from the external currency API, one request per day. '
+            'Either fetches a date range or, with --missing, the days of transactions without an '
+            f'{BASE_CURRENCY_FOR_CONVERSION} amount, which are then converted.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to fetch (YYYY-MM-DD).')
+        parser.add_argument('--end', help='Last day to fetch (YYYY-MM-DD, default: today).')
+        parser.add_argument('--currency', action='append', dest='currencies', default=[],
+                            help='Only fetch days missing this currency (repeatable).')
+        parser.add_argument('--missing', action='store_true',
+                            help=f'Fetch the days of transactions that have no {BASE_CURRENCY_FOR_CONVERSION} amount and convert them.')
+        parser.add_argument('--workers', type=int, default=CURRENCY_RATE_FETCH_WORKERS,
+                            help=f'Days fetched concurrently (default: {CURRENCY_RATE_FETCH_WORKERS}).')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+        if options['missing'] == bool(options['start']):
+            raise CommandError('Pass either --start or --missing.')
+
+        unconverted = None
+        currencies = options['currencies']
+        if options['missing']:
+            unconverted = Transaction.objects.filter(aud_amount__isnull=True).exclude(original_currency=BASE_CURRENCY_FOR_CONVERSION)
+            days = set(unconverted.values_list('transaction_date', flat=True).distinct())
+            currencies = currencies or list(unconverted.values_list('original_currency', flat=True).distinct())
+        else:
+            try:
+                start = datetime.strptime(options['start'], '%Y-%m-%d').date()
+                end = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else datetime.now().date()
+            except ValueError:
+                raise CommandError('--start and --end must be dates in YYYY-MM-DD format.')
+            if end < start:
+                raise CommandError('--end must not be before --start.')
+            days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+        summary = prefetch_exchange_rates(days, currencies=currencies or None, max_workers=options['workers'])
+        api = get_api_metrics()['currency_api']
+        self.stdout.write(self.style.SUCCESS(
+            f"Fetched {summary['fetched']} of {summary['days']} days ({summary['rates_stored']} rates) "
+            f"in {api['calls']} API calls."
+        ))
+        if summary['failed']:
+            self.stderr.write(self.style.WARNING(f"Could not fetch: {', '.join(summary['failed'])}"))
+
+        if unconverted is not None:
+            converted = sum(1 for tx in list(unconverted) if tx.update_aud_amount_if_needed())
+            self.stdout.write(f"Converted {converted} transactions to {BASE_CURRENCY_FOR_CONVERSION}.")
@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from requests.exceptions import HTTPError, RequestException
+
+from integrations.models import UpIntegration
+from integrations.services import create_webhook
+from integrations.utils import decrypt_token, encrypt_token
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Registers an Up Bank webhook for a user's integration and stores its signing secret."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username whose Up integration receives the events.')
+        parser.add_argument('--url', required=True,
+                            help='Public URL of the webhook endpoint, e.g. https://example.com/api/integrations/up/webhook/')
+        parser.add_argument('--description', default='FundFlow transaction events')
+
+    def handle(self, *args, **options):
+        try:
+            integration = UpIntegration.objects.select_related('user').get(user__username=options['user'])
+        except UpIntegration.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' has no Up Bank integration.")
+        pat = decrypt_token(integration.personal_access_token_encrypted)
+        if not pat:
+            raise CommandError('Could not decrypt the Up Personal Access Token.')
+
+        try:
+            webhook = create_webhook(pat, options['url'], options['description'])
+        except (HTTPError, RequestException, ValueError) as e:
+            raise CommandError(f"Failed to register the webhook: {e}")
+
+        integration.webhook_id = webhook['id']
+        integration.webhook_secret_encrypted = encrypt_token(webhook['attributes']['secretKey'])
+        integration.save(update_fields=['webhook_id', 'webhook_secret_encrypted'])
+        self.stdout.write(self.style.SUCCESS(f"Registered Up webhook {webhook['id']} for {options['url']}."))
@@ -0,0 +1,92 @@
+import json
+import os
+import secrets
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import reverse
+
+from integrations import services
+from integrations.fake_up_api import FakeUpApi, serve_fake_up_api
+from integrations.models import UpIntegration
+from integrations.utils import decrypt_token, encrypt_token
+from integrations.views import UpWebhookView
+
+User = get_user_model()
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'webhook_samples')
+
+
+class Command(BaseCommand):
+    help = ("Signs Up webhook event payloads with a user's webhook secret and delivers them to the "
+            "webhook endpoint, for testing the webhook path locally.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('payloads', nargs='*',
+                            help=f"Event JSON files, or names of samples in {SAMPLES_DIR} (default: transaction_created).")
+        parser.add_argument('--user', required=True, help='Username whose Up integration receives the events.')
+        parser.add_argument('--transaction-id', help="Replace the events' transaction ID.")
+        parser.add_argument('--url', help='POST to this URL (a running server) instead of calling the view in-process.')
+        parser.add_argument('--fake-api', action='store_true',
+                            help='Fetch event transactions from a local fake Up API instead of the real one.')
+
+    def handle(self, *args, **options):
+        try:
+            integration = UpIntegration.objects.select_related('user').get(user__username=options['user'])
+        except UpIntegration.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' has no Up Bank integration.")
+        if not integration.webhook_id:
+            # No webhook registered with Up: create a local one so events can be signed
+            integration.webhook_id = f"local-{secrets.token_hex(8)}"
+            integration.webhook_secret_encrypted = encrypt_token(secrets.token_hex(32))
+            integration.save(update_fields=['webhook_id', 'webhook_secret_encrypted'])
+            self.stdout.write(f"Created local webhook {integration.webhook_id} for {options['user']}.")
+        secret_key = decrypt_token(integration.webhook_secret_encrypted)
+        if not secret_key:
+            raise CommandError('Could not decrypt the webhook secret.')
+
+        with ExitStack() as stack:
+            transaction_id = options['transaction_id']
+            if options['fake_api']:
+                app = FakeUpApi(transaction_count=1000)
+                base_url = stack.enter_context(serve_fake_up_api(app))
+                original_base_url, services.UP_API_BASE_URL = services.UP_API_BASE_URL, base_url
+                stack.callback(setattr, services, 'UP_API_BASE_URL', original_base_url)
+                transaction_id = transaction_id or app.transaction(secrets.randbelow(1000))['id']
+
+            for name in options['payloads'] or ['transaction_created']:
+                payload = self._load(name)
+                payload['data']['relationships']['webhook']['data']['id'] = integration.webhook_id
+                if transaction_id and 'transaction' in payload['data']['relationships']:
+                    payload['data']['relationships']['transaction']['data']['id'] = transaction_id
+                body = json.dumps(payload).encode('utf-8')
+                signature = services.sign_webhook_body(secret_key, body)
+                status_code, content = self._deliver(body, signature, options['url'])
+                self.stdout.write(f"{name}: HTTP {status_code} {content}")
+
+    @staticmethod
+    def _load(name):
+        path = name if os.path.isfile(name) else os.path.join(SAMPLES_DIR, f"{name.removesuffix('.json')}.json")
+        try:
+            with open(path, encoding='utf-8') as payload_file:
+                return json.load(payload_file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read webhook payload '{name}': {e}")
+
+    @staticmethod
+    def _deliver(body, signature, url=None):
+        if url:
+            response = services.http_session.post(
+                url, data=body, timeout=(services.HTTP_CONNECT_TIMEOUT, services.HTTP_READ_TIMEOUT),
+                headers={'Content-Type': 'application/json', 'X-Up-Authenticity-Signature': signature},
+            )
+            return response.status_code, response.text
+        request = RequestFactory().post(
+            reverse('integrations:up-webhook'), data=body, content_type='application/json',
+            HTTP_X_UP_AUTHENTICITY_SIGNATURE=signature,
+        )
+        response = UpWebhookView.as_view()(request)
+        response.render()
+        return response.status_code, response.content.decode('utf-8')
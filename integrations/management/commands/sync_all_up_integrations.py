@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from integrations.logic import sync_up_transactions_for_user
+from integrations.models import UpIntegration
+from integrations.services import get_api_metrics, up_api_metrics, up_api_rate_limiter
+
+
+class Command(BaseCommand):
+    help = 'Syncs Up Bank transactions for every linked user, several users at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Users synced concurrently (default: 4).')
+        parser.add_argument('--rate-limit', type=float, default=10.0,
+                            help='Up API requests per second across all workers; 0 disables the limit (default: 10).')
+        parser.add_argument('--burst', type=int, default=5,
+                            help='Requests allowed back to back before the rate limit applies (default: 5).')
+        parser.add_argument('--user', action='append', dest='usernames', default=[],
+                            help='Only sync this user (repeatable).')
+        parser.add_argument('--per-account', action='store_true', default=None,
+                            help="Fetch each user's accounts concurrently (default: UP_SYNC_PER_ACCOUNT).")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+        if options['rate_limit'] < 0:
+            raise CommandError('--rate-limit must not be negative.')
+
+        integrations = UpIntegration.objects.order_by('user_id')
+        if options['usernames']:
+            integrations = integrations.filter(user__username__in=options['usernames'])
+        user_ids = list(integrations.values_list('user_id', flat=True))
+        if not user_ids:
+            self.stdout.write('No Up Bank integrations to sync.')
+            return
+
+        up_api_rate_limiter.configure(options['rate_limit'], options['burst'])
+        up_api_metrics.reset()
+        self.stdout.write(f"Syncing {len(user_ids)} users with {options['workers']} workers...")
+
+        start = time.perf_counter()
+        results = {}
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {executor.submit(self._sync_user, user_id, options['per_account']): user_id for user_id in user_ids}
+            for future in as_completed(futures):
+                user_id = futures[future]
+                try:
+                    results[user_id] = future.result()
+                except Exception as e:
+                    results[user_id] = {'success': False, 'error': 'unexpected_error', 'message': str(e)}
+                result = results[user_id]
+                status_label = 'ok' if result.get('success') else result.get('error')
+                self.stdout.write(f"User {user_id}: {status_label}. {result.get('message', '')}")
+        elapsed = time.perf_counter() - start
+
+        self._write_summary(results, elapsed)
+        failed = [user_id for user_id, result in results.items()
+                  if not result.get('success') and result.get('error') != 'sync_in_progress']
+        if failed:
+            raise CommandError(f"Sync failed for {len(failed)} of {len(results)} users: {', '.join(map(str, sorted(failed)))}.")
+
+    @staticmethod
+    def _sync_user(user_id, per_account=None):
+        """Runs in a pool thread, which has its own database connection to close."""
+        try:
+            return sync_up_transactions_for_user(user_id=user_id, per_account=per_account)
+        finally:
+            connection.close()
+
+    def _write_summary(self, results, elapsed):
+        synced = sum(1 for result in results.values() if result.get('success'))
+        skipped = sum(1 for result in results.values() if result.get('error') == 'sync_in_progress')
+        failed = len(results) - synced - skipped
+        created = sum(result.get('created_count', 0) for result in results.values())
+        duplicates = sum(result.get('duplicate_count', 0) for result in results.values())
+        api = get_api_metrics()['up_api']
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Synced {synced} of {len(results)} users in {elapsed:.1f}s "
+            f"({skipped} already syncing, {failed} failed). "
+            f"Imported {created} new transactions, skipped {duplicates} duplicates."
+        ))
+        self.stdout.write(
+            f"Up API: {api['calls']} calls, {api['retries']} retries, {api['errors']} errors, "
+            f"avg {api['avg_latency_ms']}ms, max {api['max_latency_ms']}ms."
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upintegration',
+            name='sync_resume_url',
+            field=models.TextField(blank=True, help_text='Pagination URL of the next page to fetch when resuming an interrupted sync.', null=True),
+        ),
+        migrations.AddField(
+            model_name='upintegration',
+            name='sync_resume_watermark',
+            field=models.DateTimeField(blank=True, help_text='Newest transaction timestamp stored by the interrupted sync.', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0002_up_integration_sync_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upintegration',
+            name='sync_locked_until',
+            field=models.DateTimeField(blank=True, help_text='Set while a sync is running so that syncs for the same user do not overlap.', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0003_up_integration_sync_lock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upintegration',
+            name='webhook_id',
+            field=models.CharField(blank=True, help_text='ID of the Up webhook registered for this integration.', max_length=255, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='upintegration',
+            name='webhook_secret_encrypted',
+            field=models.TextField(blank=True, help_text='Stores the encrypted secret key used to verify webhook event signatures.', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0004_up_integration_webhook'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upintegration',
+            name='account_watermarks',
+            field=models.JSONField(blank=True, default=dict, help_text='Newest stored transaction timestamp per Up account, used by per-account syncs.'),
+        ),
+    ]
@@ -25,6 +25,44 @@ class UpIntegration(models.Model):
         blank=True,
         help_text="Timestamp of the last successful transaction sync completion."
     )
+    # Checkpoint of an interrupted sync. Up returns pages newest first, so last_synced_at
+    # can only move once the last page is stored; until then the next page URL and the
+    # newest createdAt seen are kept here and the next sync resumes from them.
+    sync_resume_url = models.TextField(
+        null=True,
+        blank=True,
+        help_text="Pagination URL of the next page to fetch when resuming an interrupted sync."
+    )
+    sync_resume_watermark = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Newest transaction timestamp stored by the interrupted sync."
+    )
+    # Per-account sync: {account_id: ISO createdAt of the newest stored transaction}, so each
+    # account is fetched from its own watermark
+    account_watermarks = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Newest stored transaction timestamp per Up account, used by per-account syncs."
+    )
+    sync_locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Set while a sync is running so that syncs for the same user do not overlap."
+    )
+    # Up webhook delivering this user's transaction events (see register_up_webhook)
+    webhook_id = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        unique=True,
+        help_text="ID of the Up webhook registered for this integration."
+    )
+    webhook_secret_encrypted = models.TextField(
+        null=True,
+        blank=True,
+        help_text="Stores the encrypted secret key used to verify webhook event signatures."
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -1,12 +1,24 @@
 # integrations/services.py
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 import requests
+import hashlib
+import hmac
+import json
 import os
 import logging
-from urllib.parse import urljoin, urlencode # Removed unused urlparse, parse_qs
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urljoin, urlencode # Removed unused urlparse, parse_qs
 # from django.conf import settings # Not strictly needed if using os.getenv directly
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException, HTTPError
-from datetime import datetime
+from urllib3.util.retry import Retry
+from datetime import date, datetime
+from typing import Iterator, Tuple
+
+from transactions.models import BASE_CURRENCY_FOR_CONVERSION, HistoricalExchangeRate
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +27,149 @@ UP_API_BASE_URL = os.getenv('UP_API_BASE_URL', 'https://api.up.com.au/api/v1/')
 if not UP_API_BASE_URL.endswith('/'): # Ensure it ends with a slash
     UP_API_BASE_URL += '/'
 
+# --- Shared HTTP session ---
+# Timeouts in seconds: (connect, read)
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+# Keep-alive connections kept per host; sized for concurrent syncs
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '20'))
+# Retries for connection errors, 429 and 5xx responses (idempotent methods only)
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+# Exponential backoff: factor * 2 ** (retry - 1) seconds, capped at HTTP_BACKOFF_MAX
+HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', '0.5'))
+HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', '30'))
+# Longest Retry-After wait honoured; longer requests are cut to this
+HTTP_MAX_RETRY_AFTER = float(os.getenv('HTTP_MAX_RETRY_AFTER', '60'))
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Process-wide limit on Up API requests per second; 0 disables the limit
+UP_API_RATE_LIMIT = float(os.getenv('UP_API_RATE_LIMIT', '0'))
+
+
+class BoundedRetry(Retry):
+    """urllib3 Retry that honours Retry-After headers up to HTTP_MAX_RETRY_AFTER seconds."""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, HTTP_MAX_RETRY_AFTER)
+
+
+class ApiCallMetrics:
+    """Thread-safe call, retry and error counters with latency totals for one external API."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.retries = 0
+            self.total_latency = 0.0
+            self.max_latency = 0.0
+            self.status_codes = Counter()
+
+    def record(self, latency: float, status_code: int = None, retries: int = 0, error: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            self.retries += retries
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            if status_code is not None:
+                self.status_codes[status_code] += 1
+            if error:
+                self.errors += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'retries': self.retries,
+                'avg_latency_ms': round(self.total_latency / self.calls * 1000, 1) if self.calls else 0.0,
+                'max_latency_ms': round(self.max_latency * 1000, 1),
+                'status_codes': dict(self.status_codes),
+            }
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing `rate` acquisitions per second on average, with
+    bursts of up to `burst`. Callers over the limit sleep until their turn.
+    """
+
+    def __init__(self, rate: float = 0, burst: int = 1):
+        self._lock = threading.Lock()
+        self.configure(rate, burst)
+
+    def configure(self, rate: float, burst: int = 1) -> None:
+        with self._lock:
+            self.rate = rate
+            self.burst = max(burst, 1)
+            self._tokens = float(self.burst)
+            self._updated = time.monotonic()
+
+    def acquire(self) -> float:
+        """Wait for a slot; returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1 # A negative balance reserves a future slot
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+def build_http_session(pool_size: int = HTTP_POOL_SIZE, max_retries: int = HTTP_MAX_RETRIES) -> requests.Session:
+    """Session with a sized keep-alive connection pool and retry/backoff on transient failures."""
+    retry = BoundedRetry(
+        total=max_retries,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        backoff_max=HTTP_BACKOFF_MAX,
+        respect_retry_after_header=True,
+        raise_on_status=False, # Hand the final response to raise_for_status
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+http_session = build_http_session()
+up_api_metrics = ApiCallMetrics('up_api')
+up_api_rate_limiter = RateLimiter(UP_API_RATE_LIMIT)
+currency_api_metrics = ApiCallMetrics('currency_api')
+
+
+def get_api_metrics() -> dict:
+    """Counters and latencies of the external API calls made by this process."""
+    return {metrics.name: metrics.snapshot() for metrics in (up_api_metrics, currency_api_metrics)}
+
+
+def _send_request(metrics: ApiCallMetrics, method: str, url: str, **kwargs) -> requests.Response:
+    """Send a request through the shared session, recording latency, retries and errors."""
+    kwargs.setdefault('timeout', (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    start = time.perf_counter()
+    try:
+        response = http_session.request(method, url, **kwargs)
+    except RequestException:
+        metrics.record(time.perf_counter() - start, error=True)
+        raise
+    retry_state = getattr(getattr(response, 'raw', None), 'retries', None)
+    retries = len(retry_state.history) if isinstance(retry_state, Retry) else 0
+    status_code = response.status_code if isinstance(response.status_code, int) else None
+    metrics.record(time.perf_counter() - start, status_code=status_code, retries=retries,
+                   error=status_code is not None and status_code >= 400)
+    return response
+
 def _make_up_request(method: str, endpoint_path: str | None, token: str, params: dict = None, data: dict = None, full_url: str = None):
     """
     Helper function to make requests to the Up API.
@@ -59,7 +214,9 @@ def _make_up_request(method: str, endpoint_path: str | None, token: str, params:
 
     logger.debug(f"Making Up API request: {method} {url} Params: {params} Data: {data is not None}")
     try:
-        response = requests.request(
+        up_api_rate_limiter.acquire()
+        response = _send_request(
+            up_api_metrics,
             method.upper(), # Ensure method is uppercase
             url,
             headers=headers,
@@ -112,79 +269,251 @@ def get_accounts(token: str) -> list:
         return []
 
 
-def get_transactions(token: str, since_iso: str = None, until_iso: str = None, page_size: int = 100) -> list:
+def get_transaction_pages(token: str, since_iso: str = None, until_iso: str = None, page_size: int = 100,
+                          start_url: str = None, account_id: str = None) -> Iterator[Tuple[list, str | None]]:
     """
-    Fetches transactions from the Up API, handling pagination.
+    Fetches transactions from the Up API one page at a time, for all accounts or for one.
 
     Args:
         token (str): Decrypted Up PAT.
         since_iso (str, optional): ISO 8601 timestamp for filtering start date (filter[since]).
         until_iso (str, optional): ISO 8601 timestamp for filtering end date (filter[until]).
         page_size (int, optional): Number of records per page (max 100 for Up).
+        start_url (str, optional): A pagination URL from an earlier fetch to resume from;
+                                   the filters are then taken from the URL.
+        account_id (str, optional): Only fetch this account's transactions
+                                    (accounts/{id}/transactions).
 
-    Returns:
-        list: A list of all transaction data dictionaries fetched.
+    Yields:
+        tuple: (transactions, next_url) for each page, newest transactions first.
+               next_url is None for the last page.
+
+    Raises:
+        HTTPError, RequestException, ValueError: As raised by _make_up_request. Pages
+        already yielded are unaffected.
     """
-    all_transactions = []
     params = {'page[size]': min(page_size, 100)} # Up API max page size is 100
-
     if since_iso:
         params['filter[since]'] = since_iso
     if until_iso:
         params['filter[until]'] = until_iso
 
-    # Construct initial URL using urljoin and urlencode for params
-    # Pass endpoint_path='transactions' to _make_up_request for the first call
-    next_url = None # Will be set by the first response or if no params
+    endpoint_path = f"accounts/{quote(account_id, safe='')}/transactions" if account_id else 'transactions'
+    next_url = start_url
+    page_count = 0
+    logger.info(f"Starting Up transaction fetch from {endpoint_path}. Initial params: {params}. Resuming: {start_url is not None}")
 
-    current_endpoint_path = 'transactions'
-    current_params = params.copy()
+    while True:
+        if next_url: # For subsequent pages, use the full URL from API response
+            logger.debug(f"Fetching transactions from paginated URL: {next_url}")
+            response = _make_up_request(method='GET', endpoint_path=None, token=token, full_url=next_url)
+        else: # For the first page
+            logger.debug(f"Fetching first page of transactions. Params: {params}")
+            response = _make_up_request(method='GET', endpoint_path=endpoint_path, token=token, params=params)
 
+        if not isinstance(response, dict): # Check if response is a dict (expected JSON)
+            logger.error(f"Unexpected response type from Up API: {type(response)}. Content: {str(response)[:200]}")
+            return
 
-    logger.info(f"Starting Up transaction fetch. Initial params: {current_params}")
+        page_count += 1
+        next_url = response.get('links', {}).get('next')
+        transactions_page = response.get('data', [])
+        logger.debug(f"Fetched page {page_count} with {len(transactions_page)} transactions.")
+        yield transactions_page, next_url
+
+        if not next_url:
+            logger.info(f"No next pagination URL found. Transaction fetch complete after {page_count} pages.")
+            return
 
-    while True: # Loop will be controlled by presence of next_url or breaking on error
-        try:
-            if next_url: # For subsequent pages, use the full URL from API response
-                logger.debug(f"Fetching transactions from paginated URL: {next_url}")
-                response = _make_up_request(method='GET', endpoint_path=None, token=token, full_url=next_url)
-            else: # For the first page
-                logger.debug(f"Fetching first page of transactions. Path: {current_endpoint_path}, Params: {current_params}")
-                response = _make_up_request(method='GET', endpoint_path=current_endpoint_path, token=token, params=current_params)
-
-            if not isinstance(response, dict): # Check if response is a dict (expected JSON)
-                logger.error(f"Unexpected response type from Up API: {type(response)}. Content: {str(response)[:200]}")
-                break # Cannot process further
-
-            transactions_page = response.get('data', [])
-            if transactions_page:
-                all_transactions.extend(transactions_page)
-                logger.debug(f"Fetched {len(transactions_page)} transactions this page. Total so far: {len(all_transactions)}")
-            else:
-                 logger.debug("Fetched an empty page of transactions (or no 'data' key).")
-
-            next_url = response.get('links', {}).get('next')
-            if not next_url:
-                logger.info("No next pagination URL found. Transaction fetch complete.")
-                break # Exit loop if no more pages
-
-        except (HTTPError, RequestException, ValueError) as e:
-            logger.error(f"Failed to fetch a transaction page: {type(e).__name__} - {e}")
-            logger.warning(f"Returning partial transaction list ({len(all_transactions)} items) due to error.")
-            break # Exit loop on error
+
+def get_transactions(token: str, since_iso: str = None, until_iso: str = None, page_size: int = 100) -> list:
+    """
+    Fetches transactions from the Up API, handling pagination.
+
+    Args:
+        token (str): Decrypted Up PAT.
+        since_iso (str, optional): ISO 8601 timestamp for filtering start date (filter[since]).
+        until_iso (str, optional): ISO 8601 timestamp for filtering end date (filter[until]).
+        page_size (int, optional): Number of records per page (max 100 for Up).
+
+    Returns:
+        list: A list of all transaction data dictionaries fetched. On an API error the
+              transactions fetched before the error are returned.
+    """
+    all_transactions = []
+    try:
+        for transactions_page, _ in get_transaction_pages(token, since_iso=since_iso, until_iso=until_iso, page_size=page_size):
+            all_transactions.extend(transactions_page)
+    except (HTTPError, RequestException, ValueError) as e:
+        logger.error(f"Failed to fetch a transaction page: {type(e).__name__} - {e}")
+        logger.warning(f"Returning partial transaction list ({len(all_transactions)} items) due to error.")
 
     logger.info(f"Finished transaction fetch. Total transactions retrieved: {len(all_transactions)}")
     return all_transactions
 
+def get_transaction(token: str, transaction_id: str) -> dict:
+    """
+    Fetches a single transaction from the Up API.
+
+    Raises:
+        HTTPError, RequestException, ValueError: As raised by _make_up_request.
+    """
+    response = _make_up_request('GET', f"transactions/{quote(transaction_id, safe='')}", token)
+    if not isinstance(response, dict) or 'data' not in response:
+        raise ValueError(f"Unexpected response for Up transaction {transaction_id}.")
+    return response['data']
+
+
+def create_webhook(token: str, url: str, description: str = 'FundFlow') -> dict:
+    """
+    Registers a webhook with the Up API. The returned data's attributes include the
+    secretKey used to sign events; Up only returns it on creation.
+    """
+    payload = {'data': {'attributes': {'url': url, 'description': description[:64]}}}
+    response = _make_up_request('POST', 'webhooks', token, data=payload)
+    if not isinstance(response, dict) or 'data' not in response:
+        raise ValueError("Unexpected response when creating the Up webhook.")
+    logger.info(f"Created Up webhook {response['data'].get('id')} for {url}.")
+    return response['data']
+
+
+def sign_webhook_body(secret_key: str, body: bytes) -> str:
+    """Up's event signature: hex HMAC-SHA256 of the raw request body keyed with the webhook secret."""
+    return hmac.new(secret_key.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+
+def verify_webhook_signature(secret_key: str, body: bytes, signature: str) -> bool:
+    """Checks an X-Up-Authenticity-Signature header value in constant time."""
+    if not secret_key or not signature:
+        return False
+    return hmac.compare_digest(sign_webhook_body(secret_key, body), signature.strip().lower())
+
 # --- NEW: Currency Exchange Rate Service ---
 # Base URL for the Fawazahmed0 Currency API (using a CDN link)
 # Using 'latest' in the path will ensure we always point to the most recent API version available at this CDN.
 CURRENCY_API_BASE_URL = "https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@latest/v1/"
+# Downloaded rate documents are also kept here when set, one JSON file per day and base currency
+CURRENCY_RATE_CACHE_DIR = os.getenv('CURRENCY_RATE_CACHE_DIR')
+# Days downloaded concurrently by prefetch_exchange_rates
+CURRENCY_RATE_FETCH_WORKERS = int(os.getenv('CURRENCY_RATE_FETCH_WORKERS', '4'))
+# Seconds a stored rate document is trusted to list every currency it will ever list
+CURRENCY_RATE_DOCUMENT_TTL = float(os.getenv('CURRENCY_RATE_DOCUMENT_TTL', '3600'))
+# Stored rates are rounded to HistoricalExchangeRate.rate's decimal places, and must fit its digits
+_rate_field = HistoricalExchangeRate._meta.get_field('rate')
+RATE_QUANTUM = Decimal(1).scaleb(-_rate_field.decimal_places)
+MAX_STORED_RATE = Decimal(1).scaleb(_rate_field.max_digits - _rate_field.decimal_places)
+
+# {(date, base currency): monotonic time stored} for documents this process has downloaded
+# and stored, oldest first; a currency the document does not list is then not downloaded
+# again until the entry expires
+_stored_rate_documents = OrderedDict()
+_stored_rate_documents_lock = threading.Lock()
+
+
+def _remember_stored_document(day: date, base: str) -> None:
+    now = time.monotonic()
+    with _stored_rate_documents_lock:
+        _stored_rate_documents[(day, base)] = now
+        _stored_rate_documents.move_to_end((day, base))
+        while _stored_rate_documents and next(iter(_stored_rate_documents.values())) <= now - CURRENCY_RATE_DOCUMENT_TTL:
+            _stored_rate_documents.popitem(last=False)
+
+
+def _document_recently_stored(day: date, base: str) -> bool:
+    with _stored_rate_documents_lock:
+        stored_at = _stored_rate_documents.get((day, base))
+    return stored_at is not None and stored_at > time.monotonic() - CURRENCY_RATE_DOCUMENT_TTL
+
+
+def fetch_daily_rates(date_str: str, base_currency: str = BASE_CURRENCY_FOR_CONVERSION) -> dict | None:
+    """
+    Fetches the rates document for one day from the Fawazahmed0 Currency API. The document
+    lists 1 unit of base_currency in every currency the API knows.
+
+    Args:
+        date_str (str): The date in 'YYYY-MM-DD' format.
+        base_currency (str): The ISO 4217 code the rates are relative to.
+
+    Returns:
+        dict | None: {upper-case currency code: Decimal rate}, or None if the document
+                     cannot be fetched.
+    """
+    base = base_currency.lower()
+    cache_path = os.path.join(CURRENCY_RATE_CACHE_DIR, f"{date_str}-{base}.json") if CURRENCY_RATE_CACHE_DIR else None
+    data = None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, encoding='utf-8') as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable exchange rate cache file {cache_path}: {e}")
+
+    if data is None:
+        url = urljoin(CURRENCY_API_BASE_URL, f"{date_str}/currencies/{base}.json")
+        logger.debug(f"Fetching {base_currency} exchange rates for {date_str} from {url}")
+        try:
+            response = _send_request(currency_api_metrics, 'GET', url)
+            response.raise_for_status()
+            data = response.json()
+        except HTTPError as e:
+            logger.error(f"HTTP error fetching exchange rates for {date_str} ({base_currency}): {e.response.status_code} - {e.response.text[:200]}")
+            return None
+        except RequestException as e:
+            logger.error(f"Network error fetching exchange rates for {date_str} ({base_currency}): {e}")
+            return None
+        except ValueError as e:
+            logger.error(f"Invalid exchange rate document for {date_str} ({base_currency}): {e}")
+            return None
+        # Documents for past days do not change; today's may still be updated
+        if cache_path and date_str < datetime.now().date().isoformat():
+            try:
+                os.makedirs(CURRENCY_RATE_CACHE_DIR, exist_ok=True)
+                with open(cache_path, 'w', encoding='utf-8') as cache_file:
+                    json.dump(data, cache_file)
+            except OSError as e:
+                logger.warning(f"Could not write exchange rate cache file {cache_path}: {e}")
+
+    rates = {}
+    for code, value in (data.get(base) or {}).items() if isinstance(data, dict) else ():
+        try:
+            rates[code.upper()] = Decimal(str(value))
+        except (ArithmeticError, ValueError):
+            continue
+    logger.info(f"Fetched {len(rates)} {base_currency} exchange rates for {date_str}.")
+    return rates
+
+
+def store_daily_rates(day: date, base_currency: str, rates: dict) -> int:
+    """
+    Stores a day's rates as HistoricalExchangeRate rows in one bulk insert. Rates already
+    stored are left as they are. Returns the number of rates offered to the database.
+    """
+    base = base_currency.upper()
+    rows = []
+    for code, rate in rates.items():
+        if len(code) != 3 or not code.isalpha() or code == base or not 0 < rate < MAX_STORED_RATE:
+            continue # Crypto tokens and other codes that do not fit the model
+        rate = rate.quantize(RATE_QUANTUM, rounding=ROUND_HALF_UP)
+        if rate > 0:
+            rows.append(HistoricalExchangeRate(date=day, source_currency=base, target_currency=code, rate=rate))
+    HistoricalExchangeRate.objects.bulk_create(rows, ignore_conflicts=True, batch_size=500)
+    _remember_stored_document(day, base)
+    return len(rows)
+
+
+def _stored_rates(day: date, base_currency: str, currencies: set) -> dict:
+    return dict(HistoricalExchangeRate.objects.filter(
+        date=day, source_currency=base_currency, target_currency__in=currencies
+    ).values_list('target_currency', 'rate'))
+
 
 def get_historical_exchange_rate(date_str: str, from_currency: str, to_currency: str) -> Decimal | None:
     """
     Fetches the historical exchange rate for a given date, from_currency, and to_currency.
-    Uses the Fawazahmed0 Currency API.
+
+    Rates are read from HistoricalExchangeRate. When the day lacks one of the currencies,
+    the day's whole document is fetched once and all of its rates are stored, so further
+    lookups for that day, in any currency, are answered from the database.
 
     Args:
         date_str (str): The date for the historical rate in 'YYYY-MM-DD' format.
@@ -207,44 +536,70 @@ def get_historical_exchange_rate(date_str: str, from_currency: str, to_currency:
         return None
     # --- END: Future date check ---
 
-    if from_currency.upper() == to_currency.upper():
+    from_code, to_code = from_currency.upper(), to_currency.upper()
+    if from_code == to_code:
         return Decimal("1.0") # Rate is 1 if currencies are the same
 
-    # API endpoint format: /{date}/currencies/{from_currency_lowercase}.json
-    # The API returns rates *relative to* the from_currency.
-    # So, we need to get the rate of to_currency_lowercase based on from_currency_lowercase.
-    endpoint = f"{date_str}/currencies/{from_currency.lower()}.json"
-    url = urljoin(CURRENCY_API_BASE_URL, endpoint)
+    # Stored rates are relative to the base currency: from -> to is (base -> to) / (base -> from)
+    base = BASE_CURRENCY_FOR_CONVERSION
+    needed = {from_code, to_code} - {base}
+    rates = _stored_rates(request_date, base, needed)
+    if needed - rates.keys() and not _document_recently_stored(request_date, base):
+        daily_rates = fetch_daily_rates(date_str, base)
+        if daily_rates is not None:
+            store_daily_rates(request_date, base, daily_rates)
+            rates = _stored_rates(request_date, base, needed)
+
+    missing = needed - rates.keys()
+    if missing:
+        logger.warning(f"No {base} exchange rate for {', '.join(sorted(missing))} on {date_str}.")
+        return None
+    rates[base] = Decimal('1')
+    # Not rounded: a cross rate between two stored rates is kept at full Decimal precision
+    rate = rates[to_code] / rates[from_code]
+    logger.info(f"Exchange rate {from_code}->{to_code} on {date_str}: {rate}")
+    return rate
 
-    logger.debug(f"Fetching exchange rate: {from_currency} to {to_currency} for date {date_str} from {url}")
 
-    try:
-        response = requests.get(url, timeout=10) # Add a timeout
-        response.raise_for_status() # Check for HTTP errors
-        data = response.json()
-
-        # The actual rates are nested under the 'from_currency' key in the response
-        # e.g. if from_currency is 'eur', data['eur']['aud'] gives EUR to AUD rate
-        rate_value = data.get(from_currency.lower(), {}).get(to_currency.lower())
+def prefetch_exchange_rates(days, currencies=None, base_currency: str = BASE_CURRENCY_FOR_CONVERSION,
+                            max_workers: int = CURRENCY_RATE_FETCH_WORKERS) -> dict:
+    """
+    Fetches and stores the rate documents of the given days, several days at a time.
 
-        if rate_value is not None:
-            try:
-                rate = Decimal(str(rate_value)) # Convert to Decimal robustly
-                logger.info(f"Fetched rate {from_currency}->{to_currency} on {date_str}: {rate}")
-                return rate
-            except Exception: # Handle potential conversion error for rate_value
-                logger.error(f"Could not convert rate value '{rate_value}' to Decimal.")
-                return None
-        else:
-            logger.warning(f"Rate for {to_currency.lower()} not found in response for base {from_currency.lower()} on {date_str}. Response data: {data}")
-            return None
+    Days whose stored rates already cover `currencies` (any rate at all when currencies is
+    None) and future days are skipped, so a backfill costs at most one request per day.
+    Downloads run in a thread pool; rows are written from the calling thread.
 
-    except RequestException as e:
-        logger.error(f"Network error fetching exchange rate for {date_str}, {from_currency}->{to_currency}: {e}")
-        return None
-    except HTTPError as e:
-        logger.error(f"HTTP error fetching exchange rate for {date_str}, {from_currency}->{to_currency}: {e.response.status_code} - {e.response.text[:200]}")
-        return None
-    except Exception as e: # Catch any other errors like JSONDecodeError
-        logger.exception(f"Unexpected error fetching exchange rate for {date_str}, {from_currency}->{to_currency}: {e}")
-        return None
\ No newline at end of file
+    Returns:
+        dict: {'days': days requested, 'fetched': documents stored, 'failed': ISO dates that
+               could not be fetched, 'rates_stored': rates offered to the database}.
+    """
+    base = base_currency.upper()
+    today = datetime.now().date()
+    days = sorted({day for day in days if day <= today})
+    wanted = {code.upper() for code in currencies} - {base} if currencies else None
+
+    covered = {}
+    if days:
+        stored = HistoricalExchangeRate.objects.filter(source_currency=base, date__range=(days[0], days[-1]))
+        if wanted:
+            stored = stored.filter(target_currency__in=wanted)
+        for day, code in stored.values_list('date', 'target_currency').distinct():
+            covered.setdefault(day, set()).add(code)
+    to_fetch = [
+        day for day in days
+        if not _document_recently_stored(day, base) and (wanted - covered.get(day, set()) if wanted else not covered.get(day))
+    ]
+
+    summary = {'days': len(days), 'fetched': 0, 'failed': [], 'rates_stored': 0}
+    if not to_fetch:
+        return summary
+    logger.info(f"Prefetching {base} exchange rates for {len(to_fetch)} of {len(days)} days with {max_workers} workers.")
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for day, rates in zip(to_fetch, executor.map(lambda day: fetch_daily_rates(day.isoformat(), base), to_fetch)):
+            if rates is None:
+                summary['failed'].append(day.isoformat())
+                continue
+            summary['rates_stored'] += store_daily_rates(day, base, rates)
+            summary['fetched'] += 1
+    return summary
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from integrations import services
+from integrations.fake_up_api import FakeUpApi, serve_fake_up_api
+from integrations.logic import sync_up_transactions_for_user
+from integrations.models import UpIntegration
+from transactions.models import Transaction
+
+User = get_user_model()
+
+
+class FakeUpApiSyncTests(TestCase):
+    """End-to-end syncs over HTTP against the local fake Up API."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='fake_up_user', password='password')
+        self.integration = UpIntegration.objects.create(user=self.user, personal_access_token_encrypted='fake_encrypted_token')
+        decrypt_patcher = mock.patch('integrations.logic.decrypt_token', return_value='up:fake:token')
+        decrypt_patcher.start()
+        self.addCleanup(decrypt_patcher.stop)
+
+    def _sync(self, app, **kwargs):
+        with serve_fake_up_api(app) as base_url, mock.patch.object(services, 'UP_API_BASE_URL', base_url):
+            return sync_up_transactions_for_user(self.user.id, **kwargs)
+
+    def test_paginated_sync_imports_every_transaction(self):
+        app = FakeUpApi(250, foreign_ratio=0.5, error_rate=0.05, seed=3)
+        result = self._sync(app, initial_sync=True, since_date_str='2000-01-01')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['created_count'], 250)
+        self.assertEqual(Transaction.objects.filter(user=self.user, source='up_bank').count(), 250)
+        self.assertTrue(Transaction.objects.filter(user=self.user).exclude(original_currency='AUD').exists())
+        self.integration.refresh_from_db()
+        self.assertEqual(self.integration.last_synced_at, app.created_at(0))
+
+    def test_incremental_sync_only_fetches_new_transactions(self):
+        now = datetime.now(timezone.utc)
+        self.integration.last_synced_at = now - timedelta(minutes=30)
+        self.integration.save()
+        result = self._sync(FakeUpApi(1000, now=now))
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['created_count'], 5) # One transaction every 7 minutes
+        self.assertEqual(result['duplicate_count'], 0)
+
+    def test_per_account_sync_imports_every_account(self):
+        app = FakeUpApi(250, accounts=3, error_rate=0.05, seed=5)
+        result = self._sync(app, initial_sync=True, since_date_str='2000-01-01', per_account=True)
+
+        self.assertTrue(result['success'], result['message'])
+        self.assertEqual(result['created_count'], 250)
+        self.integration.refresh_from_db()
+        self.assertEqual(self.integration.account_watermarks, {
+            account_id: app.created_at(position).isoformat() for position, account_id in enumerate(app.account_ids)
+        })
+        self.assertEqual(self.integration.last_synced_at, app.created_at(0))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_up_sync', sizes='120', stdout=out)
+
+        self.assertIn('120', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='up_benchmark_').exists())
@@ -8,7 +8,7 @@ from django.contrib.auth import get_user_model
 from requests import HTTPError
 
 from integrations.models import UpIntegration
-from integrations.logic import sync_up_transactions_for_user, DEFAULT_INITIAL_SYNC_DAYS, BASE_CURRENCY_FOR_CONVERSION
+from integrations.logic import sync_up_transactions_for_user, acquire_sync_lock, DEFAULT_INITIAL_SYNC_DAYS, BASE_CURRENCY_FOR_CONVERSION
 from transactions.models import Transaction # Import your app's Transaction model
 
 User = get_user_model()
@@ -60,7 +60,7 @@ class SyncUpTransactionsLogicTests(TestCase):
         self.mock_decrypt.return_value = "decrypted_pat_token" # Ensure this mock is active
 
         # We don't need get_historical_rate anymore since we use actual AUD amounts
-        self.get_up_transactions_patcher = mock.patch('integrations.logic.get_up_transactions')
+        self.get_up_transactions_patcher = mock.patch('integrations.logic.get_up_transaction_pages')
         self.mock_get_up_transactions = self.get_up_transactions_patcher.start()
 
     def tearDown(self):
@@ -138,7 +138,7 @@ class SyncUpTransactionsLogicTests(TestCase):
         mock_api_tx = [
             create_mock_up_transaction("up-tx-1", now_iso, -1000, description="Coffee AUD"),  # AUD domestic transaction
         ]
-        self.mock_get_up_transactions.return_value = mock_api_tx
+        self.mock_get_up_transactions.return_value = [(mock_api_tx, None)]
 
         result = sync_up_transactions_for_user(user_id=self.user.id, initial_sync=True)
 
@@ -177,7 +177,7 @@ class SyncUpTransactionsLogicTests(TestCase):
                 "Souvenir EUR"
             ),
         ]
-        self.mock_get_up_transactions.return_value = mock_api_tx
+        self.mock_get_up_transactions.return_value = [(mock_api_tx, None)]
 
         result = sync_up_transactions_for_user(user_id=self.user.id, initial_sync=True)
 
@@ -216,7 +216,7 @@ class SyncUpTransactionsLogicTests(TestCase):
             create_mock_up_transaction("up-tx-existing", now_iso, -500, description="Existing From API"), # Duplicate
             create_mock_up_transaction("up-tx-new", now_iso, -2000, description="New From API"),
         ]
-        self.mock_get_up_transactions.return_value = mock_api_tx
+        self.mock_get_up_transactions.return_value = [(mock_api_tx, None)]
 
         result = sync_up_transactions_for_user(user_id=self.user.id, initial_sync=True)
         self.assertTrue(result['success'])
@@ -225,6 +225,32 @@ class SyncUpTransactionsLogicTests(TestCase):
         self.assertEqual(Transaction.objects.count(), 2) # 1 existing + 1 new
         self.assertTrue(Transaction.objects.filter(bank_transaction_id="up-tx-new").exists())
 
+    def test_sync_skips_transactions_stored_by_a_webhook_during_the_page(self):
+        self._create_integration()
+        now_iso = datetime.now(timezone.utc).isoformat()
+        mock_api_tx = [
+            create_mock_up_transaction("up-tx-webhook", now_iso, -500, description="Stored By Webhook"),
+            create_mock_up_transaction("up-tx-new", now_iso, -2000, description="New From API"),
+        ]
+        self.mock_get_up_transactions.return_value = [(mock_api_tx, None)]
+        from integrations import logic
+        build = logic._build_up_transaction
+
+        def build_while_a_webhook_stores_it(user, tx_data):
+            # The webhook stores the row after the page's duplicate check
+            if tx_data['id'] == "up-tx-webhook":
+                build(user, tx_data).save()
+            return build(user, tx_data)
+
+        with mock.patch('integrations.logic._build_up_transaction', side_effect=build_while_a_webhook_stores_it):
+            result = sync_up_transactions_for_user(user_id=self.user.id, initial_sync=True)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['created_count'], 1)
+        self.assertEqual(result['duplicate_count'], 1)
+        self.assertEqual(Transaction.objects.filter(bank_transaction_id="up-tx-webhook").count(), 1)
+        self.assertTrue(Transaction.objects.filter(bank_transaction_id="up-tx-new").exists())
+
     def test_sync_converts_foreign_currency(self):
         """This test name is now misleading - we don't convert anymore, we use Up Bank's actual AUD amounts."""
         integration = self._create_integration()
@@ -242,7 +268,7 @@ class SyncUpTransactionsLogicTests(TestCase):
                 "Souvenir EUR"
             ),
         ]
-        self.mock_get_up_transactions.return_value = mock_api_tx
+        self.mock_get_up_transactions.return_value = [(mock_api_tx, None)]
 
         result = sync_up_transactions_for_user(user_id=self.user.id, initial_sync=True)
 
@@ -281,7 +307,7 @@ class SyncUpTransactionsLogicTests(TestCase):
                 "Lunch JPY"
             ),
         ]
-        self.mock_get_up_transactions.return_value = mock_api_tx
+        self.mock_get_up_transactions.return_value = [(mock_api_tx, None)]
 
         result = sync_up_transactions_for_user(user_id=self.user.id, initial_sync=True)
 
@@ -320,4 +346,160 @@ class SyncUpTransactionsLogicTests(TestCase):
         self.assertEqual(result['created_count'], 0)
         integration.refresh_from_db()
         # last_synced_at should be updated to around the time the sync ran
-        self.assertTrue(before_sync_call_time <= integration.last_synced_at <= after_sync_call_time)
\ No newline at end of file
+        self.assertTrue(before_sync_call_time <= integration.last_synced_at <= after_sync_call_time)
+
+    def test_sync_stores_each_page_as_it_arrives(self):
+        self._create_integration()
+        newer = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+        older = (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()
+
+        def pages(token, **kwargs):
+            yield [create_mock_up_transaction("up-tx-1", newer, -1000)], "https://api.up.com.au/api/v1/transactions?page[after]=c1"
+            # The first page is committed before the next one is fetched
+            self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+            yield [create_mock_up_transaction("up-tx-2", older, -2000)], None
+        self.mock_get_up_transactions.side_effect = pages
+
+        result = sync_up_transactions_for_user(user_id=self.user.id, initial_sync=True)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['created_count'], 2)
+        integration = UpIntegration.objects.get(user=self.user)
+        self.assertEqual(integration.last_synced_at, datetime.fromisoformat(newer))
+        self.assertIsNone(integration.sync_resume_url)
+
+    def test_sync_failure_keeps_stored_pages_and_checkpoints(self):
+        self._create_integration()
+        newer = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+        next_url = "https://api.up.com.au/api/v1/transactions?page[after]=c1"
+        error_response = mock.Mock(status_code=503, text='Service Unavailable')
+
+        def pages(token, **kwargs):
+            yield [create_mock_up_transaction("up-tx-1", newer, -1000)], next_url
+            raise HTTPError(response=error_response)
+        self.mock_get_up_transactions.side_effect = pages
+
+        result = sync_up_transactions_for_user(user_id=self.user.id, initial_sync=True)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'api_http_error')
+        self.assertEqual(result['created_count'], 1)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+        integration = UpIntegration.objects.get(user=self.user)
+        # Older pages are still missing, so last_synced_at must not move yet
+        self.assertIsNone(integration.last_synced_at)
+        self.assertEqual(integration.sync_resume_url, next_url)
+        self.assertEqual(integration.sync_resume_watermark, datetime.fromisoformat(newer))
+
+    def test_sync_resumes_from_checkpoint(self):
+        watermark = datetime.now(timezone.utc) - timedelta(days=1)
+        next_url = "https://api.up.com.au/api/v1/transactions?page[after]=c1"
+        integration = self._create_integration()
+        integration.sync_resume_url = next_url
+        integration.sync_resume_watermark = watermark
+        integration.save()
+        older = (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()
+        self.mock_get_up_transactions.return_value = [([create_mock_up_transaction("up-tx-2", older, -2000)], None)]
+
+        result = sync_up_transactions_for_user(user_id=self.user.id)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(self.mock_get_up_transactions.call_args[1]['start_url'], next_url)
+        integration.refresh_from_db()
+        self.assertEqual(integration.last_synced_at, watermark)
+        self.assertIsNone(integration.sync_resume_url)
+        self.assertIsNone(integration.sync_resume_watermark)
+
+
+    def test_overlapping_sync_is_rejected(self):
+        integration = self._create_integration()
+        self.assertTrue(acquire_sync_lock(self.user.id))
+        self.assertFalse(acquire_sync_lock(self.user.id))
+
+        result = sync_up_transactions_for_user(user_id=self.user.id)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'sync_in_progress')
+        self.mock_get_up_transactions.assert_not_called()
+
+        # A lock left behind by a crashed sync expires
+        integration.sync_locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+        integration.save(update_fields=['sync_locked_until'])
+        self.mock_get_up_transactions.return_value = []
+        self.assertTrue(sync_up_transactions_for_user(user_id=self.user.id)['success'])
+        integration.refresh_from_db()
+        self.assertIsNone(integration.sync_locked_until)
+
+
+    def _mock_account_pages(self, pages_by_account):
+        """Serve get_up_transaction_pages per account; a value that is an exception is raised."""
+        def pages(token, since_iso=None, until_iso=None, account_id=None, **kwargs):
+            account_pages = pages_by_account[account_id]
+            if isinstance(account_pages, Exception):
+                raise account_pages
+            return iter([(page, None) for page in account_pages])
+        self.mock_get_up_transactions.side_effect = pages
+
+    @mock.patch('integrations.logic.get_up_accounts')
+    def test_per_account_sync_merges_accounts_and_records_watermarks(self, mock_get_accounts):
+        integration = self._create_integration(last_synced_at=datetime(2024, 5, 1, tzinfo=timezone.utc))
+        mock_get_accounts.return_value = [{'id': 'spending'}, {'id': 'saver'}]
+        shared = create_mock_up_transaction('up-tx-shared', '2024-05-02T09:00:00+00:00', -500)
+        self._mock_account_pages({
+            'spending': [[create_mock_up_transaction('up-tx-1', '2024-05-03T10:00:00+00:00', -1000), shared],
+                         [create_mock_up_transaction('up-tx-2', '2024-05-02T08:00:00+00:00', -2000)]],
+            'saver': [[shared, create_mock_up_transaction('up-tx-3', '2024-05-04T12:00:00+00:00', 5000)]],
+        })
+
+        result = sync_up_transactions_for_user(user_id=self.user.id, per_account=True)
+
+        self.assertTrue(result['success'], result['message'])
+        self.assertEqual(result['created_count'], 4)
+        self.assertEqual(result['duplicate_count'], 1) # The transaction listed under both accounts
+        self.assertEqual(Transaction.objects.filter(user=self.user, source='up_bank').count(), 4)
+        for call in self.mock_get_up_transactions.call_args_list:
+            self.assertEqual(call.kwargs['since_iso'], '2024-05-01T00:00:01+00:00')
+        integration.refresh_from_db()
+        self.assertEqual(integration.account_watermarks, {
+            'spending': '2024-05-03T10:00:00+00:00', 'saver': '2024-05-04T12:00:00+00:00',
+        })
+        self.assertEqual(integration.last_synced_at, datetime(2024, 5, 4, 12, tzinfo=timezone.utc))
+
+        # The next sync fetches each account from its own watermark
+        self._mock_account_pages({'spending': [[]], 'saver': [[]]})
+        sync_up_transactions_for_user(user_id=self.user.id, per_account=True)
+        since_by_account = {call.kwargs['account_id']: call.kwargs['since_iso']
+                            for call in self.mock_get_up_transactions.call_args_list[-2:]}
+        self.assertEqual(since_by_account, {
+            'spending': '2024-05-03T10:00:01+00:00', 'saver': '2024-05-04T12:00:01+00:00',
+        })
+
+    @mock.patch('integrations.logic.get_up_accounts')
+    def test_per_account_sync_failure_keeps_other_accounts_watermarks(self, mock_get_accounts):
+        integration = self._create_integration(last_synced_at=datetime(2024, 5, 1, tzinfo=timezone.utc))
+        mock_get_accounts.return_value = [{'id': 'spending'}, {'id': 'saver'}]
+        error_response = mock.Mock(status_code=503, text='Service Unavailable')
+        self._mock_account_pages({
+            'spending': [[create_mock_up_transaction('up-tx-1', '2024-05-03T10:00:00+00:00', -1000)]],
+            'saver': HTTPError(response=error_response),
+        })
+
+        result = sync_up_transactions_for_user(user_id=self.user.id, per_account=True)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'api_http_error')
+        self.assertEqual(result['created_count'], 1)
+        integration.refresh_from_db()
+        self.assertEqual(integration.account_watermarks, {'spending': '2024-05-03T10:00:00+00:00'})
+        self.assertEqual(integration.last_synced_at, datetime(2024, 5, 1, tzinfo=timezone.utc))
+
+    @mock.patch('integrations.logic.get_up_accounts')
+    def test_per_account_sync_falls_back_to_global_endpoint(self, mock_get_accounts):
+        self._create_integration()
+        mock_get_accounts.return_value = [] # Accounts could not be listed
+        self.mock_get_up_transactions.return_value = [([create_mock_up_transaction('up-tx-1', '2024-05-03T10:00:00+00:00', -1000)], None)]
+
+        result = sync_up_transactions_for_user(user_id=self.user.id, per_account=True)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['created_count'], 1)
+        self.assertNotIn('account_id', self.mock_get_up_transactions.call_args.kwargs)
@@ -1,6 +1,14 @@
 # integrations/tests/test_services.py
 import os
+import tempfile
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest import mock # For mocking requests
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase, override_settings
 from requests.exceptions import HTTPError, RequestException
 
@@ -10,8 +18,20 @@ from ..services import (
     verify_token,
     get_accounts,
     get_transactions,
-    UP_API_BASE_URL # Import this to potentially override for testing
+    UP_API_BASE_URL, # Import this to potentially override for testing
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    BoundedRetry,
+    RateLimiter,
+    build_http_session,
+    get_api_metrics,
+    up_api_metrics,
+    currency_api_metrics,
+    get_historical_exchange_rate,
+    prefetch_exchange_rates,
 )
+from .. import services
+from transactions.models import HistoricalExchangeRate, Transaction
 
 # Define a consistent test token
 TEST_UP_PAT = "fake_personal_access_token_for_testing"
@@ -22,7 +42,7 @@ TEST_UP_PAT = "fake_personal_access_token_for_testing"
 class UpApiServiceTests(TestCase):
 
     # === Tests for _make_up_request ===
-    @mock.patch('integrations.services.requests.request') # Target where 'requests' is used
+    @mock.patch('integrations.services.http_session.request') # Requests go through the shared session
     def test_make_up_request_success(self, mock_request):
         mock_response = mock.Mock()
         mock_response.status_code = 200
@@ -37,10 +57,11 @@ class UpApiServiceTests(TestCase):
             f"{UP_API_BASE_URL}test/endpoint", # Ensure UP_API_BASE_URL is correctly used
             headers={'Authorization': f'Bearer {TEST_UP_PAT}', 'Accept': 'application/json'},
             params=None,
-            json=None
+            json=None,
+            timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
         )
 
-    @mock.patch('integrations.services.requests.request')
+    @mock.patch('integrations.services.http_session.request')
     def test_make_up_request_http_error(self, mock_request):
         mock_response = mock.Mock()
         mock_response.status_code = 401
@@ -51,7 +72,7 @@ class UpApiServiceTests(TestCase):
         with self.assertRaises(HTTPError):
             _make_up_request('GET', 'test/endpoint', TEST_UP_PAT)
 
-    @mock.patch('integrations.services.requests.request')
+    @mock.patch('integrations.services.http_session.request')
     def test_make_up_request_network_error(self, mock_request):
         mock_request.side_effect = RequestException("Network error")
         with self.assertRaises(RequestException):
@@ -155,4 +176,188 @@ class UpApiServiceTests(TestCase):
         transactions = get_transactions(TEST_UP_PAT, page_size=2)
         # Should return partially fetched transactions
         self.assertEqual(len(transactions), 2)
-        self.assertEqual(transactions[0]['id'], 'tx1')
\ No newline at end of file
+        self.assertEqual(transactions[0]['id'], 'tx1')
+
+class _FlakyUpHandler(BaseHTTPRequestHandler):
+    """Answers 429 (Retry-After: 0) for the first request and 200 afterwards, on one keep-alive connection."""
+    protocol_version = 'HTTP/1.1'
+    requests_seen = 0
+    client_ports = set()
+
+    def do_GET(self):
+        type(self).requests_seen += 1
+        type(self).client_ports.add(self.client_address[1])
+        if type(self).requests_seen == 1:
+            body, status_code, extra_headers = b'{}', 429, {'Retry-After': '0'}
+        else:
+            body, status_code, extra_headers = b'{"meta": {"id": "ping"}}', 200, {}
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in extra_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpSessionTests(TestCase):
+    """Tests for the pooled session: retries, Retry-After and call metrics."""
+
+    def setUp(self):
+        _FlakyUpHandler.requests_seen = 0
+        _FlakyUpHandler.client_ports = set()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _FlakyUpHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        up_api_metrics.reset()
+
+    def test_429_is_retried_and_connections_are_reused(self):
+        with mock.patch('integrations.services.http_session', build_http_session()):
+            first = _make_up_request('GET', None, TEST_UP_PAT, full_url=f"{self.base_url}util/ping")
+            second = _make_up_request('GET', None, TEST_UP_PAT, full_url=f"{self.base_url}util/ping")
+
+        self.assertEqual(first, {"meta": {"id": "ping"}})
+        self.assertEqual(second, first)
+        self.assertEqual(_FlakyUpHandler.requests_seen, 3)
+        self.assertEqual(len(_FlakyUpHandler.client_ports), 1) # One keep-alive connection for all requests
+        metrics = get_api_metrics()['up_api']
+        self.assertEqual(metrics['calls'], 2)
+        self.assertEqual(metrics['retries'], 1)
+        self.assertEqual(metrics['errors'], 0)
+
+    def test_retry_after_is_capped(self):
+        response = mock.Mock(headers={'Retry-After': '3600'})
+        with mock.patch('integrations.services.HTTP_MAX_RETRY_AFTER', 5):
+            self.assertEqual(BoundedRetry(total=1).get_retry_after(response), 5)
+
+
+class RateLimiterTests(TestCase):
+
+    def test_requests_over_the_burst_wait_for_a_slot(self):
+        limiter = RateLimiter(rate=50, burst=2)
+        waits = [limiter.acquire() for _ in range(4)]
+
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertGreater(waits[2], 0)
+        self.assertGreater(waits[3], 0)
+
+    def test_zero_rate_disables_the_limit(self):
+        limiter = RateLimiter(rate=0)
+        self.assertEqual(sum(limiter.acquire() for _ in range(100)), 0.0)
+
+
+def _rates_response(day_rates):
+    """Fake http_session.request serving {date_str: {code: rate}} documents relative to AUD."""
+    def request(method, url, **kwargs):
+        date_str = url.split('/')[-3]
+        response = mock.Mock(status_code=200 if date_str in day_rates else 404, text='')
+        response.json.return_value = {'date': date_str, 'aud': day_rates.get(date_str, {})}
+        response.raise_for_status.side_effect = None if date_str in day_rates else HTTPError(response=response)
+        return response
+    return request
+
+
+class ExchangeRateFetchTests(TestCase):
+    """Tests for the whole-day currency rate fetcher."""
+
+    DAY_RATES = {'usd': 0.65, 'eur': 0.6, 'jpy': 97.5, '1inch': 3.2, 'btc': 1e-10}
+
+    def setUp(self):
+        services._stored_rate_documents.clear()
+        self.addCleanup(services._stored_rate_documents.clear)
+        currency_api_metrics.reset()
+        patcher = mock.patch('integrations.services.http_session.request')
+        self.mock_request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_fetch_stores_the_whole_day(self):
+        self.mock_request.side_effect = _rates_response({'2024-03-01': self.DAY_RATES})
+
+        self.assertEqual(get_historical_exchange_rate('2024-03-01', 'USD', 'AUD'), 1 / Decimal('0.65'))
+        self.assertEqual(get_historical_exchange_rate('2024-03-01', 'EUR', 'USD'), Decimal('0.65') / Decimal('0.6'))
+        self.assertEqual(get_historical_exchange_rate('2024-03-01', 'AUD', 'JPY'), Decimal('97.5'))
+        # A currency the document does not list is not fetched again
+        self.assertIsNone(get_historical_exchange_rate('2024-03-01', 'XYZ', 'AUD'))
+
+        self.assertEqual(self.mock_request.call_count, 1)
+        self.assertTrue(self.mock_request.call_args[0][1].endswith('2024-03-01/currencies/aud.json'))
+        self.assertEqual(
+            set(HistoricalExchangeRate.objects.filter(date=date(2024, 3, 1)).values_list('target_currency', flat=True)),
+            {'USD', 'EUR', 'JPY'}, # Codes and rates that do not fit the model are dropped
+        )
+
+    def test_stored_rates_are_used_without_fetching(self):
+        HistoricalExchangeRate.objects.create(date=date(2024, 3, 1), source_currency='AUD', target_currency='USD', rate=Decimal('0.5'))
+
+        self.assertEqual(get_historical_exchange_rate('2024-03-01', 'AUD', 'USD'), Decimal('0.5'))
+        self.mock_request.assert_not_called()
+
+    def test_prefetch_fetches_each_missing_day_once(self):
+        days = [date(2024, 3, 1) + timedelta(days=offset) for offset in range(5)]
+        self.mock_request.side_effect = _rates_response({day.isoformat(): self.DAY_RATES for day in days[:4]})
+        HistoricalExchangeRate.objects.create(date=days[0], source_currency='AUD', target_currency='EUR', rate=Decimal('0.6'))
+
+        summary = prefetch_exchange_rates(days + [date.today() + timedelta(days=1)], currencies=['eur'], max_workers=3)
+
+        self.assertEqual(summary['days'], 5) # The future day is skipped
+        self.assertEqual(summary['fetched'], 3)
+        self.assertEqual(summary['failed'], ['2024-03-05'])
+        self.assertEqual(self.mock_request.call_count, 4)
+        self.assertEqual(HistoricalExchangeRate.objects.filter(target_currency='USD').count(), 3)
+
+        # Fetched days are not fetched again
+        prefetch_exchange_rates(days[:4], currencies=['EUR', 'USD'])
+        self.assertEqual(self.mock_request.call_count, 5) # Only the first day still lacked USD
+
+    def test_documents_are_cached_on_disk(self):
+        self.mock_request.side_effect = _rates_response({'2024-03-01': self.DAY_RATES})
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch('integrations.services.CURRENCY_RATE_CACHE_DIR', cache_dir):
+            self.assertIsNotNone(get_historical_exchange_rate('2024-03-01', 'USD', 'AUD'))
+            HistoricalExchangeRate.objects.all().delete()
+            services._stored_rate_documents.clear()
+
+            self.assertEqual(get_historical_exchange_rate('2024-03-01', 'USD', 'AUD'), 1 / Decimal('0.65'))
+        self.assertEqual(self.mock_request.call_count, 1)
+
+    def test_cross_rates_keep_full_precision(self):
+        self.mock_request.side_effect = _rates_response({'2024-03-01': self.DAY_RATES})
+
+        rate = get_historical_exchange_rate('2024-03-01', 'JPY', 'AUD')
+
+        self.assertEqual(rate, 1 / Decimal('97.5'))
+        self.assertEqual(Decimal('1000000') * rate, Decimal('10256.41025641025641025641026'))
+
+    def test_unlisted_currencies_are_fetched_again_once_the_document_expires(self):
+        self.mock_request.side_effect = _rates_response({'2024-03-01': self.DAY_RATES})
+        with mock.patch('integrations.services.time.monotonic', return_value=1000.0):
+            self.assertIsNone(get_historical_exchange_rate('2024-03-01', 'XYZ', 'AUD'))
+            self.assertIsNone(get_historical_exchange_rate('2024-03-01', 'XYZ', 'AUD'))
+        self.assertEqual(self.mock_request.call_count, 1)
+
+        with mock.patch('integrations.services.time.monotonic', return_value=1000.0 + services.CURRENCY_RATE_DOCUMENT_TTL + 1):
+            self.assertIsNone(get_historical_exchange_rate('2024-03-01', 'XYZ', 'AUD'))
+            # Storing the new document dropped the expired entry
+            self.assertEqual(len(services._stored_rate_documents), 1)
+        self.assertEqual(self.mock_request.call_count, 2)
+
+    def test_command_backfills_missing_conversions(self):
+        user = get_user_model().objects.create_user(username='rates_user', password='password')
+        for offset in range(3):
+            Transaction.objects.create(
+                user=user, transaction_date=date(2024, 3, 1), description=f"Cafe {offset}",
+                original_amount=Decimal('10.00'), original_currency='USD', direction='DEBIT',
+            )
+        Transaction.objects.filter(user=user).update(aud_amount=None, exchange_rate_to_aud=None)
+        self.mock_request.side_effect = _rates_response({'2024-03-01': self.DAY_RATES})
+        out = StringIO()
+
+        call_command('fetch_exchange_rates', missing=True, stdout=out)
+
+        self.assertEqual(self.mock_request.call_count, 1)
+        self.assertIn('Converted 3 transactions', out.getvalue())
+        self.assertEqual(set(Transaction.objects.filter(user=user).values_list('aud_amount', flat=True)), {Decimal('15.38')})
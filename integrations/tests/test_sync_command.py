@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from integrations.models import UpIntegration
+from transactions.models import Transaction
+from .test_logic import create_mock_up_transaction
+
+User = get_user_model()
+
+
+class SyncAllUpIntegrationsCommandTests(TransactionTestCase):
+    """
+    Tests for the concurrent multi-user sync command. Pool threads need committed data, and
+    SQLite's shared-cache test database locks tables between concurrent writers, so the
+    tests run a single pool thread.
+    """
+
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f"sync_all_{i}", password='password') for i in range(3)]
+        for user in self.users:
+            UpIntegration.objects.create(user=user, personal_access_token_encrypted='fake_encrypted_token')
+        decrypt_patcher = mock.patch('integrations.logic.decrypt_token', return_value='decrypted_pat_token')
+        decrypt_patcher.start()
+        self.addCleanup(decrypt_patcher.stop)
+        created_at = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+        pages_patcher = mock.patch(
+            'integrations.logic.get_up_transaction_pages',
+            side_effect=lambda token, **kwargs: iter([([create_mock_up_transaction('up-tx-1', created_at, -1000)], None)])
+        )
+        pages_patcher.start()
+        self.addCleanup(pages_patcher.stop)
+
+    def test_all_users_are_synced(self):
+        out = StringIO()
+        call_command('sync_all_up_integrations', workers=1, rate_limit=0, stdout=out)
+
+        self.assertIn('Synced 3 of 3 users', out.getvalue())
+        self.assertIn('Imported 3 new transactions', out.getvalue())
+        for user in self.users:
+            self.assertEqual(Transaction.objects.filter(user=user).count(), 1)
+        self.assertFalse(UpIntegration.objects.filter(sync_locked_until__isnull=False).exists())
+
+    def test_user_with_running_sync_is_skipped(self):
+        UpIntegration.objects.filter(user=self.users[0]).update(
+            sync_locked_until=datetime.now(timezone.utc) + timedelta(minutes=5)
+        )
+        out = StringIO()
+        call_command('sync_all_up_integrations', workers=1, stdout=out)
+
+        self.assertIn('Synced 2 of 3 users', out.getvalue())
+        self.assertIn('1 already syncing', out.getvalue())
+        self.assertEqual(Transaction.objects.filter(user=self.users[0]).count(), 0)
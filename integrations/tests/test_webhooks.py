@@ -0,0 +1,118 @@
+import json
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from integrations.models import UpIntegration
+from integrations.services import get_transaction, sign_webhook_body
+from integrations.utils import encrypt_token
+from transactions.import_jobs import claim_next_job, run_job
+from transactions.models import ImportJob, Transaction
+from .test_logic import create_mock_up_transaction
+
+User = get_user_model()
+
+WEBHOOK_SECRET = 'sample-webhook-secret'
+
+
+def webhook_event(event_type, transaction_id=None, webhook_id='webhook-1'):
+    relationships = {'webhook': {'data': {'type': 'webhooks', 'id': webhook_id}}}
+    if transaction_id:
+        relationships['transaction'] = {'data': {'type': 'transactions', 'id': transaction_id}}
+    return {'data': {
+        'type': 'webhook-events', 'id': 'event-1',
+        'attributes': {'eventType': event_type, 'createdAt': datetime.now(timezone.utc).isoformat()},
+        'relationships': relationships,
+    }}
+
+
+class UpWebhookTests(TestCase):
+    """Tests for the Up webhook receiver."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='webhook_user', password='password')
+        self.integration = UpIntegration.objects.create(
+            user=self.user,
+            personal_access_token_encrypted=encrypt_token('up:pat:token'),
+            webhook_id='webhook-1',
+            webhook_secret_encrypted=encrypt_token(WEBHOOK_SECRET),
+        )
+        self.client = APIClient()
+        fetch_patcher = mock.patch('integrations.logic.get_up_transaction')
+        self.mock_fetch = fetch_patcher.start()
+        self.addCleanup(fetch_patcher.stop)
+        self.mock_fetch.side_effect = lambda token, transaction_id: create_mock_up_transaction(
+            transaction_id, datetime.now(timezone.utc).isoformat(), -1250, description='Coffee Club'
+        )
+
+    def _post(self, payload, secret=WEBHOOK_SECRET):
+        body = json.dumps(payload).encode('utf-8')
+        return self.client.generic(
+            'POST', reverse('integrations:up-webhook'), body, content_type='application/json',
+            HTTP_X_UP_AUTHENTICITY_SIGNATURE=sign_webhook_body(secret, body),
+        )
+
+    def test_transaction_created_stores_the_transaction_and_queues_processing(self):
+        response = self._post(webhook_event('TRANSACTION_CREATED', 'up-tx-1'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'created')
+        self.mock_fetch.assert_called_once_with('up:pat:token', 'up-tx-1')
+        tx = Transaction.objects.get(user=self.user, bank_transaction_id='up-tx-1')
+        self.assertEqual(tx.source, 'up_bank')
+        self.assertIsNotNone(tx.dedup_fingerprint)
+
+        job = run_job(claim_next_job())
+        self.assertEqual(job.source, 'up_webhook')
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.options['transaction_ids'], [tx.id])
+
+    def test_settled_event_for_stored_transaction_is_skipped(self):
+        self._post(webhook_event('TRANSACTION_CREATED', 'up-tx-1'))
+        response = self._post(webhook_event('TRANSACTION_SETTLED', 'up-tx-1'))
+
+        self.assertEqual(response.data['status'], 'skipped')
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(ImportJob.objects.filter(user=self.user).count(), 1)
+
+    def test_concurrent_events_store_the_transaction_once(self):
+        from integrations import logic
+        build = logic._build_up_transaction
+
+        def build_while_another_event_stores_it(user, tx_data):
+            # The other event passed the same existence check and saved first
+            build(user, tx_data).save()
+            return build(user, tx_data)
+
+        with mock.patch('integrations.logic._build_up_transaction', side_effect=build_while_another_event_stores_it):
+            response = self._post(webhook_event('TRANSACTION_SETTLED', 'up-tx-1'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'skipped')
+        self.assertEqual(Transaction.objects.filter(user=self.user, bank_transaction_id='up-tx-1').count(), 1)
+
+    def test_invalid_signature_is_rejected(self):
+        response = self._post(webhook_event('TRANSACTION_CREATED', 'up-tx-1'), secret='wrong-secret')
+
+        self.assertEqual(response.status_code, 401)
+        self.mock_fetch.assert_not_called()
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_ping_and_unknown_webhooks(self):
+        self.assertEqual(self._post(webhook_event('PING')).data['status'], 'ignored')
+        self.assertEqual(self._post(webhook_event('PING', webhook_id='other')).status_code, 404)
+
+    def test_replay_command_against_fake_api(self):
+        out = StringIO()
+        self.mock_fetch.side_effect = get_transaction  # Fetch from the fake API
+        call_command('replay_up_webhook', 'ping', 'transaction_created', user='webhook_user', fake_api=True, stdout=out)
+
+        self.assertIn('ping: HTTP 200', out.getvalue())
+        self.assertIn('transaction_created: HTTP 200', out.getvalue())
+        self.assertEqual(Transaction.objects.filter(user=self.user, source='up_bank').count(), 1)
@@ -46,7 +46,7 @@ class UpApiServiceTests(TestCase): # Use TestCase if models might be involved la
 
     # Patch the module-level variable directly for this test
     @patch('integrations.services.UP_API_BASE_URL', MOCK_BASE_URL)
-    @patch('integrations.services.requests.request')
+    @patch('integrations.services.http_session.request')
     def test_make_request_success_get(self, mock_request):
         """Test a successful GET request."""
         endpoint = "/test"
@@ -64,11 +64,12 @@ class UpApiServiceTests(TestCase): # Use TestCase if models might be involved la
             expected_url, # This should now match MOCK_BASE_URL
             headers={'Authorization': f'Bearer {MOCK_TOKEN}', 'Accept': 'application/json', 'Content-Type': 'application/json'},
             params={'q': 'test'},
-            json=None
+            json=None,
+            timeout=(services.HTTP_CONNECT_TIMEOUT, services.HTTP_READ_TIMEOUT)
         )
         self.assertEqual(response, mock_response_data) # Should return the dictionary
 
-    @patch('integrations.services.requests.request')
+    @patch('integrations.services.http_session.request')
     def test_make_request_uses_full_url(self, mock_request):
         """Test that full_url overrides base/endpoint path."""
         full_url = "https://another.domain.com/api/path"
@@ -79,7 +80,7 @@ class UpApiServiceTests(TestCase): # Use TestCase if models might be involved la
         called_args, called_kwargs = mock_request.call_args
         self.assertEqual(called_args[1], full_url)
 
-    @patch('integrations.services.requests.request')
+    @patch('integrations.services.http_session.request')
     def test_make_request_http_error_401(self, mock_request):
         """Test handling of a 401 Unauthorized error."""
         # Setup the mock to return a 401 response object which raises HTTPError
@@ -92,7 +93,7 @@ class UpApiServiceTests(TestCase): # Use TestCase if models might be involved la
         self.assertEqual(cm.exception.response.status_code, 401)
 
 
-    @patch('integrations.services.requests.request')
+    @patch('integrations.services.http_session.request')
     def test_make_request_network_error(self, mock_request):
         """Test handling of a network error."""
         mock_request.side_effect = RequestException("Connection timed out")
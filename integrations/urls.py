@@ -1,6 +1,6 @@
 # integrations/urls.py
 from django.urls import path
-from .views import UpSyncTriggerView, UpIntegrationSetupView # Import both views
+from .views import UpSyncTriggerView, UpIntegrationSetupView, UpWebhookView
 
 app_name = 'integrations'
 
@@ -10,4 +10,7 @@ urlpatterns = [
 
     # URL for managing PAT setup (GET, POST, DELETE)
     path('up/setup/', UpIntegrationSetupView.as_view(), name='up-integration-setup'),
+
+    # URL receiving Up webhook events (POST only, authenticated by signature)
+    path('up/webhook/', UpWebhookView.as_view(), name='up-webhook'),
 ]
\ No newline at end of file
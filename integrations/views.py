@@ -1,18 +1,23 @@
 # integrations/views.py
+import json
 import logging
+from requests.exceptions import HTTPError, RequestException
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 
 # Core sync function
-from .logic import sync_up_transactions_for_user
+from .logic import handle_up_webhook_event, sync_up_transactions_for_user
 # Model for checking/managing link
 from .models import UpIntegration
 # Utilities for PAT handling
 from .utils import encrypt_token, decrypt_token
 # Service for verifying token with Up API
-from .services import verify_token
+from .services import verify_token, verify_webhook_signature
+# Background import jobs (processed by the run_import_worker command)
+from django.urls import reverse
+from transactions.import_jobs import enqueue_up_sync
 
 logger = logging.getLogger(__name__)
 
@@ -116,6 +121,19 @@ class UpSyncTriggerView(APIView):
             )
 
         is_initial_sync = integration.last_synced_at is None
+
+        # Optionally hand the sync to the import worker and return a job to poll
+        if str(request.query_params.get('background', '')).lower() in ('1', 'true', 'yes'):
+            job = enqueue_up_sync(user, is_initial_sync, since_date_str, until_date_str)
+            return Response(
+                {
+                    "job_id": job.id,
+                    "status": job.status,
+                    "progress_url": reverse('import-job-detail', kwargs={'pk': job.id}),
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
+
         logger.info(f"[API Sync Trigger] Calling sync logic for user {user.id}. Initial sync: {is_initial_sync}")
 
         try:
@@ -153,6 +171,7 @@ class UpSyncTriggerView(APIView):
                 elif error_code == 'integration_not_found': response_status = status.HTTP_400_BAD_REQUEST
                 elif error_code in ['api_http_error', 'api_network_error']: response_status = status.HTTP_503_SERVICE_UNAVAILABLE
                 elif error_code == 'db_bulk_create_error': response_status = status.HTTP_500_INTERNAL_SERVER_ERROR
+                elif error_code == 'sync_in_progress': response_status = status.HTTP_409_CONFLICT
 
                 return Response({"error": error_message}, status=response_status)
 
@@ -162,4 +181,45 @@ class UpSyncTriggerView(APIView):
             return Response(
                 {"error": "An unexpected server error occurred while trying to sync."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+# --- Webhook receiver ---
+class UpWebhookView(APIView):
+    """
+    Receives Up Bank webhook events (PING, TRANSACTION_CREATED, TRANSACTION_SETTLED, ...).
+    Events are authenticated by their X-Up-Authenticity-Signature header, an HMAC of the
+    raw body keyed with the webhook's secret, not by a user session. Non-2xx responses
+    make Up redeliver the event.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        body = request.body # Raw bytes, as signed by Up
+        try:
+            payload = json.loads(body)
+            webhook_id = payload['data']['relationships']['webhook']['data']['id']
+        except (ValueError, KeyError, TypeError):
+            logger.warning("[Up Webhook] Received a malformed event payload.")
+            return Response({"error": "Malformed webhook event."}, status=status.HTTP_400_BAD_REQUEST)
+
+        integration = UpIntegration.objects.select_related('user').filter(webhook_id=webhook_id).first()
+        secret_key = decrypt_token(integration.webhook_secret_encrypted) if integration and integration.webhook_secret_encrypted else None
+        if not secret_key:
+            logger.warning(f"[Up Webhook] Event for unknown webhook {webhook_id}.")
+            return Response({"error": "Unknown webhook."}, status=status.HTTP_404_NOT_FOUND)
+
+        if not verify_webhook_signature(secret_key, body, request.headers.get('X-Up-Authenticity-Signature', '')):
+            logger.warning(f"[Up Webhook] Invalid signature for webhook {webhook_id} (user {integration.user_id}).")
+            return Response({"error": "Invalid signature."}, status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            result = handle_up_webhook_event(integration, payload)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"[Up Webhook] Could not process event for user {integration.user_id}: {e}")
+            return Response({"error": "Malformed webhook event."}, status=status.HTTP_400_BAD_REQUEST)
+        except (HTTPError, RequestException) as e:
+            logger.error(f"[Up Webhook] Failed to fetch the event's transaction for user {integration.user_id}: {e}")
+            return Response({"error": "Could not fetch the transaction from Up Bank."}, status=status.HTTP_502_BAD_GATEWAY)
+
+        return Response(result, status=status.HTTP_200_OK)
@@ -47,6 +47,11 @@ else:
 fi
 
 echo "🎉 Setup completed successfully!"
+
+# Background import jobs share the web container's MEDIA_ROOT for queued uploads
+echo "📥 Starting import worker..."
+./import_worker.sh &
+
 echo "🌐 Starting Gunicorn server..."
 
 # Start the application
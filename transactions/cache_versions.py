@@ -0,0 +1,42 @@
+"""
+Per-user version counters for data derived from a user's vendors, categories and
+transactions (typeahead indexes, the category tree).
+
+Writes bump the counter for a scope, from the signal handlers in signals.py and
+explicitly after bulk writes that bypass signals, and readers rebuild whatever they
+cached under an older version. The counters are CacheVersion rows, so a write in one
+process (a web worker, the import worker) is seen by every other process whatever the
+cache backend. Rows shared by all users (system vendors and categories, user=None)
+bump the global counter.
+"""
+
+from typing import Optional, Tuple
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F
+
+from .models import CacheVersion
+
+GLOBAL_SCOPE_USER = 'global'
+
+
+def get_cache_version(scope: str, user_id) -> Tuple[int, int]:
+    """The (global, user) version pair that data cached for the user in scope is valid for."""
+    versions = dict(
+        CacheVersion.objects.filter(scope=scope, owner__in=[GLOBAL_SCOPE_USER, str(user_id)]).values_list('owner', 'version')
+    )
+    # A counter that was never bumped is at 0
+    return (versions.get(GLOBAL_SCOPE_USER, 0), versions.get(str(user_id), 0))
+
+
+def bump_cache_version(scope: str, user_id: Optional[int]) -> None:
+    """Invalidate what is cached in scope for a user, or for everyone when user_id is None."""
+    owner = GLOBAL_SCOPE_USER if user_id is None else str(user_id)
+    counters = CacheVersion.objects.filter(scope=scope, owner=owner)
+    if counters.update(version=F('version') + 1):
+        return
+    try:
+        with db_transaction.atomic():
+            CacheVersion.objects.create(scope=scope, owner=owner, version=1)
+    except IntegrityError:  # Created concurrently
+        counters.update(version=F('version') + 1)
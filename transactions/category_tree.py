@@ -0,0 +1,111 @@
+"""
+The category forest of a user: system and own categories nested by parent, with the
+user's vendors that are assigned to a category as leaves. Also rolls amounts up the
+hierarchy using the categories' materialized paths.
+
+Built from two flat queries (categories, vendors) and assembled in one pass over each,
+then cached in Django's cache under the user's category tree version (see
+cache_versions.py), which category and vendor writes bump. The version also serves as
+the ETag of categories/tree/; it is kept in the database, so every process answers
+with the same ETag and a write in any process changes it, whatever the cache backend.
+"""
+
+import logging
+import os
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .cache_versions import bump_cache_version, get_cache_version
+from .models import PATH_SEPARATOR, Category, Vendor
+
+logger = logging.getLogger(__name__)
+
+CACHE_SCOPE = 'category_tree'
+# Cached trees outlive their version only until a write bumps it; this just frees memory
+CATEGORY_TREE_CACHE_SECONDS = int(os.getenv('CATEGORY_TREE_CACHE_SECONDS', '3600'))
+
+
+def build_category_tree(user) -> List[Dict]:
+    """
+    Root nodes of the user's category forest. Category nodes carry their subcategories,
+    then their vendors, in 'children'; vendor nodes match the vendor entries of the
+    category list endpoint. Categories whose parent is not visible to the user are roots.
+    """
+    user_id = getattr(user, 'pk', user)
+    categories = Category.objects.filter(Q(user__isnull=True) | Q(user_id=user_id)).order_by('name', 'id').values_list(
+        'id', 'name', 'parent_id', 'user_id'
+    )
+    nodes: Dict[int, Dict] = {}
+    for category_id, name, parent_id, owner_id in categories:
+        nodes[category_id] = {
+            'id': category_id,
+            'name': name,
+            'type': 'category',
+            'parent': parent_id,
+            'user': owner_id,
+            'is_custom': owner_id is not None,
+            'children': [],
+        }
+
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent'])
+        (parent['children'] if parent is not None else roots).append(node)
+
+    vendors = Vendor.objects.filter(user_id=user_id, parent_category__isnull=False).order_by('name', 'id').values_list(
+        'id', 'name', 'display_name', 'parent_category_id'
+    )
+    for vendor_id, name, display_name, parent_id in vendors:
+        parent = nodes.get(parent_id)
+        (parent['children'] if parent is not None else roots).append({
+            'id': f"vendor-{vendor_id}",
+            'name': display_name or name,
+            'type': 'vendor',
+            'parent': parent_id,
+            'user': user_id,
+            'is_custom': True,
+            'vendor_id': vendor_id,
+        })
+    return roots
+
+
+def get_category_tree_version(user) -> Tuple[int, int]:
+    return get_cache_version(CACHE_SCOPE, getattr(user, 'pk', user))
+
+
+def get_category_tree(user, version: Tuple[int, int] = None) -> List[Dict]:
+    """The user's category forest, from the cache when it is current."""
+    user_id = getattr(user, 'pk', user)
+    version = version or get_category_tree_version(user_id)
+    key = f"fundflow:{CACHE_SCOPE}:{user_id}:{version[0]}:{version[1]}"
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_category_tree(user_id)
+        cache.set(key, tree, timeout=CATEGORY_TREE_CACHE_SECONDS)
+        logger.debug(f"User {user_id}: Built category tree with {len(tree)} roots")
+    return tree
+
+
+def rollup_to_depth(amounts: Dict[int, Decimal], depth: Optional[int]) -> Dict[int, Decimal]:
+    """
+    Re-key per-category amounts to each category's ancestor at depth (0 = root), or
+    to the category itself when it is not that deep. With depth None the amounts are
+    returned unchanged. One query, for the paths, however deep the hierarchy is.
+    """
+    if depth is None:
+        return dict(amounts)
+    rolled = defaultdict(Decimal)
+    for category_id, path in Category.objects.filter(pk__in=amounts).values_list('pk', 'path'):
+        ancestors = [int(pk) for pk in path.split(PATH_SEPARATOR) if pk]
+        target = ancestors[min(depth, len(ancestors) - 1)] if ancestors else category_id
+        rolled[target] += amounts[category_id]
+    return dict(rolled)
+
+
+def invalidate_category_tree(user_id) -> None:
+    """Mark a user's category tree (every user's, for None) as stale."""
+    bump_cache_version(CACHE_SCOPE, user_id)
@@ -0,0 +1,451 @@
+"""
+Streaming CSV import for FundFlow transactions.
+
+Decodes the uploaded bank export incrementally and parses, de-duplicates, converts
+and bulk-creates transactions in fixed-size chunks, so peak memory depends on the
+chunk size rather than on the size of the file.
+"""
+
+import csv
+import io
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import transaction as db_transaction
+from rest_framework import status
+
+from .csv_parsing import ParsedRow, get_expected_headers, parse_csv_row, parse_csv_rows
+from .dedup import backfill_dedup_fingerprints
+from .models import Transaction, DescriptionMapping, VendorMapping, BASE_CURRENCY_FOR_CONVERSION, compute_dedup_fingerprint
+from .services import get_historical_rate
+from .typeahead import invalidate_typeahead_index
+from .vendor_names import extract_original_vendor_name
+from .view_engine import sync_custom_view_membership
+
+logger = logging.getLogger(__name__)
+
+# Rows parsed, de-duplicated and inserted together
+CSV_IMPORT_CHUNK_SIZE = 2000
+# Rows sent to a worker process at a time when parsing in parallel
+PARALLEL_PARSE_BATCH_SIZE = 5000
+# Default worker count for parallel parsing
+DEFAULT_PARSE_WORKERS = os.cpu_count() or 1
+
+# (file name, result, error) - result is None when the file could not be imported at all
+FileImportOutcome = Tuple[str, Optional['CSVImportResult'], Optional[str]]
+
+
+class CSVImportError(Exception):
+    """Raised when a CSV file cannot be imported at all (missing or mismatched headers)."""
+
+
+class CSVImportResult:
+    """Result object for CSV import operations."""
+
+    def __init__(self, currency: str):
+        self.currency = currency
+        self.processed_rows = 0
+        self.new_count = 0  # Rows that passed de-duplication and were queued for insert
+        self.created_count = 0
+        self.duplicate_count = 0
+        self.applied_rules_count = 0
+        self.conversion_error_count = 0
+        self.vendor_identified_count = 0
+        self.vendor_created_count = 0
+        self.auto_categorized_count = 0
+        self.errors: List[str] = []
+
+    def build_message(self) -> str:
+        message = f"CSV (Assumed {self.currency}) processed. Found {self.processed_rows} data rows."
+        if self.created_count > 0: message += f" Imported {self.created_count} new transactions."
+        else: message += " No new transactions were imported."
+        if self.duplicate_count > 0: message += f" Skipped {self.duplicate_count} potential duplicates."
+        if self.applied_rules_count > 0: message += f" Applied {self.applied_rules_count} description rules."
+        if self.vendor_identified_count > 0: message += f" Identified vendors for {self.vendor_identified_count} transactions."
+        if self.vendor_created_count > 0: message += f" Created {self.vendor_created_count} new vendors."
+        if self.auto_categorized_count > 0: message += f" Auto-categorized {self.auto_categorized_count} transactions using vendor rules."
+        if self.conversion_error_count > 0: message += f" Failed to convert currency for {self.conversion_error_count} transactions to {BASE_CURRENCY_FOR_CONVERSION}."
+        if self.errors: message += f" Encountered {len(self.errors)} errors."
+        return message
+
+    @property
+    def response_status(self) -> int:
+        if self.created_count > 0:
+            return status.HTTP_201_CREATED
+        if self.errors and not self.new_count and self.processed_rows > 0:
+            return status.HTTP_400_BAD_REQUEST
+        return status.HTTP_200_OK
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Response payload for the CSV upload endpoint."""
+        return {
+            'message': self.build_message(),
+            'imported_count': self.created_count,
+            'duplicate_count': self.duplicate_count,
+            'vendor_identified_count': self.vendor_identified_count,
+            'vendor_created_count': self.vendor_created_count,
+            'auto_categorized_count': self.auto_categorized_count,
+            'description_rules_applied_count': self.applied_rules_count,
+            'conversion_error_count': self.conversion_error_count,
+            'total_rows_processed': self.processed_rows,
+            'errors': self.errors,
+        }
+
+
+class CSVTransactionImporter:
+    """
+    Imports bank CSV exports for a user in fixed-size chunks.
+
+    The fingerprints (dedup_fingerprint) of the user's CSV transactions are loaded
+    once per import. Rows of all files then go through one chunk loop: each chunk is
+    de-duplicated against those fingerprints and the ones inserted from earlier files
+    of the batch, converted to AUD, bulk-created in its own database transaction and
+    passed to vendor identification and auto-categorization.
+    """
+
+    def __init__(self, user, account_base_currency: str = 'EUR', chunk_size: Optional[int] = None,
+                 progress_callback: Optional[Callable[[CSVImportResult], None]] = None, parse_workers: int = 0):
+        self.user = user
+        self.currency = account_base_currency.upper()
+        self.chunk_size = max(1, chunk_size or CSV_IMPORT_CHUNK_SIZE)
+        # More than one worker parses rows in a process pool (see _parse_rows_in_pool)
+        self.parse_workers = parse_workers
+        # Called with the running result after every chunk (used by background import jobs)
+        self.progress_callback = progress_callback
+        self.expected_headers = get_expected_headers(self.currency)
+
+        self._description_mappings = None
+        self._vendor_mappings = None
+        self._rate_cache: Dict[tuple, Optional[Decimal]] = {}
+        # Fingerprints of the user's CSV transactions from before the import
+        self._existing_fingerprints: set = set()
+        # Fingerprints inserted by the import, with the index of the first file that inserted them
+        self._batch_fingerprints: Dict[str, int] = {}
+
+    def import_file(self, file_obj) -> CSVImportResult:
+        """
+        Import an uploaded CSV file, decoding it incrementally.
+
+        Raises CSVImportError for empty files or mismatched headers, and lets
+        UnicodeDecodeError / csv.Error propagate when nothing has been imported yet.
+        """
+        text_stream = io.TextIOWrapper(file_obj, encoding='utf-8', newline='')
+        try:
+            return self.import_rows(csv.reader(text_stream))
+        finally:
+            # Leave the uploaded file open for Django to clean up
+            text_stream.detach()
+
+    def import_files(self, files: Iterable[Tuple[str, Any]]) -> List[FileImportOutcome]:
+        """
+        Import several CSV files in order, returning (name, result, error) per file.
+
+        Fingerprints, description/vendor mappings and exchange rates are loaded once
+        for the batch. Each file is de-duplicated against everything imported before
+        it, including earlier files of the same batch (overlapping statements), while
+        identical rows within one file are still imported.
+        """
+        outcomes = []
+        for name, result, error in self._import_readers(self._csv_readers(files)):
+            if isinstance(error, CSVImportError):
+                outcomes.append((name, None, str(error)))
+            elif isinstance(error, UnicodeDecodeError):
+                logger.error(f"User {self.user.id}: CSV batch file '{name}' failed due to encoding error.")
+                outcomes.append((name, None, 'Failed to decode file. Please ensure it is UTF-8 encoded.'))
+            elif isinstance(error, csv.Error):
+                logger.error(f"User {self.user.id}: CSV parsing error in batch file '{name}': {error}")
+                outcomes.append((name, None, f'Error parsing CSV file: {error}'))
+            else:
+                outcomes.append((name, result, None))
+        return outcomes
+
+    def import_rows(self, reader: Iterable[List[str]]) -> CSVImportResult:
+        """Import rows from a csv.reader-like iterator whose first row is the header."""
+        [(_, result, error)] = self._import_readers([('', reader)])
+        if error is not None:
+            raise error
+        return result
+
+    @staticmethod
+    def _csv_readers(files: Iterable[Tuple[str, Any]]) -> Iterator[Tuple[str, Iterable[List[str]]]]:
+        """csv.readers decoding each file incrementally, opened as the import reaches them."""
+        for name, file_obj in files:
+            text_stream = io.TextIOWrapper(file_obj, encoding='utf-8', newline='')
+            try:
+                yield name, csv.reader(text_stream)
+            finally:
+                # Leave the uploaded file open for Django to clean up
+                text_stream.detach()
+
+    def _data_rows(self, reader: Iterable[List[str]]) -> Iterator[List[str]]:
+        """The rows after the header, raising CSVImportError when the header doesn't match."""
+        reader = iter(reader)
+        try:
+            headers = next(reader)
+        except StopIteration:
+            raise CSVImportError('CSV file is empty or contains only headers.')
+        normalized_headers = [h.strip().lower() for h in headers]
+        normalized_expected = [h.strip().lower() for h in self.expected_headers]
+        if normalized_headers != normalized_expected:
+            raise CSVImportError(
+                "CSV headers do not match expected format. Please ensure columns are: " + ", ".join(self.expected_headers)
+            )
+        return reader
+
+    def _load_existing_fingerprints(self) -> None:
+        # Transactions imported before fingerprints existed need one to be detected as duplicates
+        backfill_dedup_fingerprints(Transaction.objects.filter(user=self.user, source='csv'))
+        self._existing_fingerprints = set(
+            Transaction.objects.filter(user=self.user, source='csv', dedup_fingerprint__isnull=False)
+            .values_list('dedup_fingerprint', flat=True)
+        )
+        self._batch_fingerprints = {}
+
+    def _import_readers(self, readers: Iterable[Tuple[str, Iterable[List[str]]]]) -> List[Tuple[str, Optional[CSVImportResult], Optional[Exception]]]:
+        """
+        Import the rows of several csv.readers in one chunk loop, returning (name, result,
+        error) per reader. error is the CSVImportError, UnicodeDecodeError or csv.Error that
+        stopped a reader before anything of it was imported; its result is then None.
+        """
+        self._load_existing_fingerprints()
+        logger.info(f"User {self.user.id}: Streaming CSV import (Assumed Currency: {self.currency}, chunk size {self.chunk_size})...")
+        outcomes = []
+        chunk: List[Tuple[int, CSVImportResult, Dict[str, Any]]] = []
+        result = None
+        for file_index, (name, reader) in enumerate(readers):
+            result = CSVImportResult(self.currency)
+            row_num = 1
+            try:
+                for row_num, data_item, error in self._parse_rows(self._data_rows(reader)):
+                    result.processed_rows += 1
+                    if error:
+                        result.errors.append(error)
+                        continue
+                    chunk.append((file_index, result, data_item))
+                    if len(chunk) >= self.chunk_size:
+                        self._process_chunk(chunk)
+                        self._report_progress(result)
+                        chunk = []
+            except CSVImportError as e:
+                outcomes.append((name, None, e))
+                continue
+            except (UnicodeDecodeError, csv.Error) as e:
+                if not result.created_count:
+                    # Nothing of the file is committed; drop its queued rows and fail it as a whole
+                    chunk = [item for item in chunk if item[1] is not result]
+                    outcomes.append((name, None, e))
+                    continue
+                # Earlier chunks are already committed; keep them and report where the file broke
+                logger.error(f"User {self.user.id}: CSV stream error after row {row_num}: {e}")
+                result.errors.append(f"Row {row_num + 1}: Could not read the rest of the file ({e}). Remaining rows were not imported.")
+            outcomes.append((name, result, None))
+
+        if chunk:
+            self._process_chunk(chunk)
+        if result is not None:
+            self._report_progress(result)
+
+        for name, file_result, _ in outcomes:
+            if file_result is not None:
+                logger.info(f"User {self.user.id}: CSV import of '{name}' complete - Rows: {file_result.processed_rows}. "
+                            f"Created: {file_result.created_count}. Dups: {file_result.duplicate_count}. "
+                            f"Convert Errors: {file_result.conversion_error_count}. Errors: {len(file_result.errors)}.")
+        return outcomes
+
+    def _report_progress(self, result: CSVImportResult) -> None:
+        if self.progress_callback is not None:
+            self.progress_callback(result)
+
+    def _parse_rows(self, reader: Iterable[List[str]]) -> Iterator[ParsedRow]:
+        """Parse data rows in file order, in this process or in a process pool."""
+        numbered_rows = enumerate(reader, start=2)
+        if self.parse_workers <= 1:
+            for row_num, row in numbered_rows:
+                yield parse_csv_row(row_num, row, self.currency)
+        else:
+            yield from self._parse_rows_in_pool(numbered_rows)
+
+    def _parse_rows_in_pool(self, numbered_rows: Iterator[Tuple[int, List[str]]]) -> Iterator[ParsedRow]:
+        """
+        Split the rows into batches and parse them in worker processes. Rows are
+        split on CSV record boundaries (quoted newlines stay intact) and at most
+        two batches per worker are in flight, so memory stays bounded.
+        """
+        pending = deque()
+        max_in_flight = self.parse_workers * 2
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as executor:
+            batch = []
+            try:
+                for numbered_row in numbered_rows:
+                    batch.append(numbered_row)
+                    if len(batch) >= PARALLEL_PARSE_BATCH_SIZE:
+                        pending.append(executor.submit(parse_csv_rows, batch, self.currency))
+                        batch = []
+                        if len(pending) >= max_in_flight:
+                            yield from pending.popleft().result()
+            except (UnicodeDecodeError, csv.Error):
+                # Hand over the rows read before the error, then let import_rows report it
+                if batch:
+                    pending.append(executor.submit(parse_csv_rows, batch, self.currency))
+                while pending:
+                    yield from pending.popleft().result()
+                raise
+            if batch:
+                pending.append(executor.submit(parse_csv_rows, batch, self.currency))
+            while pending:
+                yield from pending.popleft().result()
+
+    def _load_mappings(self):
+        if self._description_mappings is None:
+            self._description_mappings = {
+                m.original_description.strip().lower(): m for m in DescriptionMapping.objects.filter(user=self.user)
+            }
+            self._vendor_mappings = {
+                vm.original_name.lower(): vm.mapped_vendor for vm in VendorMapping.objects.filter(user=self.user)
+            }
+
+    def _convert_to_aud(self, data_item: Dict[str, Any], result: CSVImportResult):
+        """Return (aud_amount, exchange_rate) for a parsed row; (None, None) if no rate is available."""
+        original_currency_code = data_item['original_currency']
+        if original_currency_code == BASE_CURRENCY_FOR_CONVERSION:
+            return data_item['original_amount'], Decimal("1.0")
+
+        # get_historical_rate handles date validation (e.g. max_days_gap); cache per date for the import
+        rate_key = (data_item['transaction_date'], original_currency_code)
+        if rate_key not in self._rate_cache:
+            self._rate_cache[rate_key] = get_historical_rate(
+                data_item['transaction_date'], original_currency_code, BASE_CURRENCY_FOR_CONVERSION
+            )
+        rate = self._rate_cache[rate_key]
+        if rate is None:
+            result.conversion_error_count += 1
+            logger.warning(f"User {self.user.id} - Row {data_item['row_num']}: Rate fetch failed for {original_currency_code}->{BASE_CURRENCY_FOR_CONVERSION} on {data_item['transaction_date']}.")
+            return None, None
+        return (data_item['original_amount'] * rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP), rate
+
+    def _build_transaction(self, data_item: Dict[str, Any], final_description: str, assigned_category,
+                           result: CSVImportResult) -> Transaction:
+        aud_amount_val, exchange_rate_val = self._convert_to_aud(data_item, result)
+
+        # Original vendor name: counterparty first, falling back to the description
+        original_vendor_name = extract_original_vendor_name(
+            final_description, data_item.get('counterparty_identifier') or '', 'Unknown Vendor'
+        )
+        mapped_vendor_name = self._vendor_mappings.get(original_vendor_name.lower())
+        vendor_name = mapped_vendor_name if mapped_vendor_name else original_vendor_name
+
+        return Transaction(
+            user=self.user, category=assigned_category, description=final_description,
+            transaction_date=data_item['transaction_date'],
+            original_amount=data_item['original_amount'], original_currency=data_item['original_currency'],
+            direction=data_item['direction'], aud_amount=aud_amount_val, exchange_rate_to_aud=exchange_rate_val,
+            account_base_currency=self.currency,
+            source='csv', bank_transaction_id=None,
+            source_account_identifier=data_item['source_account_identifier'],
+            counterparty_identifier=data_item['counterparty_identifier'],
+            source_code=data_item['source_code'], source_type=data_item['source_type'],
+            source_notifications=data_item['source_notifications'],
+            original_vendor_name=original_vendor_name,
+            vendor_name=vendor_name,
+            auto_categorized=False,  # Will be set to True by auto-categorization if a rule is applied
+        )
+
+    def _process_chunk(self, chunk: List[Tuple[int, CSVImportResult, Dict[str, Any]]]) -> None:
+        """
+        De-duplicate, convert and insert one chunk of parsed rows, given as (file index,
+        result of the file, row). Counts go to the result of each row's file.
+        """
+        self._load_mappings()
+
+        transactions_to_create = []
+        row_results = []
+        chunk_fingerprints: Dict[str, int] = {}
+        for file_index, result, data_item in chunk:
+            raw_description = data_item['raw_description']
+            final_description = raw_description
+            assigned_category = None
+            matched_mapping = self._description_mappings.get(raw_description.strip().lower())
+            if matched_mapping:
+                final_description = matched_mapping.clean_name
+                assigned_category = matched_mapping.assigned_category
+                if assigned_category: result.applied_rules_count += 1
+
+            fingerprint = compute_dedup_fingerprint(
+                data_item['transaction_date'], data_item['original_amount'],
+                data_item['direction'], final_description, data_item['original_currency']
+            )
+            # Rows inserted by an earlier file are duplicates; repeats within a file are not
+            first_file = min(self._batch_fingerprints.get(fingerprint, file_index),
+                             chunk_fingerprints.get(fingerprint, file_index))
+            if fingerprint in self._existing_fingerprints or first_file < file_index:
+                result.duplicate_count += 1
+                continue
+            chunk_fingerprints.setdefault(fingerprint, file_index)
+
+            new_tx = self._build_transaction(data_item, final_description, assigned_category, result)
+            new_tx.dedup_fingerprint = fingerprint
+            transactions_to_create.append(new_tx)
+            row_results.append(result)
+            result.new_count += 1
+
+        if not transactions_to_create:
+            return
+
+        try:
+            with db_transaction.atomic():
+                created_objects = Transaction.objects.bulk_create(transactions_to_create)
+        except Exception as e:
+            for result in {id(result): result for result in row_results}.values():
+                result.errors.append(f"Database error: {str(e)}.")
+            logger.error(f"User {self.user.id}: DB error CSV txns: {e}", exc_info=True)
+            return
+        for fingerprint, file_index in chunk_fingerprints.items():
+            self._batch_fingerprints.setdefault(fingerprint, file_index)
+
+        # Rows of one file are contiguous, so the chunk splits into at most one group per file
+        groups: List[Tuple[CSVImportResult, List[int]]] = []
+        for obj, result in zip(created_objects, row_results):
+            result.created_count += 1
+            if not groups or groups[-1][0] is not result:
+                groups.append((result, []))
+            if obj.id:
+                groups[-1][1].append(obj.id)
+        invalidate_typeahead_index(self.user.id) # bulk_create sends no post_save
+        sync_custom_view_membership(self.user.id, created_objects)
+        logger.debug(f"User {self.user.id}: Created {len(created_objects)} transactions from CSV chunk ending at row {chunk[-1][2]['row_num']}.")
+
+        for result, new_transaction_ids in groups:
+            if new_transaction_ids:
+                self._identify_vendors(new_transaction_ids, result)
+                self._auto_categorize(new_transaction_ids, result)
+
+    def _identify_vendors(self, transaction_ids: List[int], result: CSVImportResult) -> None:
+        try:
+            from .vendor_identification_service import identify_vendors_for_user_transactions
+
+            vendor_result = identify_vendors_for_user_transactions(
+                self.user,
+                transactions=Transaction.objects.filter(id__in=transaction_ids, user=self.user)
+            )
+            result.vendor_identified_count += vendor_result.identified_count
+            result.vendor_created_count += vendor_result.created_vendors_count
+        except Exception as e:
+            logger.error(f"User {self.user.id}: Vendor identification failed during CSV upload: {e}", exc_info=True)
+            # Don't fail the upload if vendor identification fails
+
+    def _auto_categorize(self, transaction_ids: List[int], result: CSVImportResult) -> None:
+        try:
+            from .auto_categorization_service import auto_categorize_user_transactions
+
+            categorization_result = auto_categorize_user_transactions(
+                self.user,
+                transactions=Transaction.objects.filter(id__in=transaction_ids, user=self.user)
+            )
+            result.auto_categorized_count += categorization_result.categorized_count
+        except Exception as e:
+            logger.error(f"User {self.user.id}: Auto-categorization failed during CSV upload: {e}", exc_info=True)
+            # Don't fail the entire upload if auto-categorization fails
@@ -0,0 +1,114 @@
+"""
+Row parsing for bank CSV exports.
+
+Dates (YYYYMMDD) and amounts repeat heavily in bank exports, so both are decoded
+through memoized fast paths: dates by slicing, amounts as integer cents. Anything
+outside the fixed formats falls back to strptime/Decimal, which keeps their
+validation behaviour and error messages.
+"""
+
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bounded memo sizes (entries)
+DATE_CACHE_SIZE = 8192
+AMOUNT_CACHE_SIZE = 65536
+
+# Column keys, in the order of get_expected_headers()
+CSV_COLUMNS = ('date', 'description', 'account', 'counterparty', 'code', 'direction', 'amount', 'type', 'notifications')
+COLUMN_INDEX = {name: index for index, name in enumerate(CSV_COLUMNS)}
+EXPECTED_COLUMN_COUNT = len(CSV_COLUMNS)
+
+_DATE = COLUMN_INDEX['date']
+_DESCRIPTION = COLUMN_INDEX['description']
+_ACCOUNT = COLUMN_INDEX['account']
+_COUNTERPARTY = COLUMN_INDEX['counterparty']
+_CODE = COLUMN_INDEX['code']
+_DIRECTION = COLUMN_INDEX['direction']
+_AMOUNT = COLUMN_INDEX['amount']
+_TYPE = COLUMN_INDEX['type']
+_NOTIFICATIONS = COLUMN_INDEX['notifications']
+
+_DIRECTIONS = frozenset({'DEBIT', 'CREDIT'})
+
+# (row_num, data_item, error) - exactly one of data_item and error is set
+ParsedRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def get_expected_headers(currency_code: str) -> List[str]:
+    """Generate expected headers based on the account currency"""
+    return [
+        "Date", "Name / Description", "Account", "Counterparty",
+        "Code", "Debit/credit", f"Amount ({currency_code})", "Transaction type",
+        "Notifications"
+    ]
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(raw_date: str) -> date:
+    """Parse a YYYYMMDD date. Raises ValueError with strptime's message for invalid dates."""
+    if len(raw_date) == 8 and raw_date.isascii() and raw_date.isdigit():
+        try:
+            return date(int(raw_date[:4]), int(raw_date[4:6]), int(raw_date[6:]))
+        except ValueError:
+            pass  # Let strptime produce its usual error message
+    return datetime.strptime(raw_date, '%Y%m%d').date()
+
+
+@lru_cache(maxsize=AMOUNT_CACHE_SIZE)
+def parse_amount(raw_amount: str) -> Decimal:
+    """
+    Parse an amount with ',' or '.' as decimal separator (e.g. '12,50').
+    Plain amounts with up to two decimals take an integer-cents path; everything else
+    falls back to Decimal, which raises decimal.InvalidOperation for malformed values.
+    """
+    whole, separator, fraction = raw_amount.partition(',' if ',' in raw_amount else '.')
+    if (whole.isascii() and whole.isdigit()
+            and (not separator or (len(fraction) <= 2 and fraction.isascii() and fraction.isdigit()))):
+        cents = int(whole) * 100 + (int(fraction.ljust(2, '0')) if separator else 0)
+        return Decimal(cents).scaleb(-2)
+    return Decimal(raw_amount.replace(',', '.'))
+
+
+def parse_csv_row(row_num: int, row: List[str], currency: str) -> ParsedRow:
+    """
+    Parse and validate one data row of a bank CSV export.
+    Returns (row_num, data_item, None) for valid rows and (row_num, None, error) otherwise.
+    """
+    if len(row) != EXPECTED_COLUMN_COUNT:
+        return row_num, None, f"Row {row_num}: Incorrect number of columns ({len(row)}), expected {EXPECTED_COLUMN_COUNT}. Row skipped."
+    try:
+        transaction_date_obj = parse_date(row[_DATE].strip())
+        parsed_amount = parse_amount(row[_AMOUNT].strip())
+        if parsed_amount < 0: raise ValueError("Amount in CSV should be positive.")
+        direction = row[_DIRECTION].strip().upper()
+        if direction not in _DIRECTIONS: raise ValueError("Invalid direction.")
+
+        return row_num, {
+            'row_num': row_num,
+            'transaction_date': transaction_date_obj,
+            'raw_description': row[_DESCRIPTION].strip(),
+            'original_amount': parsed_amount,
+            'original_currency': currency,
+            'direction': direction,
+            'source_account_identifier': row[_ACCOUNT].strip() or None,
+            'counterparty_identifier': row[_COUNTERPARTY].strip() or None,
+            'source_code': row[_CODE].strip() or None,
+            'source_type': row[_TYPE].strip() or None,
+            'source_notifications': row[_NOTIFICATIONS].strip() or None,
+        }, None
+    except ValueError as ve:
+        return row_num, None, f"Row {row_num}: {str(ve)}"
+    except Exception as e:
+        logger.error(f"Row {row_num} CSV processing error: {e}", exc_info=True)
+        return row_num, None, f"Row {row_num}: Unexpected processing error."
+
+
+def parse_csv_rows(numbered_rows: List[Tuple[int, List[str]]], currency: str) -> List[ParsedRow]:
+    """Parse a batch of (row_num, row) pairs; runs in worker processes for parallel imports."""
+    return [parse_csv_row(row_num, row, currency) for row_num, row in numbered_rows]
@@ -0,0 +1,54 @@
+"""
+Duplicate detection helpers for transaction imports.
+
+Imports compare rows by Transaction.dedup_fingerprint, an indexed hash of
+(date, amount, direction, description, currency), instead of loading existing
+transactions into memory.
+"""
+
+import logging
+from typing import Iterable, Set
+
+from django.db.models import QuerySet
+
+from .models import Transaction
+
+logger = logging.getLogger(__name__)
+
+# Rows fingerprinted per query/bulk_update when backfilling
+FINGERPRINT_BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_dedup_fingerprints(queryset: QuerySet = None, batch_size: int = FINGERPRINT_BACKFILL_BATCH_SIZE) -> int:
+    """
+    Populate dedup_fingerprint for transactions that don't have one yet.
+    Returns the number of transactions updated.
+    """
+    if queryset is None:
+        queryset = Transaction.objects.all()
+    pending = queryset.filter(dedup_fingerprint__isnull=True).order_by('id').only(
+        'id', 'transaction_date', 'original_amount', 'direction', 'description', 'original_currency'
+    )
+
+    updated_count = 0
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        for tx in batch:
+            tx.dedup_fingerprint = tx.build_dedup_fingerprint()
+        Transaction.objects.bulk_update(batch, ['dedup_fingerprint'])
+        updated_count += len(batch)
+        last_id = batch[-1].id
+    if updated_count:
+        logger.info(f"Backfilled dedup fingerprints for {updated_count} transactions.")
+    return updated_count
+
+
+def find_existing_fingerprints(queryset: QuerySet, fingerprints: Iterable[str]) -> Set[str]:
+    """Return the subset of fingerprints that already exist in the queryset."""
+    fingerprints = set(fingerprints)
+    if not fingerprints:
+        return set()
+    return set(queryset.filter(dedup_fingerprint__in=fingerprints).values_list('dedup_fingerprint', flat=True))
@@ -0,0 +1,121 @@
+"""
+Streaming bulk export of FundFlow transactions.
+
+Rows are read with values().iterator(chunk_size=EXPORT_CHUNK_SIZE), which on
+PostgreSQL is a server-side cursor, and each chunk is serialized and written out
+before the next one is fetched. Peak memory depends on the chunk size rather than on
+the number of transactions exported. The fields and their formatting are the
+transaction list's (see serialize_transaction_rows).
+
+Formats:
+- csv: a header row, then one row per transaction; nulls are empty cells.
+- ndjson: one JSON object per line.
+- columnar: a compact binary layout in row groups of up to EXPORT_CHUNK_SIZE rows.
+  Each row group stores every column as a zlib-compressed JSON array, so
+  repetitive columns such as currency, direction or category compress well.
+  read_columnar() decodes it back into dicts:
+
+      MAGIC
+      u32 header length, header JSON {"columns": [...]}
+      for each row group:
+          u32 row count
+          for each column: u32 length, zlib(JSON array of the column's values)
+      u32 0 (end of file)
+
+  All integers are big-endian.
+"""
+
+import csv
+import io
+import json
+import struct
+import zlib
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+from .serializers import TransactionSerializer, serialize_transaction_rows, transaction_list_values
+
+# Rows fetched from the database, serialized and written together
+EXPORT_CHUNK_SIZE = 2000
+# Column order of every export format
+EXPORT_COLUMNS = tuple(TransactionSerializer.Meta.fields)
+# Keyset order of the transaction list, so exports are deterministic
+EXPORT_ORDERING = ('-transaction_date', '-created_at', '-id')
+
+COLUMNAR_MAGIC = b'FFCOL1\n'
+_LENGTH = struct.Struct('>I')
+
+
+def iter_serialized_chunks(queryset, chunk_size: int = None) -> Iterator[List[Dict]]:
+    """Lists of serialized transaction dicts, chunk_size rows at a time, in export order."""
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    rows = transaction_list_values(queryset.order_by(*EXPORT_ORDERING)).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield serialize_transaction_rows(chunk)
+
+
+def iter_csv(chunks: Iterable[List[Dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        writer.writerows(['' if row[column] is None else row[column] for column in EXPORT_COLUMNS] for row in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header of an empty export
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_ndjson(chunks: Iterable[List[Dict]]) -> Iterator[str]:
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    for chunk in chunks:
+        yield ''.join(encode(row) + '\n' for row in chunk)
+
+
+def iter_columnar(chunks: Iterable[List[Dict]]) -> Iterator[bytes]:
+    header = json.dumps({'columns': EXPORT_COLUMNS}).encode('utf-8')
+    yield COLUMNAR_MAGIC + _LENGTH.pack(len(header)) + header
+    for chunk in chunks:
+        parts = [_LENGTH.pack(len(chunk))]
+        for column in EXPORT_COLUMNS:
+            data = zlib.compress(json.dumps([row[column] for row in chunk], separators=(',', ':')).encode('utf-8'))
+            parts.append(_LENGTH.pack(len(data)))
+            parts.append(data)
+        yield b''.join(parts)
+    yield _LENGTH.pack(0)
+
+
+def read_columnar(stream) -> Iterator[Dict]:
+    """Decode a columnar export from a binary file object, one dict per transaction."""
+    def read_exactly(size):
+        data = stream.read(size)
+        if len(data) != size:
+            raise ValueError('Truncated columnar export.')
+        return data
+
+    if read_exactly(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError('Not a FundFlow columnar export.')
+    columns = json.loads(read_exactly(_LENGTH.unpack(read_exactly(_LENGTH.size))[0]))['columns']
+    while True:
+        row_count = _LENGTH.unpack(read_exactly(_LENGTH.size))[0]
+        if not row_count:
+            return
+        values = [
+            json.loads(zlib.decompress(read_exactly(_LENGTH.unpack(read_exactly(_LENGTH.size))[0])))
+            for _ in columns
+        ]
+        for index in range(row_count):
+            yield {column: column_values[index] for column, column_values in zip(columns, values)}
+
+
+# Format name -> (writer, content type, file extension)
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson; charset=utf-8', 'ndjson'),
+    'columnar': (iter_columnar, 'application/octet-stream', 'ffcol'),
+}
@@ -0,0 +1,93 @@
+"""
+Sparse fieldsets for the transaction, vendor and category endpoints.
+
+    GET /api/transactions/?fields=id,transaction_date,description,signed_aud_amount
+    GET /api/vendors/?omit=created_at,updated_at
+
+?fields= keeps only the listed fields and ?omit= drops the listed ones; both take
+comma-separated serializer field names and unknown names are a 400. The serializers
+drop the unrequested fields, and the views narrow the SELECT to the columns the
+remaining fields read, so the database sends less as well.
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_QUERY_PARAM = 'fields'
+OMIT_QUERY_PARAM = 'omit'
+
+
+def _split_names(value: str) -> list:
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def parse_fieldset(query_params, available: Iterable[str]) -> Optional[Tuple[str, ...]]:
+    """
+    The fields selected by ?fields= and ?omit=, in the serializer's order, or None
+    when neither is given. Raises ValidationError for names that are not fields.
+    """
+    available = tuple(available)
+    requested = query_params.get(FIELDS_QUERY_PARAM)
+    omitted = query_params.get(OMIT_QUERY_PARAM)
+    if requested is None and omitted is None:
+        return None
+
+    errors = {}
+    selected = set(available)
+    for param, value in ((FIELDS_QUERY_PARAM, requested), (OMIT_QUERY_PARAM, omitted)):
+        if value is None:
+            continue
+        names = _split_names(value)
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            errors[param] = f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(available)}."
+        elif param == FIELDS_QUERY_PARAM:
+            selected &= set(names)
+        else:
+            selected -= set(names)
+    if errors:
+        raise ValidationError(errors)
+    return tuple(name for name in available if name in selected)
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Drops the fields not selected by ?fields= / ?omit= of the request in the context.
+    Only applies to reads, so writes still validate every field.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        selected = parse_fieldset(request.query_params, self.fields)
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Narrows the queryset of list and retrieve to the columns the selected fields read.
+    fieldset_columns maps fields that are not plain model columns to the columns
+    they need (an empty tuple for none); the primary key is always loaded.
+    """
+    fieldset_columns: Dict[str, Tuple[str, ...]] = {}
+
+    def get_fieldset(self) -> Optional[Tuple[str, ...]]:
+        if self.request.method not in SAFE_METHODS:
+            return None
+        return parse_fieldset(self.request.query_params, self.get_serializer_class().Meta.fields)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+        columns = []
+        for name in fieldset:
+            columns.extend(self.fieldset_columns.get(name, (name,)))
+        return queryset.only(*(columns or ['pk']))
@@ -0,0 +1,214 @@
+"""
+Database-backed background import jobs for FundFlow.
+
+CSV uploads and Up Bank syncs can be queued as ImportJob rows instead of being
+processed inside the HTTP request; transactions stored from Up webhook events are
+queued the same way for vendor identification and auto-categorization. The
+`run_import_worker` management command claims pending jobs and runs them; clients
+poll the job for progress.
+
+Every claim increments the job's attempt, and a worker only records progress while
+its claim is the latest one. A job requeued as stale while its first worker is still
+running is therefore finished by one worker, which also removes the upload.
+"""
+
+import csv
+import logging
+import os
+from datetime import timedelta
+from typing import Optional
+
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status as http_status
+
+from .csv_import import CSVImportError, CSVImportResult, CSVTransactionImporter
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+# Errors kept on the job record; the total is always available as error_count
+MAX_STORED_JOB_ERRORS = 500
+# Parser processes per CSV job; 0 or 1 parses in the worker process itself
+IMPORT_JOB_PARSE_WORKERS = int(os.getenv('IMPORT_JOB_PARSE_WORKERS', '0'))
+
+
+class JobSuperseded(Exception):
+    """Raised in a worker whose job was requeued and claimed again by another worker."""
+
+
+def enqueue_csv_import(user, uploaded_file, account_base_currency: str) -> ImportJob:
+    """Store the uploaded file and queue it for import."""
+    job = ImportJob(user=user, source='csv', options={'account_base_currency': account_base_currency})
+    job.upload.save(uploaded_file.name, uploaded_file, save=False)
+    job.save()
+    logger.info(f"User {user.id}: Queued CSV import job {job.id} ({uploaded_file.name}).")
+    return job
+
+
+def enqueue_up_sync(user, initial_sync: bool, since_date_str: str = None, until_date_str: str = None) -> ImportJob:
+    """Queue an Up Bank sync for the user."""
+    job = ImportJob.objects.create(user=user, source='up_bank', options={
+        'initial_sync': initial_sync, 'since': since_date_str, 'until': until_date_str,
+    })
+    logger.info(f"User {user.id}: Queued Up Bank sync job {job.id}.")
+    return job
+
+
+def enqueue_up_transaction_processing(user, transaction_ids: list) -> ImportJob:
+    """Queue vendor identification and auto-categorization for transactions stored from Up webhook events."""
+    job = ImportJob.objects.create(user=user, source='up_webhook', options={'transaction_ids': transaction_ids})
+    logger.info(f"User {user.id}: Queued processing of {len(transaction_ids)} webhook transactions as job {job.id}.")
+    return job
+
+
+def requeue_stale_jobs(stale_after: timedelta) -> int:
+    """Put running jobs whose worker stopped reporting progress back in the queue."""
+    cutoff = timezone.now() - stale_after
+    return ImportJob.objects.filter(status='running', updated_at__lt=cutoff).update(
+        status='pending', phase='queued', updated_at=timezone.now()
+    )
+
+
+def claim_next_job() -> Optional[ImportJob]:
+    """
+    Claim the oldest pending job. The conditional update makes the claim safe
+    with several workers on any database backend.
+    """
+    while True:
+        job_id = ImportJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(pk=job_id, status='pending').update(
+            status='running', started_at=now, updated_at=now, attempt=F('attempt') + 1
+        )
+        if claimed:
+            return ImportJob.objects.select_related('user').get(pk=job_id)
+
+
+def run_job(job: ImportJob) -> ImportJob:
+    """Run a claimed job to completion, recording the outcome on the job."""
+    logger.info(f"User {job.user_id}: Running {job.source} import job {job.id} (attempt {job.attempt}).")
+    try:
+        try:
+            if job.source == 'csv':
+                _run_csv_job(job)
+            elif job.source == 'up_bank':
+                _run_up_sync_job(job)
+            elif job.source == 'up_webhook':
+                _run_up_webhook_job(job)
+            else:
+                _finish(job, 'failed', f"Unknown import source '{job.source}'.")
+        except JobSuperseded:
+            raise
+        except Exception as e:
+            logger.exception(f"User {job.user_id}: Import job {job.id} failed: {e}")
+            _finish(job, 'failed', 'An unexpected server error occurred during the import.')
+    except JobSuperseded:
+        # The upload now belongs to the worker holding the latest claim
+        logger.warning(f"User {job.user_id}: Import job {job.id} was claimed again by another worker; "
+                       f"stopped attempt {job.attempt}.")
+        return job
+    if job.upload:
+        job.upload.delete(save=False)
+        ImportJob.objects.filter(pk=job.pk).update(upload=None)
+    return job
+
+
+def _update_progress(job: ImportJob, **fields) -> None:
+    """Record progress of the job's current claim; raises JobSuperseded once it was claimed again."""
+    updated = ImportJob.objects.filter(pk=job.pk, attempt=job.attempt).update(updated_at=timezone.now(), **fields)
+    if not updated:
+        raise JobSuperseded(job.pk)
+    for name, value in fields.items():
+        setattr(job, name, value)
+
+
+def _finish(job: ImportJob, status: str, message: str, result: dict = None) -> None:
+    _update_progress(job, status=status, phase='done', message=message, result=result, finished_at=timezone.now())
+
+
+def _csv_progress_fields(result: CSVImportResult) -> dict:
+    return {
+        'rows_parsed': result.processed_rows,
+        'rows_inserted': result.created_count,
+        'duplicate_count': result.duplicate_count,
+        'vendor_identified': result.vendor_identified_count,
+        'auto_categorized': result.auto_categorized_count,
+        'error_count': len(result.errors),
+    }
+
+
+def _run_csv_job(job: ImportJob) -> None:
+    _update_progress(job, phase='importing')
+    importer = CSVTransactionImporter(
+        job.user,
+        job.options.get('account_base_currency', 'EUR'),
+        progress_callback=lambda result: _update_progress(job, **_csv_progress_fields(result)),
+        parse_workers=IMPORT_JOB_PARSE_WORKERS,
+    )
+    try:
+        with job.upload.open('rb') as upload:
+            result = importer.import_file(upload)
+    except CSVImportError as e:
+        _finish(job, 'failed', str(e))
+        return
+    except UnicodeDecodeError:
+        _finish(job, 'failed', 'Failed to decode file. Please ensure it is UTF-8 encoded.')
+        return
+    except csv.Error as e:
+        _finish(job, 'failed', f'Error parsing CSV file: {e}')
+        return
+
+    payload = result.to_dict()
+    payload['errors'] = payload['errors'][:MAX_STORED_JOB_ERRORS]
+    _update_progress(job, **_csv_progress_fields(result))
+    # Same condition under which the synchronous upload answers 400
+    job_status = 'failed' if result.response_status == http_status.HTTP_400_BAD_REQUEST else 'completed'
+    _finish(job, job_status, payload['message'], payload)
+
+
+def _up_sync_progress_fields(counts: dict) -> dict:
+    return {
+        'rows_parsed': counts.get('created_count', 0) + counts.get('duplicate_count', 0),
+        'rows_inserted': counts.get('created_count', 0),
+        'duplicate_count': counts.get('duplicate_count', 0),
+        'vendor_identified': counts.get('vendor_identified_count', 0),
+        'auto_categorized': counts.get('auto_categorized_count', 0),
+        'error_count': counts.get('skipped_conversion_error', 0),
+    }
+
+
+def _run_up_sync_job(job: ImportJob) -> None:
+    from integrations.logic import sync_up_transactions_for_user
+
+    _update_progress(job, phase='syncing')
+    sync_result = sync_up_transactions_for_user(
+        user_id=job.user_id,
+        initial_sync=job.options.get('initial_sync', False),
+        since_date_str=job.options.get('since'),
+        until_date_str=job.options.get('until'),
+        # Reported per page, which also keeps a long sync from being requeued as stale
+        progress_callback=lambda counts: _update_progress(job, **_up_sync_progress_fields(counts)),
+    )
+    _update_progress(job, **_up_sync_progress_fields(sync_result))
+    job_status = 'completed' if sync_result.get('success') else 'failed'
+    _finish(job, job_status, sync_result.get('message', ''), sync_result)
+
+
+def _run_up_webhook_job(job: ImportJob) -> None:
+    from integrations.logic import process_new_up_transactions
+
+    _update_progress(job, phase='enriching')
+    transaction_ids = job.options.get('transaction_ids', [])
+    counts = {}
+    process_new_up_transactions(job.user, transaction_ids, counts)
+    _update_progress(
+        job,
+        rows_parsed=len(transaction_ids),
+        rows_inserted=len(transaction_ids),
+        vendor_identified=counts.get('vendor_identified_count', 0),
+        auto_categorized=counts.get('auto_categorized_count', 0),
+    )
+    _finish(job, 'completed', f"Processed {len(transaction_ids)} transactions from Up Bank webhook events.", counts)
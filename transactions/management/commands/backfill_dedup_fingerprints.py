@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.dedup import FINGERPRINT_BACKFILL_BATCH_SIZE, backfill_dedup_fingerprints
+from transactions.models import Transaction
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Populates Transaction.dedup_fingerprint for transactions created before the field existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only backfill transactions of this username.')
+        parser.add_argument('--batch-size', type=int, default=FINGERPRINT_BACKFILL_BATCH_SIZE,
+                            help=f'Transactions updated per query (default: {FINGERPRINT_BACKFILL_BATCH_SIZE}).')
+
+    def handle(self, *args, **options):
+        queryset = Transaction.objects.all()
+        if options['user']:
+            try:
+                queryset = queryset.filter(user=User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist.")
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive.')
+
+        pending = queryset.filter(dedup_fingerprint__isnull=True).count()
+        self.stdout.write(f"{pending} transactions without a dedup fingerprint.")
+        updated = backfill_dedup_fingerprints(queryset, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Backfilled dedup fingerprints for {updated} transactions."))
@@ -0,0 +1,72 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.vendor_names import (
+    VENDOR_NAME_CACHE_SIZE,
+    clear_vendor_name_caches,
+    extract_original_vendor_name,
+    extract_vendor_name,
+)
+
+# Description templates modelled on real bank exports (card numbers, dates, codes, locations)
+DESCRIPTION_TEMPLATES = [
+    'WOOLWORTHS {n} SYDNEY AU',
+    'COLES EXPRESS {n} - MELBOURNE',
+    'EFTPOS PURCHASE BUNNINGS WAREHOUSE {n}',
+    'VISA 1234****{n:04d} NETFLIX.COM',
+    'UBER *EATS {d}/{m} HELP.UBER.COM',
+    'SHELL COLES EXPRESS {n}  BRISBANE',
+    'POS AUTHORISATION KMART PTY LTD {n}',
+    'TRANSFER TO SAVINGS REF{n}',
+    'SPOTIFY AB | STOCKHOLM',
+    'ALDI STORES {n} / ADELAIDE',
+    'JB HI-FI STORE {n}',
+    'AMAZON MKTPLACE PMTS AMZN.COM.AU',
+]
+
+
+class Command(BaseCommand):
+    help = 'Measures vendor-name extraction throughput on synthetic transaction descriptions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1_000_000,
+                            help='Number of descriptions to process (default: 1,000,000).')
+        parser.add_argument('--distinct', type=int, default=20_000,
+                            help='Number of distinct descriptions in the corpus (default: 20,000).')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        count = options['count']
+        distinct = options['distinct']
+        if count <= 0 or distinct <= 0:
+            raise CommandError('--count and --distinct must be positive.')
+
+        rng = random.Random(options['seed'])
+        corpus = [
+            rng.choice(DESCRIPTION_TEMPLATES).format(
+                n=rng.randint(0, 9999), d=rng.randint(1, 28), m=rng.randint(1, 12)
+            )
+            for _ in range(distinct)
+        ]
+        descriptions = [corpus[rng.randrange(distinct)] for _ in range(count)]
+        self.stdout.write(f"{count:,} descriptions ({distinct:,} distinct, memo size {VENDOR_NAME_CACHE_SIZE:,})")
+
+        uncached = extract_vendor_name.__wrapped__
+        self._report('extract_vendor_name (uncached)', descriptions, uncached)
+
+        clear_vendor_name_caches()
+        self._report('extract_vendor_name (memoized)', descriptions, extract_vendor_name)
+        self._report('extract_original_vendor_name (memoized)', descriptions, extract_original_vendor_name)
+
+        info = extract_vendor_name.cache_info()
+        self.stdout.write(f"Memo hits: {info.hits:,}, misses: {info.misses:,}")
+
+    def _report(self, label, descriptions, func):
+        start = time.perf_counter()
+        for description in descriptions:
+            func(description)
+        elapsed = time.perf_counter() - start
+        rate = len(descriptions) / elapsed if elapsed else float('inf')
+        self.stdout.write(self.style.SUCCESS(f"{label}: {elapsed:.2f}s ({rate:,.0f} descriptions/s)"))
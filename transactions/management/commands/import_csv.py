@@ -0,0 +1,66 @@
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.csv_import import CSVTransactionImporter, DEFAULT_PARSE_WORKERS
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Imports one or more bank CSV exports for a user, parsing rows in parallel worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Paths of the CSV files to import.')
+        parser.add_argument('--user', required=True, help='Username to import the transactions for.')
+        parser.add_argument('--currency', default='EUR',
+                            help='Account base currency of the exports (default: EUR).')
+        parser.add_argument('--workers', type=int, default=DEFAULT_PARSE_WORKERS,
+                            help=f'Parser processes; 0 or 1 parses in this process (default: {DEFAULT_PARSE_WORKERS}).')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows de-duplicated and inserted per database transaction.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+        currency = options['currency'].upper()
+        if len(currency) != 3:
+            raise CommandError('--currency must be a 3-letter currency code.')
+        for path in options['files']:
+            if not os.path.isfile(path):
+                raise CommandError(f"File not found: {path}")
+
+        # One importer for all files: shared lookups, and rows repeated across files are imported once
+        importer = CSVTransactionImporter(
+            user, currency, chunk_size=options['chunk_size'], parse_workers=options['workers']
+        )
+        start = time.perf_counter()
+        outcomes = importer.import_files(self._open_files(options['files']))
+        elapsed = time.perf_counter() - start
+
+        total_created = 0
+        for path, result, error in outcomes:
+            if result is None:
+                self.stderr.write(self.style.ERROR(f"{path}: {error}"))
+                continue
+            total_created += result.created_count
+            self.stdout.write(f"{path}: {result.build_message()}")
+            for row_error in result.errors[:20]:
+                self.stdout.write(f"  {row_error}")
+            if len(result.errors) > 20:
+                self.stdout.write(f"  ... and {len(result.errors) - 20} more errors.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {total_created} transactions from {len(options['files'])} files in {elapsed:.1f}s."
+        ))
+
+    @staticmethod
+    def _open_files(paths):
+        """Open the files one at a time, as the importer reaches them."""
+        for path in paths:
+            with open(path, 'rb') as csv_file:
+                yield path, csv_file
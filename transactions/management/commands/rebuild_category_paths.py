@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from transactions.models import Category, CustomCategory, rebuild_materialized_paths
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the materialized path and depth of every Category and CustomCategory from their '
+            'parent links. Needed after bulk_create() or queryset update() of parents, which bypass save().')
+
+    def handle(self, *args, **options):
+        for model in (Category, CustomCategory):
+            updated = rebuild_materialized_paths(model)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt paths of {updated} {model._meta.verbose_name_plural}."))
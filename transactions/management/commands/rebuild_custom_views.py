@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.models import CustomView
+from transactions.view_engine import build_custom_view_membership
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Rebuilds the materialized membership and totals of custom views from their search criteria. '
+            'Needed after queryset update() of transactions, which bypasses signals.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the views of this username.')
+
+    def handle(self, *args, **options):
+        views = CustomView.objects.all()
+        if options['user']:
+            try:
+                views = views.filter(user=User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist.")
+
+        rebuilt = 0
+        for view in views.iterator():
+            build_custom_view_membership(view)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt membership of {rebuilt} custom views."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from transactions.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = ('(Re)creates the transaction full-text search index and repopulates it. Needed after '
+            'restoring a database or after a migration rebuilt the transactions table on SQLite.')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend(connection)
+        backend.uninstall(connection)
+        backend.install(connection)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the '{backend.name}' transaction search index."))
@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from transactions.import_jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Processes queued CSV import and Up Bank sync jobs (run alongside the web server).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process the jobs currently queued, then exit.')
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help='Exit after processing this many jobs (default: no limit).')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait between polls when the queue is empty (default: 2).')
+        parser.add_argument('--stale-after', type=int, default=30,
+                            help='Requeue running jobs with no progress for this many minutes (default: 30).')
+
+    def handle(self, *args, **options):
+        if options['poll_interval'] <= 0 or options['stale_after'] <= 0:
+            raise CommandError('--poll-interval and --stale-after must be positive.')
+
+        requeued = requeue_stale_jobs(timedelta(minutes=options['stale_after']))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale import jobs."))
+
+        processed = 0
+        self.stdout.write('Import worker started.')
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            run_job(job)
+            processed += 1
+            self.stdout.write(f"Job {job.id} ({job.source}, user {job.user_id}): {job.status}. {job.message}")
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"Import worker processed {processed} jobs."))
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0024_alter_importreviewdecision_unique_together_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='dedup_fingerprint',
+            field=models.CharField(blank=True, editable=False, help_text='Hash of date, amount, direction, description and currency used to detect duplicate imports.', max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'dedup_fingerprint'], name='transaction_user_id_dcb4b2_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:26
+
+import django.db.models.deletion
+import transactions.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0025_transaction_dedup_fingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.CharField(default=transactions.models.generate_import_job_id, editable=False, help_text='UUID for the import job.', max_length=36, primary_key=True, serialize=False)),
+                ('source', models.CharField(choices=[('csv', 'CSV Upload'), ('up_bank', 'Up Bank API')], help_text='Source of the import (CSV, API, etc.).', max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10)),
+                ('phase', models.CharField(choices=[('queued', 'Queued'), ('importing', 'Parsing and inserting'), ('syncing', 'Syncing with bank'), ('done', 'Done')], default='queued', max_length=20)),
+                ('upload', models.FileField(blank=True, help_text='Uploaded file for CSV imports; removed once the job finishes.', null=True, upload_to='imports/%Y/%m/')),
+                ('options', models.JSONField(blank=True, default=dict, help_text='Import parameters (e.g. account_base_currency, since/until).')),
+                ('rows_parsed', models.IntegerField(default=0, help_text='Number of data rows read so far.')),
+                ('rows_inserted', models.IntegerField(default=0, help_text='Number of new (non-duplicate) transactions created so far.')),
+                ('duplicate_count', models.IntegerField(default=0)),
+                ('vendor_identified', models.IntegerField(default=0, help_text='Number of new transactions assigned a vendor so far.')),
+                ('auto_categorized', models.IntegerField(default=0, help_text='Number of new transactions auto-categorized so far.')),
+                ('error_count', models.IntegerField(default=0)),
+                ('message', models.TextField(blank=True, default='')),
+                ('result', models.JSONField(blank=True, help_text='Final result payload, as returned by the synchronous endpoint.', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(help_text='User who started the import.', on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Import Job',
+                'verbose_name_plural': 'Import Jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'created_at'], name='transaction_user_id_104d1a_idx'), models.Index(fields=['status', 'created_at'], name='transaction_status_8073e2_idx')],
+            },
+        ),
+    ]
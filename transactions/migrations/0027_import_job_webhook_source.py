@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0026_import_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='phase',
+            field=models.CharField(choices=[('queued', 'Queued'), ('importing', 'Parsing and inserting'), ('syncing', 'Syncing with bank'), ('enriching', 'Identifying vendors and categorizing'), ('done', 'Done')], default='queued', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='source',
+            field=models.CharField(choices=[('csv', 'CSV Upload'), ('up_bank', 'Up Bank API'), ('up_webhook', 'Up Bank Webhook')], help_text='Source of the import (CSV, API, etc.).', max_length=20),
+        ),
+    ]
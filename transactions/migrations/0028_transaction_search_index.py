@@ -0,0 +1,90 @@
+from django.db import migrations
+
+# The DDL is frozen here as it stood when this migration was written; transactions/search.py
+# queries these objects and `manage.py rebuild_search_index` recreates them from its backends.
+# Indexed columns of transactions_transaction: description, vendor_name,
+# original_vendor_name, source_notifications
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transactions_transaction_fts USING fts5("
+    "description, vendor_name, original_vendor_name, source_notifications, "
+    "content='transactions_transaction', content_rowid='id', tokenize='trigram')",
+
+    "CREATE TRIGGER IF NOT EXISTS transactions_transaction_fts_ai AFTER INSERT ON transactions_transaction BEGIN "
+    "INSERT INTO transactions_transaction_fts(rowid, description, vendor_name, original_vendor_name, source_notifications) "
+    "VALUES (new.id, new.description, new.vendor_name, new.original_vendor_name, new.source_notifications); END",
+
+    "CREATE TRIGGER IF NOT EXISTS transactions_transaction_fts_ad AFTER DELETE ON transactions_transaction BEGIN "
+    "INSERT INTO transactions_transaction_fts(transactions_transaction_fts, rowid, description, vendor_name, original_vendor_name, source_notifications) "
+    "VALUES ('delete', old.id, old.description, old.vendor_name, old.original_vendor_name, old.source_notifications); END",
+
+    "CREATE TRIGGER IF NOT EXISTS transactions_transaction_fts_au AFTER UPDATE OF "
+    "description, vendor_name, original_vendor_name, source_notifications ON transactions_transaction BEGIN "
+    "INSERT INTO transactions_transaction_fts(transactions_transaction_fts, rowid, description, vendor_name, original_vendor_name, source_notifications) "
+    "VALUES ('delete', old.id, old.description, old.vendor_name, old.original_vendor_name, old.source_notifications); "
+    "INSERT INTO transactions_transaction_fts(rowid, description, vendor_name, original_vendor_name, source_notifications) "
+    "VALUES (new.id, new.description, new.vendor_name, new.original_vendor_name, new.source_notifications); END",
+
+    "INSERT INTO transactions_transaction_fts(transactions_transaction_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS transactions_transaction_fts_ai",
+    "DROP TRIGGER IF EXISTS transactions_transaction_fts_ad",
+    "DROP TRIGGER IF EXISTS transactions_transaction_fts_au",
+    "DROP TABLE IF EXISTS transactions_transaction_fts",
+]
+
+# Must stay identical to PostgresSearchBackend.document_sql for the planner to use the indexes
+POSTGRES_DOCUMENT = (
+    "(coalesce(\"transactions_transaction\".\"description\", '')"
+    " || ' ' || coalesce(\"transactions_transaction\".\"vendor_name\", '')"
+    " || ' ' || coalesce(\"transactions_transaction\".\"original_vendor_name\", '')"
+    " || ' ' || coalesce(\"transactions_transaction\".\"source_notifications\", ''))"
+)
+
+POSTGRES_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS transactions_transaction_search_tsv ON transactions_transaction "
+    f"USING gin (to_tsvector('simple', {POSTGRES_DOCUMENT}))",
+    "CREATE INDEX IF NOT EXISTS transactions_transaction_search_trgm ON transactions_transaction "
+    f"USING gin ({POSTGRES_DOCUMENT} gin_trgm_ops)",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS transactions_transaction_search_tsv",
+    "DROP INDEX IF EXISTS transactions_transaction_search_trgm",
+]
+
+# Other databases search with unindexed icontains and need nothing
+STATEMENTS = {
+    'sqlite': (SQLITE_INSTALL, SQLITE_UNINSTALL),
+    'postgresql': (POSTGRES_INSTALL, POSTGRES_UNINSTALL),
+}
+
+
+def _run(schema_editor, direction):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements:
+        for statement in statements[direction]:
+            schema_editor.execute(statement, params=None)
+
+
+def install_search_index(apps, schema_editor):
+    _run(schema_editor, 0)
+
+
+def uninstall_search_index(apps, schema_editor):
+    _run(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+    """Full-text search index for transactions; the index depends on the database (see transactions/search.py)."""
+
+    dependencies = [
+        ('transactions', '0027_import_job_webhook_source'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
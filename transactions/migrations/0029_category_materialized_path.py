@@ -0,0 +1,57 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:26
+
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    # A copy of transactions.models.rebuild_materialized_paths as of this migration:
+    # path lists the pks from the root down to the node ('/3/17/42/'), depth is 0 for roots
+    for model_name in ('Category', 'CustomCategory'):
+        model = apps.get_model('transactions', model_name)
+        children = {}
+        for pk, parent_id in model.objects.values_list('pk', 'parent_id'):
+            children.setdefault(parent_id, []).append(pk)
+        paths = {}
+        stack = [(pk, f"/{pk}/", 0) for pk in children.get(None, [])]
+        while stack:
+            pk, path, depth = stack.pop()
+            paths[pk] = (path, depth)
+            stack.extend((child, f"{path}{child}/", depth + 1) for child in children.get(pk, []))
+
+        to_update = []
+        for node in model.objects.only('pk', 'path', 'depth').iterator(chunk_size=1000):
+            # Rows whose parent chain never reaches a root (cycles) become roots
+            node.path, node.depth = paths.get(node.pk, (f"/{node.pk}/", 0))
+            to_update.append(node)
+        model.objects.bulk_update(to_update, ['path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0028_transaction_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Hierarchy level (0 = root level).'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, help_text="Materialized path of pks from the root to this node, e.g. '/3/17/42/'.", max_length=1024),
+        ),
+        migrations.AddField(
+            model_name='customcategory',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Hierarchy level (0 = root level).'),
+        ),
+        migrations.AddField(
+            model_name='customcategory',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, help_text="Materialized path of pks from the root to this node, e.g. '/3/17/42/'.", max_length=1024),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:33
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0029_category_materialized_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customview',
+            name='membership_fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Fingerprint of the search criteria the membership was built for. Empty when it must be rebuilt.', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='customview',
+            name='total_credit',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text="Sum of the AUD amounts of the view's credit transactions.", max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='customview',
+            name='total_debit',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text="Sum of the AUD amounts of the view's debit transactions.", max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='customview',
+            name='transaction_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of transactions in the view.'),
+        ),
+        migrations.CreateModel(
+            name='CustomViewMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('direction', models.CharField(choices=[('DEBIT', 'Debit'), ('CREDIT', 'Credit')], help_text='Direction of the transaction when it was added to the totals.', max_length=6)),
+                ('aud_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='AUD amount of the transaction when it was added to the totals.', max_digits=12)),
+                ('custom_view', models.ForeignKey(help_text='The custom view the transaction belongs to.', on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='transactions.customview')),
+                ('transaction', models.ForeignKey(help_text="A transaction matching the view's search criteria.", on_delete=django.db.models.deletion.CASCADE, related_name='custom_view_memberships', to='transactions.transaction')),
+            ],
+            options={
+                'verbose_name': 'Custom View Membership',
+                'verbose_name_plural': 'Custom View Memberships',
+                'unique_together': {('custom_view', 'transaction')},
+            },
+        ),
+    ]
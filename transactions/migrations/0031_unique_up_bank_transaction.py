@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:53
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_no_duplicate_up_transactions(apps, schema_editor):
+    """
+    Refuse to create the constraint while a user has several copies of an Up transaction.
+    The copies may carry their own categories, notes, splits and custom view memberships,
+    so they are listed for review instead of being deleted here.
+    """
+    Transaction = apps.get_model('transactions', 'Transaction')
+    duplicates = list(
+        Transaction.objects.filter(source='up_bank', bank_transaction_id__isnull=False)
+        .values('user_id', 'bank_transaction_id').annotate(copies=Count('id')).filter(copies__gt=1)
+        .order_by('user_id', 'bank_transaction_id')
+    )
+    if not duplicates:
+        return
+    lines = []
+    for duplicate in duplicates:
+        ids = Transaction.objects.filter(
+            source='up_bank', user_id=duplicate['user_id'], bank_transaction_id=duplicate['bank_transaction_id']
+        ).order_by('id').values_list('id', flat=True)
+        lines.append(
+            f"  user {duplicate['user_id']}, Up transaction {duplicate['bank_transaction_id']}: "
+            f"transaction ids {', '.join(str(pk) for pk in ids)}"
+        )
+    raise RuntimeError(
+        f"Found {len(duplicates)} Up transactions stored more than once. Keep one copy of each "
+        "(moving any edits made to the others onto it), delete the rest and migrate again:\n" + '\n'.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0030_custom_view_membership'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_no_duplicate_up_transactions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('source', 'up_bank')), fields=('user', 'bank_transaction_id'), name='unique_up_bank_transaction_per_user'),
+        ),
+    ]
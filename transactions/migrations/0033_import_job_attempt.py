@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0032_cache_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='attempt',
+            field=models.IntegerField(default=0, help_text='Number of times a worker claimed the job; only the latest claim records progress.'),
+        ),
+    ]
@@ -1,6 +1,11 @@
 # transactions/models.py
+import datetime
+import hashlib
+import uuid
 from decimal import Decimal, ROUND_HALF_UP
-from django.db import models
+from django.db import models, transaction as db_transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.conf import settings # To reference the User model safely
 # from .services import get_historical_rate # Import new service <-- REMOVE THIS LINE
 import logging # For logging in the new method
@@ -11,8 +16,148 @@ logger = logging.getLogger(__name__) # Logger for model method
 # Define the base currency here to avoid circular imports
 BASE_CURRENCY_FOR_CONVERSION = 'AUD'
 
+# Transaction fields that make up the import duplicate-check fingerprint
+DEDUP_FINGERPRINT_FIELDS = ('transaction_date', 'original_amount', 'direction', 'description', 'original_currency')
+# Transaction fields whose loaded values instances remember, so that signal handlers can
+# skip saves that leave them unchanged (see Transaction.changed_fields)
+TRACKED_TRANSACTION_FIELDS = (
+    'transaction_date', 'description', 'original_amount', 'aud_amount', 'direction', 'category_id', 'vendor_id',
+)
+
+
+def compute_dedup_fingerprint(transaction_date, original_amount, direction, description, original_currency):
+    """
+    Hash of the fields imports use to detect duplicate transactions
+    (date, amount, direction, description, currency). Returns a 64-char hex digest.
+    """
+    if isinstance(transaction_date, datetime.datetime):
+        transaction_date = transaction_date.date()
+    date_str = transaction_date.isoformat() if hasattr(transaction_date, 'isoformat') else str(transaction_date)
+    amount = Decimal(str(original_amount)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    key = '\x1f'.join([
+        date_str, str(amount), direction or '', description or '', (original_currency or '').upper(),
+    ])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+PATH_SEPARATOR = '/'
+
+
+def materialized_path(parent_path: str, pk) -> str:
+    """Path of a node: its parent's path (or the separator, for roots) followed by its own pk."""
+    return f"{parent_path or PATH_SEPARATOR}{pk}{PATH_SEPARATOR}"
+
+
+def rebuild_materialized_paths(model, batch_size: int = 1000) -> int:
+    """
+    Recompute path and depth of every row of a MaterializedPathModel from the parent
+    links, root first. Rows whose parent chain never reaches a root (cycles) become
+    roots. Works on historical models in migrations. Returns the number of rows updated.
+    """
+    children = {}
+    for pk, parent_id in model.objects.values_list('pk', 'parent_id'):
+        children.setdefault(parent_id, []).append(pk)
+    paths = {}
+    stack = [(pk, materialized_path('', pk), 0) for pk in children.get(None, [])]
+    while stack:
+        pk, path, depth = stack.pop()
+        paths[pk] = (path, depth)
+        stack.extend((child, materialized_path(path, child), depth + 1) for child in children.get(pk, []))
+    for parent_id, pks in children.items():
+        for pk in pks:
+            if pk not in paths:
+                logger.warning(f"{model.__name__} {pk}: Parent chain does not reach a root, treated as a root")
+                paths[pk] = (materialized_path('', pk), 0)
+
+    to_update = []
+    for node in model.objects.only('pk', 'path', 'depth').iterator(chunk_size=batch_size):
+        node_path, node_depth = paths[node.pk]
+        if (node.path, node.depth) != (node_path, node_depth):
+            node.path, node.depth = node_path, node_depth
+            to_update.append(node)
+    model.objects.bulk_update(to_update, ['path', 'depth'], batch_size=batch_size)
+    return len(to_update)
+
+
+class MaterializedPathModel(models.Model):
+    """
+    Self-referencing hierarchy with a maintained materialized path: 'path' lists the pks
+    from the root down to the node itself ('/3/17/42/') and 'depth' is 0 for roots.
+    Descendants are one indexed prefix query and ancestors one pk__in query, instead of
+    a query per level. save() keeps both fields current, moving the whole subtree along
+    when the parent changes; bulk_create() and queryset update() of 'parent' bypass it
+    (see the rebuild_category_paths command).
+    Subclasses define the 'parent' foreign key to 'self'.
+    """
+    path = models.CharField(
+        max_length=1024,
+        db_index=True,
+        editable=False,
+        default='',
+        help_text="Materialized path of pks from the root to this node, e.g. '/3/17/42/'."
+    )
+    depth = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text="Hierarchy level (0 = root level)."
+    )
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        manager = type(self)._base_manager
+        parent_path = ''
+        if self.parent_id is not None:
+            # Read from the database: an in-memory parent may have been moved since it was loaded
+            parent_path = manager.filter(pk=self.parent_id).values_list('path', flat=True).first() or ''
+            if self.path and parent_path.startswith(self.path):
+                raise ValueError(f"{type(self).__name__} {self.pk} cannot be moved under its own descendant.")
+        super().save(*args, **kwargs)
+
+        new_path = materialized_path(parent_path, self.pk)
+        new_depth = new_path.count(PATH_SEPARATOR) - 2
+        if new_path == self.path and new_depth == self.depth:
+            return
+        old_path, old_depth = self.path, self.depth
+        with db_transaction.atomic(using=self._state.db):
+            manager.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+            if old_path:
+                manager.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (new_depth - old_depth),
+                )
+        self.path, self.depth = new_path, new_depth
+
+    def ancestor_pks(self) -> list:
+        """Pks from the root down to this node itself, read from the path."""
+        to_python = self._meta.pk.to_python
+        return [to_python(pk) for pk in self.path.split(PATH_SEPARATOR) if pk]
+
+    def get_ancestors(self, include_self=False):
+        """Ancestors from the root down, in one query."""
+        pks = self.ancestor_pks() if include_self else self.ancestor_pks()[:-1]
+        return type(self)._default_manager.filter(pk__in=pks).order_by('depth')
+
+    def get_descendants(self, include_self=False):
+        """All descendant nodes (children, grandchildren, etc.), depth first, in one query."""
+        if not self.path:  # Unsaved, or saved before paths were built
+            return type(self)._default_manager.none()
+        descendants = type(self)._default_manager.filter(path__startswith=self.path).order_by('path')
+        return descendants if include_self else descendants.exclude(pk=self.pk)
+
+    def get_level(self):
+        """Get the hierarchical level of this node (0 = root level)."""
+        return self.depth
+
+    def get_full_path(self, separator=" > "):
+        """Get the full hierarchical path of this node's names, in one query."""
+        pks = self.ancestor_pks()
+        names = dict(type(self)._default_manager.filter(pk__in=pks).values_list('pk', 'name'))
+        return separator.join(names[pk] for pk in pks if pk in names)
+
+
 # --- Keep existing Category model ---
-class Category(models.Model):
+class Category(MaterializedPathModel):
     """
     Represents a category for transactions, supporting hierarchical structures
     and distinguishing between system-defined and user-defined categories.
@@ -382,6 +527,33 @@ class CustomView(models.Model):
         db_index=True,
         help_text="Whether this view has been archived (hidden from active use)."
     )
+    # Materialized membership state, maintained by view_engine.py
+    membership_fingerprint = models.CharField(
+        max_length=40,
+        blank=True,
+        default='',
+        editable=False,
+        help_text="Fingerprint of the search criteria the membership was built for. Empty when it must be rebuilt."
+    )
+    transaction_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of transactions in the view."
+    )
+    total_debit = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        help_text="Sum of the AUD amounts of the view's debit transactions."
+    )
+    total_credit = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        help_text="Sum of the AUD amounts of the view's credit transactions."
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -402,72 +574,18 @@ class CustomView(models.Model):
 
     def get_matching_transactions(self):
         """
-        Apply the search criteria to find matching transactions.
-        Returns a QuerySet of transactions that match this view's criteria.
+        Transactions matching the search criteria, read from the view's materialized
+        membership (built on first use and after the criteria change; see view_engine.py).
         """
-        from django.db.models import Q
-        from datetime import datetime
-        
-        queryset = Transaction.objects.filter(user=self.user)
-        criteria = self.search_criteria
-        
-        if not criteria:
-            return queryset.none()
-        
-        # Apply date range filters
-        if 'date_from' in criteria and criteria['date_from']:
-            try:
-                date_from = datetime.strptime(criteria['date_from'], '%Y-%m-%d').date()
-                queryset = queryset.filter(transaction_date__gte=date_from)
-            except ValueError:
-                pass
-        
-        if 'date_to' in criteria and criteria['date_to']:
-            try:
-                date_to = datetime.strptime(criteria['date_to'], '%Y-%m-%d').date()
-                queryset = queryset.filter(transaction_date__lte=date_to)
-            except ValueError:
-                pass
-        
-        # Apply amount filters
-        if 'amount_min' in criteria and criteria['amount_min']:
-            try:
-                amount_min = Decimal(str(criteria['amount_min']))
-                queryset = queryset.filter(original_amount__gte=amount_min)
-            except (ValueError, TypeError):
-                pass
-        
-        if 'amount_max' in criteria and criteria['amount_max']:
-            try:
-                amount_max = Decimal(str(criteria['amount_max']))
-                queryset = queryset.filter(original_amount__lte=amount_max)
-            except (ValueError, TypeError):
-                pass
-        
-        # Apply vendor filters
-        if 'vendor_ids' in criteria and criteria['vendor_ids']:
-            vendor_ids = criteria['vendor_ids']
-            if isinstance(vendor_ids, list):
-                queryset = queryset.filter(vendor_id__in=vendor_ids)
-        
-        # Apply category filters
-        if 'category_ids' in criteria and criteria['category_ids']:
-            category_ids = criteria['category_ids']
-            if isinstance(category_ids, list):
-                queryset = queryset.filter(category_id__in=category_ids)
-        
-        # Apply direction filter
-        if 'direction' in criteria and criteria['direction']:
-            queryset = queryset.filter(direction=criteria['direction'])
-        
-        # Apply description search
-        if 'description_contains' in criteria and criteria['description_contains']:
-            search_term = criteria['description_contains']
-            queryset = queryset.filter(description__icontains=search_term)
-        
-        return queryset.select_related('vendor', 'category').order_by('-transaction_date')
+        from .view_engine import get_custom_view_membership
+        return get_custom_view_membership(self).select_related('vendor', 'category').order_by('-transaction_date')
 
-class CustomCategory(models.Model):
+    def get_totals(self):
+        """Precomputed transaction count and AUD debit/credit totals of the view."""
+        from .view_engine import get_custom_view_totals
+        return get_custom_view_totals(self)
+
+class CustomCategory(MaterializedPathModel):
     """
     Represents a custom category within a specific CustomView, allowing users
     to create personalized category hierarchies for different analysis purposes.
@@ -520,34 +638,6 @@ class CustomCategory(models.Model):
             return f"{self.parent.name} > {self.name} ({self.custom_view.name})"
         return f"{self.name} ({self.custom_view.name})"
 
-    def get_full_path(self):
-        """Get the full hierarchical path of this category."""
-        path = [self.name]
-        current = self.parent
-        while current:
-            path.insert(0, current.name)
-            current = current.parent
-        return " > ".join(path)
-
-    def get_descendants(self, include_self=False):
-        """Get all descendant categories (children, grandchildren, etc.)."""
-        descendants = list(self.children.all())
-        if include_self:
-            descendants.insert(0, self)
-        
-        for child in list(descendants):
-            descendants.extend(child.get_descendants())
-        
-        return descendants
-
-    def get_level(self):
-        """Get the hierarchical level of this category (0 = root level)."""
-        level = 0
-        current = self.parent
-        while current:
-            level += 1
-            current = current.parent
-        return level
 
 class Transaction(models.Model):
     SOURCE_CHOICES = [
@@ -663,6 +753,15 @@ class Transaction(models.Model):
         help_text="Whether this transaction has been hidden from the review page."
     )
 
+    # Duplicate detection for imports (see compute_dedup_fingerprint)
+    dedup_fingerprint = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Hash of date, amount, direction, description and currency used to detect duplicate imports."
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_modified = models.DateTimeField(auto_now=True)
@@ -684,6 +783,7 @@ class Transaction(models.Model):
             models.Index(fields=['user', 'vendor_name']),
             models.Index(fields=['user', 'original_vendor_name']),
             models.Index(fields=['auto_categorized']),
+            models.Index(fields=['user', 'dedup_fingerprint']),
         ]
         constraints = [
             models.CheckConstraint(
@@ -698,6 +798,12 @@ class Transaction(models.Model):
                 condition=models.Q(exchange_rate_to_aud__isnull=True) | models.Q(exchange_rate_to_aud__gt=0),
                 name='positive_exchange_rate_when_present'
             ),
+            # Up Bank delivers a transaction through webhook events and syncs, possibly concurrently
+            models.UniqueConstraint(
+                fields=['user', 'bank_transaction_id'],
+                condition=models.Q(source='up_bank'),
+                name='unique_up_bank_transaction_per_user'
+            ),
         ]
 
     def __str__(self):
@@ -711,6 +817,63 @@ class Transaction(models.Model):
             aud_display = f" (~{direction_symbol}{self.aud_amount} AUD)"
         return f"{self.transaction_date} | {self.user.username} | {self.description[:30]} | {orig_display}{aud_display} ({self.source})"
 
+    def build_dedup_fingerprint(self):
+        """Compute the duplicate-check fingerprint from this transaction's current values."""
+        if self.transaction_date is None or self.original_amount is None:
+            return None
+        return compute_dedup_fingerprint(
+            self.transaction_date, self.original_amount, self.direction, self.description, self.original_currency
+        )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._tracked_values = {
+            name: value for name, value in zip(field_names, values) if name in TRACKED_TRANSACTION_FIELDS
+        }
+        return instance
+
+    def _tracked_value(self, name):
+        # Values assigned as strings (e.g. '2024-05-01') are compared as the stored type
+        return self._meta.get_field(name).to_python(getattr(self, name))
+
+    def _saved_tracked_fields(self, update_fields=None):
+        if update_fields is None:
+            return TRACKED_TRANSACTION_FIELDS
+        saved = {self._meta.get_field(name).attname for name in update_fields}
+        return [name for name in TRACKED_TRANSACTION_FIELDS if name in saved]
+
+    def changed_fields(self, names, update_fields=None) -> set:
+        """
+        Which of the tracked field attnames in names a save with update_fields wrote with a
+        new value. All that were written for instances not loaded from the database, or
+        loaded with the fields deferred.
+        """
+        saved = self._saved_tracked_fields(update_fields)
+        names = [name for name in names if name in saved]
+        stored = getattr(self, '_tracked_values', {})
+        changed = set()
+        for name in names:
+            if name not in stored:
+                changed.add(name)
+                continue
+            if self._tracked_value(name) != stored[name]:
+                changed.add(name)
+        return changed
+
+    def save(self, *args, **kwargs):
+        # Keep the fingerprint in sync with the fields it is derived from
+        self.dedup_fingerprint = self.build_dedup_fingerprint()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(DEDUP_FINGERPRINT_FIELDS):
+            kwargs['update_fields'] = set(update_fields) | {'dedup_fingerprint'}
+        super().save(*args, **kwargs)
+        # After the post_save handlers, which compare against the previous values
+        stored = getattr(self, '_tracked_values', {})
+        for name in self._saved_tracked_fields(kwargs.get('update_fields')):
+            stored[name] = self._tracked_value(name)
+        self._tracked_values = stored
+
     @property
     def signed_original_amount(self):
         """Returns the original amount with correct sign based on direction."""
@@ -884,6 +1047,45 @@ class Transaction(models.Model):
             logger.debug(f"Transaction {self.id}: No changes to AUD amount or rate, or still None. Not saved. Current AUD: {self.aud_amount}")
             return self.aud_amount is not None # Return true if AUD amount is populated (even if unchanged), false if None
 
+class CustomViewMembership(models.Model):
+    """
+    Materialized membership of a CustomView: one row per transaction matching its
+    search criteria, with the amount the transaction contributes to the view's totals
+    so that edits and deletes can adjust them by the difference.
+    """
+    custom_view = models.ForeignKey(
+        CustomView,
+        on_delete=models.CASCADE,
+        related_name='memberships',
+        help_text="The custom view the transaction belongs to."
+    )
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.CASCADE,
+        related_name='custom_view_memberships',
+        help_text="A transaction matching the view's search criteria."
+    )
+    direction = models.CharField(
+        max_length=6,
+        choices=Transaction.DIRECTION_CHOICES,
+        help_text="Direction of the transaction when it was added to the totals."
+    )
+    aud_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="AUD amount of the transaction when it was added to the totals."
+    )
+
+    class Meta:
+        verbose_name = "Custom View Membership"
+        verbose_name_plural = "Custom View Memberships"
+        unique_together = ('custom_view', 'transaction')
+
+    def __str__(self):
+        return f"Transaction {self.transaction_id} in view {self.custom_view_id}"
+
+
 # --- Keep existing DescriptionMapping model ---
 class DescriptionMapping(models.Model):
     user = models.ForeignKey(
@@ -966,4 +1168,109 @@ class HistoricalExchangeRate(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.date}: 1 {self.source_currency} = {self.rate} {self.target_currency}"
\ No newline at end of file
+        return f"{self.date}: 1 {self.source_currency} = {self.rate} {self.target_currency}"
+
+def generate_import_job_id():
+    return str(uuid.uuid4())
+
+
+class ImportJob(models.Model):
+    """
+    A queued CSV upload, Up Bank sync or webhook follow-up, processed by the `run_import_worker` command.
+
+    Successor of the earlier ImportSession model: besides the totals it records the
+    job's status, current phase and running counts so clients can poll for progress.
+    """
+
+    SOURCE_CHOICES = [
+        ('csv', 'CSV Upload'),
+        ('up_bank', 'Up Bank API'),
+        ('up_webhook', 'Up Bank Webhook'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    PHASE_CHOICES = [
+        ('queued', 'Queued'),
+        ('importing', 'Parsing and inserting'),
+        ('syncing', 'Syncing with bank'),
+        ('enriching', 'Identifying vendors and categorizing'),
+        ('done', 'Done'),
+    ]
+
+    id = models.CharField(
+        max_length=36,
+        primary_key=True,
+        default=generate_import_job_id,
+        editable=False,
+        help_text="UUID for the import job."
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='import_jobs',
+        help_text="User who started the import."
+    )
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, help_text="Source of the import (CSV, API, etc.).")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True)
+    phase = models.CharField(max_length=20, choices=PHASE_CHOICES, default='queued')
+    attempt = models.IntegerField(
+        default=0,
+        help_text="Number of times a worker claimed the job; only the latest claim records progress."
+    )
+    upload = models.FileField(
+        upload_to='imports/%Y/%m/',
+        null=True,
+        blank=True,
+        help_text="Uploaded file for CSV imports; removed once the job finishes."
+    )
+    options = models.JSONField(default=dict, blank=True, help_text="Import parameters (e.g. account_base_currency, since/until).")
+
+    # Progress counters, updated as the worker goes
+    rows_parsed = models.IntegerField(default=0, help_text="Number of data rows read so far.")
+    rows_inserted = models.IntegerField(default=0, help_text="Number of new (non-duplicate) transactions created so far.")
+    duplicate_count = models.IntegerField(default=0)
+    vendor_identified = models.IntegerField(default=0, help_text="Number of new transactions assigned a vendor so far.")
+    auto_categorized = models.IntegerField(default=0, help_text="Number of new transactions auto-categorized so far.")
+    error_count = models.IntegerField(default=0)
+
+    message = models.TextField(blank=True, default='')
+    result = models.JSONField(null=True, blank=True, help_text="Final result payload, as returned by the synchronous endpoint.")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Import Job"
+        verbose_name_plural = "Import Jobs"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_source_display()} import {self.id} ({self.status}, {self.user.username})"
+
+
+class CacheVersion(models.Model):
+    """
+    Version counter of data derived from a user's vendors, categories and transactions
+    (see cache_versions.py). Kept in the database so that every process sees a bump.
+    """
+    scope = models.CharField(max_length=50)
+    owner = models.CharField(max_length=50, help_text="User id, or 'global' for data shared by all users.")
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Cache Version"
+        verbose_name_plural = "Cache Versions"
+        unique_together = ('scope', 'owner')
+
+    def __str__(self):
+        return f"{self.scope}:{self.owner} v{self.version}"
@@ -0,0 +1,109 @@
+"""
+Pagination classes for the transactions API.
+
+TransactionListPagination adds a keyset (cursor) mode to the standard page-number
+pagination. A cursor holds the (transaction_date, created_at, id) of the last row sent,
+and the next page is the rows after it in (-transaction_date, -created_at, -id) order.
+Each page is then a range read on the (user, transaction_date) index instead of an
+OFFSET scan, and the COUNT(*) only runs when asked for, so deep pages cost the same as
+the first one.
+
+    GET /api/transactions/?pagination=cursor&page_size=50
+    GET <next link from the previous response>
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# --- Standard Pagination ---
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class TransactionListPagination(StandardResultsSetPagination):
+    """
+    Page numbers by default; keyset pagination with ?pagination=cursor or a ?cursor=.
+    Cursor responses are {'next', 'count', 'results'}; count is null unless
+    ?include_count=true.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    count_query_param = 'include_count'
+    keyset_ordering = ('-transaction_date', '-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = (request.query_params.get(self.mode_query_param) == 'cursor'
+                            or self.cursor_query_param in request.query_params)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        if request.query_params.get('ordering'):
+            raise ValidationError({'ordering': 'Custom ordering is not supported with cursor pagination.'})
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.keyset_ordering)
+        include_count = request.query_params.get(self.count_query_param, '').lower() in ('1', 'true')
+        self.count = queryset.count() if include_count else None
+        if position is not None:
+            last_date, last_created_at, last_id = position
+            # The transaction_date bound keeps the read on the (user, transaction_date) index
+            queryset = queryset.filter(transaction_date__lte=last_date).filter(
+                Q(transaction_date__lt=last_date)
+                | Q(transaction_date=last_date, created_at__lt=last_created_at)
+                | Q(transaction_date=last_date, created_at=last_created_at, id__lt=last_id)
+            )
+
+        rows = list(queryset[:page_size + 1])
+        page = rows[:page_size]
+        self.next_position = None
+        if len(rows) > page_size:
+            last = page[-1]
+            if isinstance(last, dict): # values() rows
+                self.next_position = (last['transaction_date'], last['created_at'], last['id'])
+            else:
+                self.next_position = (last.transaction_date, last.created_at, last.id)
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({'next': self.get_next_link(), 'count': self.count, 'results': data})
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    @staticmethod
+    def encode_cursor(position) -> str:
+        last_date, last_created_at, last_id = position
+        payload = json.dumps([last_date.isoformat(), last_created_at.isoformat(), last_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        """The (transaction_date, created_at, id) position in ?cursor=, or None for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw_date, raw_created_at, last_id = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return date.fromisoformat(raw_date), datetime.fromisoformat(raw_created_at), int(last_id)
+        except (binascii.Error, UnicodeError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
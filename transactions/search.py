@@ -0,0 +1,179 @@
+"""
+Full-text search over transaction descriptions, vendor names and notes.
+
+A single ?search= term goes through a backend chosen by database vendor (or by the
+TRANSACTION_SEARCH_BACKEND setting, a dotted path):
+
+- PostgreSQL: a GIN tsvector index answers word-prefix matches and a GIN trigram
+  index (pg_trgm) answers substrings inside words.
+- SQLite: an FTS5 table with the trigram tokenizer, an external-content shadow of
+  transactions_transaction kept in sync by triggers, so bulk_create() and update()
+  are indexed too.
+- Anything else, or an index that is not installed: icontains on each field.
+
+Every whitespace-separated term must occur (case-insensitively) in at least one of
+SEARCH_FIELDS. The indexes are created by migration 0028 and can be rebuilt with
+`manage.py rebuild_search_index`.
+"""
+
+import logging
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Columns of transactions_transaction that are searched (source_notifications holds the bank's notes)
+SEARCH_FIELDS = ('description', 'vendor_name', 'original_vendor_name', 'source_notifications')
+TRANSACTION_TABLE = 'transactions_transaction'
+
+
+def split_terms(query: str) -> list:
+    return [term for term in (query or '').split() if term]
+
+
+class IContainsSearchBackend:
+    """Unindexed fallback: LIKE scans, correct on every database."""
+    name = 'icontains'
+
+    def install(self, connection) -> None:
+        pass
+
+    def uninstall(self, connection) -> None:
+        pass
+
+    def is_installed(self, connection) -> bool:
+        return True
+
+    def search(self, queryset, query: str):
+        for term in split_terms(query):
+            matches_term = Q()
+            for field in SEARCH_FIELDS:
+                matches_term |= Q(**{f"{field}__icontains": term})
+            queryset = queryset.filter(matches_term)
+        return queryset
+
+
+class SQLiteFTSSearchBackend(IContainsSearchBackend):
+    """FTS5 trigram index kept in sync with the transactions table by triggers."""
+    name = 'sqlite_fts5'
+    table = 'transactions_transaction_fts'
+    # The trigram tokenizer only indexes terms of at least three characters
+    min_term_length = 3
+
+    def install(self, connection) -> None:
+        columns = ', '.join(SEARCH_FIELDS)
+        new_values = ', '.join(f"new.{field}" for field in SEARCH_FIELDS)
+        old_values = ', '.join(f"old.{field}" for field in SEARCH_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+                f"{columns}, content='{TRANSACTION_TABLE}', content_rowid='id', tokenize='trigram')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.table}_ai AFTER INSERT ON {TRANSACTION_TABLE} BEGIN "
+                f"INSERT INTO {self.table}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.table}_ad AFTER DELETE ON {TRANSACTION_TABLE} BEGIN "
+                f"INSERT INTO {self.table}({self.table}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.table}_au AFTER UPDATE OF {columns} ON {TRANSACTION_TABLE} BEGIN "
+                f"INSERT INTO {self.table}({self.table}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+                f"INSERT INTO {self.table}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+            )
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+
+    def uninstall(self, connection) -> None:
+        with connection.cursor() as cursor:
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {self.table}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def is_installed(self, connection) -> bool:
+        # Rebuilding the transactions table (e.g. by an ALTER in a later migration) drops the
+        # triggers, so they are checked as well as the index table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+                [self.table, f"{self.table}_ai", f"{self.table}_ad", f"{self.table}_au"],
+            )
+            return cursor.fetchone()[0] == 4
+
+    def search(self, queryset, query: str):
+        terms = split_terms(query)
+        if not terms:
+            return queryset
+        if min(len(term) for term in terms) < self.min_term_length or not self.is_installed(connections[queryset.db]):
+            return super().search(queryset, query)
+        # Each term is a quoted FTS5 string: a substring match in any column
+        match = ' AND '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        return queryset.filter(id__in=RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [match]))
+
+
+class PostgresSearchBackend(IContainsSearchBackend):
+    """GIN tsvector and trigram indexes on one expression over SEARCH_FIELDS."""
+    name = 'postgres'
+    tsvector_index = 'transactions_transaction_search_tsv'
+    trigram_index = 'transactions_transaction_search_trgm'
+    # Queries repeat the indexed expression for the planner to use the indexes; columns are
+    # qualified so joins to tables with the same column names stay unambiguous
+    document_sql = "(" + " || ' ' || ".join(f'coalesce("{TRANSACTION_TABLE}"."{field}", \'\')' for field in SEARCH_FIELDS) + ")"
+
+    def install(self, connection) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.tsvector_index} ON {TRANSACTION_TABLE} "
+                f"USING gin (to_tsvector('simple', {self.document_sql}))"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.trigram_index} ON {TRANSACTION_TABLE} "
+                f"USING gin ({self.document_sql} gin_trgm_ops)"
+            )
+
+    def uninstall(self, connection) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP INDEX IF EXISTS {self.tsvector_index}")
+            cursor.execute(f"DROP INDEX IF EXISTS {self.trigram_index}")
+
+    def search(self, queryset, query: str):
+        for term in split_terms(query):
+            words = re.findall(r'\w+', term)
+            pattern = '%{}%'.format(term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+            if words:
+                # Word-prefix match from the tsvector index, or a substring inside a word
+                prefix_query = ' & '.join(f"{word}:*" for word in words)
+                condition = RawSQL(
+                    f"(to_tsvector('simple', {self.document_sql}) @@ to_tsquery('simple', %s) OR {self.document_sql} ILIKE %s)",
+                    [prefix_query, pattern], output_field=BooleanField(),
+                )
+            else:
+                condition = RawSQL(f"{self.document_sql} ILIKE %s", [pattern], output_field=BooleanField())
+            queryset = queryset.filter(condition)
+        return queryset
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(connection=None):
+    """The configured search backend, or the one matching the database vendor."""
+    backend_path = getattr(settings, 'TRANSACTION_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    connection = connection or connections['default']
+    return VENDOR_BACKENDS.get(connection.vendor, IContainsSearchBackend)()
+
+
+def search_transactions(queryset, query: str):
+    """Filter a Transaction queryset to rows matching every term of query."""
+    return get_search_backend(connections[queryset.db]).search(queryset, query)
@@ -1,12 +1,19 @@
+import decimal
+from decimal import Decimal
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import Category, Transaction, Vendor, VendorRule, VendorMapping, BASE_CURRENCY_FOR_CONVERSION
-from django.db.models import Q
+from django.utils import timezone
+from .models import Category, Transaction, Vendor, VendorRule, VendorMapping, ImportJob, BASE_CURRENCY_FOR_CONVERSION
+from django.db.models import F, Q
 import uuid
+from functools import lru_cache
+from .fieldsets import SparseFieldsetSerializerMixin
+from .vendor_names import extract_original_vendor_name
 
 User = get_user_model()
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for Category model.
     Handles nested representation minimally (returns parent ID).
@@ -41,7 +48,7 @@ class CategorySerializer(serializers.ModelSerializer):
 
     def get_is_custom(self, obj):
         """Determine if the category is custom (belongs to a user)."""
-        return obj.user is not None
+        return obj.user_id is not None
 
     def validate_parent(self, value):
         """
@@ -57,6 +64,9 @@ class CategorySerializer(serializers.ModelSerializer):
             # Check if the chosen parent category exists and is accessible
             if value.user is not None and value.user != request.user:
                  raise serializers.ValidationError("You can only nest categories under system categories or your own categories.")
+            # A category's path prefixes the paths of all its subcategories
+            if self.instance is not None and self.instance.path and value.path.startswith(self.instance.path):
+                raise serializers.ValidationError("A category cannot be nested under itself or one of its subcategories.")
         return value
 
     def validate_name(self, value):
@@ -85,7 +95,7 @@ class CategorySerializer(serializers.ModelSerializer):
 
         return value.strip() # Return cleaned value
     
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the Transaction model for LISTING/READING.
     Includes currency fields, category details, and new last_modified.
@@ -138,6 +148,120 @@ class TransactionSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'last_modified' # Add last_modified here
         ]
 
+# --- Read-optimized transaction list ---
+# TransactionListView reads the listed columns with values() and turns each row into the
+# dict TransactionSerializer would produce, skipping DRF's per-field machinery.
+
+TRANSACTION_LIST_COLUMNS = tuple(
+    name for name in TransactionSerializer.Meta.fields
+    if name not in ('category_name', 'signed_original_amount', 'signed_aud_amount')
+)
+
+
+# Always fetched: the keyset pagination cursor is built from these
+TRANSACTION_KEY_COLUMNS = ('id', 'transaction_date', 'created_at')
+
+
+def transaction_list_values(queryset, fields=None):
+    """
+    The queryset as values() rows with the columns the given TransactionSerializer
+    fields need (all of them by default), category name joined in only when listed.
+    """
+    if fields is None:
+        return queryset.values(*TRANSACTION_LIST_COLUMNS, category_name=F('category__name'))
+    needed = set(TRANSACTION_KEY_COLUMNS)
+    for name in fields:
+        if name.startswith('signed_'):
+            needed.update((name[len('signed_'):], 'direction'))
+        else:
+            needed.add(name)
+    columns = [name for name in TRANSACTION_LIST_COLUMNS if name in needed]
+    if 'category_name' in needed:
+        return queryset.values(*columns, category_name=F('category__name'))
+    return queryset.values(*columns)
+
+
+def _decimal_formatter(max_digits: int, decimal_places: int):
+    """Formats like serializers.DecimalField(max_digits, decimal_places).to_representation."""
+    exponent = Decimal('.1') ** decimal_places
+    context = decimal.Context(prec=max_digits)
+
+    def format_decimal(value):
+        if value is None:
+            return None
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value).strip())
+        return '{:f}'.format(value.quantize(exponent, context=context))
+    return format_decimal
+
+
+def _format_date(value, current_timezone=None):
+    return value.isoformat() if value else None
+
+
+def _format_datetime(value, current_timezone):
+    """Formats like serializers.DateTimeField().to_representation with ISO 8601 output."""
+    if not value:
+        return None
+    if current_timezone is not None:
+        value = value.astimezone(current_timezone) if timezone.is_aware(value) else timezone.make_aware(value, current_timezone)
+    value = value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def _compile_transaction_row_serializer():
+    """
+    Build the row-to-dict function once: a (key, getter) plan in TransactionSerializer's
+    field order, so the JSON is the same as the serializer's, key order included. Getters
+    take the row and the timezone datetimes are rendered in.
+    """
+    money = _decimal_formatter(12, 2)
+    rate = _decimal_formatter(18, 9)
+    converters = {
+        'transaction_date': _format_date,
+        'original_amount': lambda value, tz: money(value),
+        'aud_amount': lambda value, tz: money(value),
+        'exchange_rate_to_aud': lambda value, tz: rate(value),
+        'created_at': _format_datetime,
+        'updated_at': _format_datetime,
+        'last_modified': _format_datetime,
+    }
+
+    def signed(column):
+        def get_signed(row, tz):
+            amount = row[column]
+            if amount is None:
+                return None
+            return money(-amount if row['direction'] == 'DEBIT' else amount)
+        return get_signed
+
+    def column_getter(name):
+        convert = converters.get(name)
+        if convert is None:
+            return lambda row, tz: row[name]
+        return lambda row, tz: convert(row[name], tz)
+
+    plan = tuple(
+        (name, signed(name[len('signed_'):]) if name.startswith('signed_') else column_getter(name))
+        for name in TransactionSerializer.Meta.fields
+    )
+
+    @lru_cache(maxsize=64)
+    def fieldset_plan(fields):
+        return tuple((name, get) for name, get in plan if name in fields)
+
+    def serialize_rows(rows, fields=None) -> list:
+        """fields limits the output to those TransactionSerializer fields (a sparse fieldset)."""
+        row_plan = plan if fields is None else fieldset_plan(tuple(fields))
+        current_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        return [{name: get(row, current_timezone) for name, get in row_plan} for row in rows]
+    return serialize_rows
+
+
+# Serialize rows from transaction_list_values() exactly as TransactionSerializer(many=True) would
+serialize_transaction_rows = _compile_transaction_row_serializer()
+
+
 class TransactionUpdateSerializer(serializers.ModelSerializer):
     """
     Serializer for UPDATING Transaction instances.
@@ -210,7 +334,7 @@ class TransactionUpdateSerializer(serializers.ModelSerializer):
 
         return data
 
-class VendorSerializer(serializers.ModelSerializer):
+class VendorSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the Vendor model for CRUD operations.
     Handles vendor creation, reading, updating, and deletion.
@@ -243,7 +367,7 @@ class VendorSerializer(serializers.ModelSerializer):
         super().__init__(*args, **kwargs)
         # Set parent_category queryset to user's categories
         request = self.context.get('request')
-        if request and hasattr(request, 'user'):
+        if request and hasattr(request, 'user') and 'parent_category' in self.fields: # Absent from sparse fieldsets without it
             from .models import Category
             self.fields['parent_category'].queryset = Category.objects.filter(user=request.user)
 
@@ -501,9 +625,7 @@ class TransactionCreateSerializer(serializers.ModelSerializer):
             # Extract vendor name from description for manual transactions
             description = validated_data.get('description', '')
             # Simple extraction - take first part before any separators
-            vendor_name = description.split(' - ')[0].split(' | ')[0].split(':')[0].strip()
-            if not vendor_name:
-                vendor_name = 'Manual Entry'
+            vendor_name = extract_original_vendor_name(description, default='Manual Entry', split_on_colon=True)
         
         # For manual transactions, original and mapped vendor names are the same
         validated_data['original_vendor_name'] = vendor_name
@@ -743,3 +865,30 @@ class VendorMappingSerializer(serializers.ModelSerializer):
             
         instance.save()
         return instance
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """
+    Read-only serializer for background import jobs, used for progress polling.
+    """
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id',
+            'source',
+            'status',
+            'phase',
+            'rows_parsed',
+            'rows_inserted',
+            'duplicate_count',
+            'vendor_identified',
+            'auto_categorized',
+            'error_count',
+            'message',
+            'result',
+            'created_at',
+            'started_at',
+            'finished_at',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,69 @@
+# transactions/signals.py
+"""
+Signal handlers that keep per-user in-memory caches and materialized custom view
+membership in sync with model writes.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .category_tree import invalidate_category_tree
+from .models import Category, Transaction, Vendor, VendorMapping
+from .typeahead import TYPEAHEAD_TRANSACTION_FIELDS, invalidate_typeahead_index
+from .vendor_matcher import invalidate_vendor_matcher
+from .view_engine import VIEW_TRANSACTION_FIELDS, invalidate_custom_view_membership, sync_custom_view_membership
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+def invalidate_vendor_caches(sender, instance, **kwargs):
+    """Rebuild the user's vendor matcher on the next identification run."""
+    if instance.user_id:
+        invalidate_vendor_matcher(instance.user_id)
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+@receiver(post_save, sender=VendorMapping)
+@receiver(post_delete, sender=VendorMapping)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Transaction)
+def invalidate_typeahead_caches(sender, instance, **kwargs):
+    """Rebuild the owner's typeahead index (everyone's, for system rows) on their next search."""
+    invalidate_typeahead_index(instance.user_id)
+
+
+@receiver(post_save, sender=Transaction)
+def invalidate_typeahead_caches_on_transaction_save(sender, instance, created, update_fields=None, **kwargs):
+    """Rebuild the owner's typeahead index only when the save changed a name it holds."""
+    if created or instance.changed_fields(TYPEAHEAD_TRANSACTION_FIELDS, update_fields):
+        invalidate_typeahead_index(instance.user_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+def invalidate_category_tree_caches(sender, instance, **kwargs):
+    """Serve the owner (everyone, for system categories) a rebuilt category tree."""
+    invalidate_category_tree(instance.user_id)
+
+
+@receiver(post_save, sender=Transaction)
+def add_to_custom_views(sender, instance, created, update_fields=None, **kwargs):
+    """Add, update or drop the transaction in its owner's custom views, if a field they use changed."""
+    if created or instance.changed_fields(VIEW_TRANSACTION_FIELDS, update_fields):
+        sync_custom_view_membership(instance.user_id, [instance])
+
+
+@receiver(pre_delete, sender=Transaction)
+def remove_from_custom_views(sender, instance, **kwargs):
+    """Take the transaction out of its owner's custom views and their totals."""
+    sync_custom_view_membership(instance.user_id, [instance], removed=True)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Vendor)
+def invalidate_custom_views(sender, instance, **kwargs):
+    """Transactions lose a deleted category or vendor without signals; rebuild affected views."""
+    invalidate_custom_view_membership(instance.user_id)
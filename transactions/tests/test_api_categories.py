@@ -1,9 +1,19 @@
 # transactions/tests/test_api_categories.py
+from datetime import date
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps as django_apps
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
 from rest_framework import status
 from rest_framework.test import APITestCase
-from ..models import Category
+from ..models import Category, Transaction, Vendor, rebuild_materialized_paths
+
+path_migration = import_module('transactions.migrations.0029_category_materialized_path')
 
 User = get_user_model()
 
@@ -73,6 +83,20 @@ class CategoryAPITests(APITestCase):
         self.assertIn(self.cat_user1_hobbies.name, category_names)
         self.assertNotIn(self.cat_user2_work.name, category_names) # User 2's excluded
 
+    def test_list_categories_sparse_fieldset(self):
+        Vendor.objects.create(name='Airline', user=self.user1, parent_category=self.cat_user1_holiday)
+        response = self.client.get(self.list_create_url, {'fields': 'id,name,is_custom'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        categories = [node for node in response.data['results'] if node['type'] == 'category']
+        vendors = [node for node in response.data['results'] if node['type'] == 'vendor']
+        self.assertEqual(len(categories), 6)
+        self.assertEqual(set(categories[0]), {'id', 'name', 'is_custom', 'type'})
+        custom = {cat['name']: cat['is_custom'] for cat in categories}
+        self.assertTrue(custom['Hobbies'])
+        self.assertFalse(custom['Travel'])
+        self.assertEqual(set(vendors[0]), {'id', 'name', 'is_custom', 'type', 'vendor_id'})
+
     def test_list_categories_unauthenticated(self):
         self.client.logout()
         response = self.client.get(self.list_create_url)
@@ -280,4 +304,179 @@ class CategoryAPITests(APITestCase):
         self.client.logout()
         url = reverse('category-detail', kwargs={'pk': self.cat_user1_hobbies.id})
         response = self.client.delete(url)
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class CategoryTreeTests(APITestCase):
+    """Tests for the cached category forest endpoint (/api/categories/tree/)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tree_user', password='password123')
+        cls.other_user = User.objects.create_user(username='tree_other', password='password123')
+        cls.food = Category.objects.create(name='Food', user=None)
+        cls.groceries = Category.objects.create(name='Groceries', parent=cls.food, user=None)
+        cls.travel = Category.objects.create(name='Travel', user=None)
+        cls.snacks = Category.objects.create(name='Snacks', parent=cls.groceries, user=cls.user)
+        Category.objects.create(name='Work', user=cls.other_user)
+        cls.vendor = Vendor.objects.create(name='aldi', display_name='ALDI', parent_category=cls.groceries, user=cls.user)
+        Vendor.objects.create(name='Unfiled', user=cls.user)
+        cls.url = reverse('category-tree')
+
+    def setUp(self):
+        # Test transactions roll back the database but not the cached trees
+        cache.clear()
+        self.client.force_authenticate(user=self.user)
+
+    def test_tree_nests_categories_and_vendor_leaves(self):
+        with self.assertNumQueries(3):  # The version, categories, vendors
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual([root['name'] for root in response.data], ['Food', 'Travel'])
+        groceries = response.data[0]['children'][0]
+        self.assertEqual(groceries['id'], self.groceries.id)
+        self.assertEqual([(child['type'], child['name']) for child in groceries['children']],
+                         [('category', 'Snacks'), ('vendor', 'ALDI')])
+        self.assertEqual(groceries['children'][1], {
+            'id': f"vendor-{self.vendor.id}", 'name': 'ALDI', 'type': 'vendor', 'parent': self.groceries.id,
+            'user': self.user.id, 'is_custom': True, 'vendor_id': self.vendor.id,
+        })
+        self.assertTrue(groceries['children'][0]['is_custom'])
+        self.assertFalse(groceries['is_custom'])
+
+    def test_tree_is_cached_and_revalidated_with_etag(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.data, first.data)
+
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        weak = self.client.get(self.url, HTTP_IF_NONE_MATCH=f"W/{first['ETag']}")
+        self.assertEqual(weak.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        Category.objects.create(name='Hobbies', user=self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Hobbies', [root['name'] for root in response.data])
+
+        etag = response['ETag']
+        self.vendor.parent_category = self.travel
+        self.vendor.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        travel = next(root for root in response.data if root['name'] == 'Travel')
+        self.assertEqual([child['name'] for child in travel['children']], ['ALDI'])
+
+        # System categories change every user's tree
+        etag = response['ETag']
+        Category.objects.create(name='Health', user=None)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+
+    def test_etag_is_shared_by_processes(self):
+        etag = self.client.get(self.url)['ETag']
+
+        # Another process has its own cache, but answers with the same ETag
+        with mock.patch('transactions.category_tree.cache', LocMemCache('other-process', {})):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(self.client.get(self.url)['ETag'], etag)
+            Category.objects.create(name='Hobbies', user=self.user)
+
+        # And a write there is not answered with a stale tree here
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Hobbies', [root['name'] for root in response.data])
+
+class CategoryPathTests(APITestCase):
+    """Tests for the materialized paths of categories and the spending roll-up they serve."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='path_user', password='password123')
+        cls.food = Category.objects.create(name='Food', user=None)
+        cls.groceries = Category.objects.create(name='Groceries', parent=cls.food, user=None)
+        cls.snacks = Category.objects.create(name='Snacks', parent=cls.groceries, user=cls.user)
+        cls.travel = Category.objects.create(name='Travel', user=None)
+        cls.spending_url = reverse('analytics-category-spending')
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def _spend(self, category, amount):
+        Transaction.objects.create(
+            user=self.user, category=category, transaction_date=date(2024, 5, 1), description=category.name,
+            original_amount=Decimal(amount), direction='DEBIT', original_currency='AUD', account_base_currency='AUD',
+        )
+
+    def test_paths_follow_the_hierarchy(self):
+        self.assertEqual(self.snacks.path, f"/{self.food.pk}/{self.groceries.pk}/{self.snacks.pk}/")
+        self.assertEqual([self.food.depth, self.groceries.depth, self.snacks.depth], [0, 1, 2])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.food.get_descendants()), [self.groceries, self.snacks])
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.snacks.get_ancestors()), [self.food, self.groceries])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.snacks.get_full_path(), 'Food > Groceries > Snacks')
+
+    def test_moving_a_category_moves_its_subtree(self):
+        self.groceries.parent = self.travel
+        self.groceries.save()
+
+        snacks = Category.objects.get(pk=self.snacks.pk)
+        self.assertEqual(snacks.path, f"/{self.travel.pk}/{self.groceries.pk}/{self.snacks.pk}/")
+        self.assertEqual(snacks.depth, 2)
+        self.assertEqual(list(self.food.get_descendants()), [])
+
+        self.groceries.parent = None
+        self.groceries.save()
+        self.assertEqual(Category.objects.get(pk=self.snacks.pk).depth, 1)
+
+    def test_cycles_are_rejected(self):
+        self.food.parent = self.snacks
+        with self.assertRaises(ValueError):
+            self.food.save()
+
+        own = Category.objects.create(name='Treats', user=self.user)
+        child = Category.objects.create(name='Chocolate', parent=own, user=self.user)
+        response = self.client.patch(reverse('category-detail', kwargs={'pk': own.pk}), {'parent': child.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('parent', response.data)
+
+    def test_rebuild_materialized_paths(self):
+        Category.objects.update(path='', depth=0)
+        self.assertEqual(rebuild_materialized_paths(Category), 4)
+        snacks = Category.objects.get(pk=self.snacks.pk)
+        self.assertEqual((snacks.path, snacks.depth), (self.snacks.path, 2))
+
+    def test_path_migration_backfills_every_category(self):
+        expected = dict(Category.objects.values_list('pk', 'path'))
+        Category.objects.update(path='', depth=0)
+        path_migration.backfill_paths(django_apps, None)
+        self.assertEqual(dict(Category.objects.values_list('pk', 'path')), expected)
+        self.assertEqual(Category.objects.get(pk=self.snacks.pk).depth, 2)
+
+    def test_spending_rolls_up_to_the_requested_level(self):
+        self._spend(self.food, '5.00')
+        self._spend(self.groceries, '20.00')
+        self._spend(self.snacks, '7.50')
+        self._spend(self.snacks, '2.50')
+        self._spend(self.travel, '100.00')
+
+        def totals(level):
+            response = self.client.get(self.spending_url, {'level': level})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['total_spending'], Decimal('135.00'))
+            return {row['category']: row['amount'] for row in response.data['category_spending']}
+
+        self.assertEqual(totals('subcategory'), {
+            'Travel': Decimal('100.00'), 'Groceries': Decimal('20.00'), 'Snacks': Decimal('10.00'), 'Food': Decimal('5.00'),
+        })
+        self.assertEqual(totals('category'), {'Travel': Decimal('100.00'), 'Food': Decimal('35.00')})
+        self.assertEqual(totals('1'), {'Travel': Decimal('100.00'), 'Groceries': Decimal('30.00'), 'Food': Decimal('5.00')})
+        self.assertEqual(self.client.get(self.spending_url, {'level': 'top'}).status_code, status.HTTP_400_BAD_REQUEST)
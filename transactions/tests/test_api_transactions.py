@@ -1,11 +1,21 @@
 # transactions/tests/test_api_transactions.py
+import gzip
+import json
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from ..models import Category, Transaction, DescriptionMapping
+from ..serializers import TransactionSerializer
 from decimal import Decimal
 from datetime import date
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from FundFlow.middleware import CompressionMiddleware
+from FundFlow.renderers import FastJSONRenderer
 
 User = get_user_model()
 
@@ -438,4 +448,178 @@ class TransactionAPITests(APITestCase):
     # Add more tests for TransactionListView filtering later if needed
     # (e.g., by date range, amount, specific category ID)
 
-    # Add tests for Transaction Detail/Update/Delete later if needed
\ No newline at end of file
+    # Add tests for Transaction Detail/Update/Delete later if needed
+
+class TransactionCursorPaginationTests(APITestCase):
+    """Tests for the keyset (cursor) mode of the transaction list."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='cursor_user', password='password123')
+        other_user = User.objects.create_user(username='cursor_other', password='password123')
+        # Several transactions per day, so pages split days and created_at/id break ties
+        Transaction.objects.bulk_create([
+            Transaction(
+                user=cls.user, transaction_date=date(2024, 1, 1 + index % 9), description=f"Shop {index}",
+                original_amount=Decimal('10.00') + index, direction='DEBIT' if index % 4 else 'CREDIT',
+                original_currency='AUD', aud_amount=Decimal('10.00') + index,
+            )
+            for index in range(57)
+        ])
+        Transaction.objects.create(
+            user=other_user, transaction_date=date(2024, 1, 3), description='Not mine',
+            original_amount=Decimal('1.00'), direction='DEBIT', original_currency='AUD',
+        )
+        cls.url = reverse('transaction-list')
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def _walk(self, params):
+        ids, url, pages = [], self.url, 0
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages += 1
+            ids.extend(tx['id'] for tx in response.data['results'])
+            if not response.data['next']:
+                return ids, pages
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_pages_cover_every_transaction_in_order(self):
+        ids, pages = self._walk({'pagination': 'cursor', 'page_size': 10})
+
+        expected = list(Transaction.objects.filter(user=self.user)
+                        .order_by('-transaction_date', '-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 6)
+
+    def test_cursor_mode_applies_filters(self):
+        ids, _ = self._walk({'pagination': 'cursor', 'page_size': 4, 'start_date': '2024-01-03', 'end_date': '2024-01-05'})
+
+        expected = Transaction.objects.filter(user=self.user, transaction_date__range=(date(2024, 1, 3), date(2024, 1, 5)))
+        self.assertEqual(sorted(ids), sorted(expected.values_list('id', flat=True)))
+
+    def test_count_is_optional_and_page_cost_is_constant(self):
+        first = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 5})
+        self.assertIsNone(first.data['count'])
+        self.assertNotIn('previous', first.data)
+        self.assertEqual(self.client.get(self.url, {'pagination': 'cursor', 'include_count': 'true'}).data['count'], 57)
+
+        deep = first
+        for _ in range(8):
+            deep = self.client.get(deep.data['next'])
+        with CaptureQueriesContext(connection) as first_page_queries:
+            self.client.get(self.url, {'pagination': 'cursor', 'page_size': 5})
+        with CaptureQueriesContext(connection) as deep_page_queries:
+            self.client.get(deep.data['next'])
+        self.assertEqual(len(deep_page_queries), len(first_page_queries))
+        self.assertFalse(any('COUNT(' in query['sql'] or 'OFFSET' in query['sql'] for query in deep_page_queries))
+
+    def test_invalid_cursor_and_custom_ordering_are_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'not-a-cursor'}).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(self.url, {'pagination': 'cursor', 'ordering': 'description'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_page_numbers_remain_the_default(self):
+        response = self.client.get(self.url, {'page': 2})
+
+        self.assertEqual(response.data['count'], 57)
+        self.assertEqual(len(response.data['results']), 25)
+        self.assertIsNotNone(response.data['previous'])
+
+
+class TransactionListSerializationTests(APITestCase):
+    """The values()-based list path must render the same JSON as TransactionSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='fast_list_user', password='password123')
+        food = Category.objects.create(name='Food', user=None)
+        own = Category.objects.create(name='Hobbies', user=cls.user)
+        for index in range(30):
+            Transaction.objects.create(
+                user=cls.user, category=(food, own, None)[index % 3], transaction_date=date(2024, 2, 1 + index % 20),
+                description=f"Purchase {index}", original_amount=Decimal('12.30') + index,
+                original_currency=('AUD', 'USD', 'EUR')[index % 3], direction=('DEBIT', 'CREDIT')[index % 2],
+                source=('csv', 'up_bank')[index % 2], bank_transaction_id=f"bank-{index}" if index % 2 else None,
+                source_code='C1' if index % 5 else None,
+            )
+        # Unconverted rows render null AUD amounts
+        Transaction.objects.filter(user=cls.user, original_currency='EUR').update(aud_amount=None, exchange_rate_to_aud=None)
+        Transaction.objects.filter(user=cls.user, original_currency='USD').update(
+            aud_amount=Decimal('15.55'), exchange_rate_to_aud=Decimal('1.523456789'))
+        cls.url = reverse('transaction-list')
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def _reference(self, queryset):
+        return json.loads(JSONRenderer().render(TransactionSerializer(queryset, many=True).data))
+
+    def test_json_matches_transaction_serializer(self):
+        response = self.client.get(self.url, {'page_size': 100})
+
+        expected = self._reference(Transaction.objects.filter(user=self.user).order_by('-transaction_date', '-created_at'))
+        self.assertEqual(json.loads(response.content)['results'], expected)
+        self.assertEqual(list(response.data['results'][0]), list(expected[0])) # Same key order
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(self.url, {'page_size': 3})
+        with CaptureQueriesContext(connection) as large_page:
+            self.client.get(self.url, {'page_size': 30})
+        self.assertEqual(len(small_page), len(large_page))
+        self.assertEqual(len(large_page), 2) # COUNT(*) and the page itself, category joined in
+
+    def test_sparse_fieldset_prunes_output_and_columns(self):
+        fields = 'id,transaction_date,description,signed_aud_amount'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'page_size': 100, 'fields': fields})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = self._reference(Transaction.objects.filter(user=self.user).order_by('-transaction_date', '-created_at'))
+        self.assertEqual(json.loads(response.content)['results'],
+                         [{key: row[key] for key in fields.split(',')} for row in expected])
+        page_query = queries[-1]['sql']
+        self.assertNotIn('source_notifications', page_query)
+        self.assertNotIn('transactions_category', page_query) # category_name not requested, no join
+
+    def test_omit_and_cursor_mode_with_sparse_fieldset(self):
+        response = self.client.get(self.url, {'omit': 'source_notifications,created_at', 'pagination': 'cursor', 'page_size': 10})
+        self.assertNotIn('source_notifications', response.data['results'][0])
+        self.assertIn('category_name', response.data['results'][0])
+
+        next_page = self.client.get(response.data['next'])
+        self.assertEqual(len(next_page.data['results']), 10)
+        self.assertNotIn('created_at', next_page.data['results'][0])
+
+    def test_unknown_sparse_fields_are_rejected(self):
+        response = self.client.get(self.url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
+
+    def test_large_responses_are_compressed(self):
+        response = self.client.get(self.url, {'page_size': 30}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 30)
+
+        small = self.client.get(self.url, {'page_size': 1, 'fields': 'id'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+    def test_only_data_responses_are_compressed(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        middleware = CompressionMiddleware(lambda request: None)
+        body = b'<input name="csrfmiddlewaretoken" value="secret">' * 100
+        for content_type, compressed in (
+            ('text/html; charset=utf-8', False), ('application/json', True),
+            ('application/x-ndjson; charset=utf-8', True), ('text/csv; charset=utf-8', True),
+        ):
+            response = middleware.process_response(request, HttpResponse(body, content_type=content_type))
+            with self.subTest(content_type=content_type):
+                self.assertEqual(response.has_header('Content-Encoding'), compressed)
+
+    def test_fast_json_renderer_output_matches_json_renderer(self):
+        data = self.client.get(self.url, {'page_size': 30}).data
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
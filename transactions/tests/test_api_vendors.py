@@ -234,4 +234,41 @@ class VendorAPITests(APITestCase):
         self.client.logout()
         url = reverse('vendor-detail', kwargs={'pk': self.vendor_user1_coffee.id})
         response = self.client.delete(url)
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED) 
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED) 
+
+
+class VendorSparseFieldsetTests(APITestCase):
+    """Tests for ?fields= / ?omit= on the vendor endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = User.objects.create_user(username='sparse_user', password='password123')
+        cls.vendor_user1_coffee = Vendor.objects.create(name='My Coffee Shop', user=cls.user1)
+        Vendor.objects.create(name='Local Bakery', user=cls.user1)
+        cls.list_create_url = reverse('vendor-list-create')
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user1)
+
+    def test_list_vendors_sparse_fieldset(self):
+        response = self.client.get(self.list_create_url, {'fields': 'id,name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['results'])
+        for vendor in response.data['results']:
+            self.assertEqual(set(vendor), {'id', 'name'})
+
+        response = self.client.get(self.list_create_url, {'omit': 'created_at,updated_at'})
+        self.assertNotIn('created_at', response.data['results'][0])
+        self.assertIn('display_name', response.data['results'][0])
+
+    def test_retrieve_vendor_sparse_fieldset_and_unknown_field(self):
+        url = reverse('vendor-detail', kwargs={'pk': self.vendor_user1_coffee.id})
+        response = self.client.get(url, {'fields': 'name'})
+        self.assertEqual(response.data, {'name': 'My Coffee Shop'})
+        self.assertEqual(self.client.get(url, {'fields': 'nope'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_ignores_sparse_fieldset(self):
+        url = reverse('vendor-detail', kwargs={'pk': self.vendor_user1_coffee.id})
+        response = self.client.patch(f"{url}?fields=id", {'display_name': 'Coffee'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['display_name'], 'Coffee')
@@ -0,0 +1,248 @@
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+import csv
+import io
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..csv_import import CSVTransactionImporter
+from ..dedup import backfill_dedup_fingerprints
+from ..models import DescriptionMapping, Transaction, compute_dedup_fingerprint
+
+User = get_user_model()
+
+HEADER = "Date,Name / Description,Account,Counterparty,Code,Debit/credit,Amount (AUD),Transaction type,Notifications\n"
+
+
+def _csv_rows(count, description='COFFEE SHOP', day=1):
+    return ''.join(
+        f"202401{day:02d},{description} {i % 4},ACC001,,C{i},DEBIT,{i % 4 + 1}.50,PURCHASE,\n" for i in range(count)
+    )
+
+
+class StreamingCSVImportTests(TestCase):
+    """Tests for chunked CSV ingestion."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='csv_user', password='password123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _upload(self, content):
+        csv_file = io.BytesIO(content.encode('utf-8') if isinstance(content, str) else content)
+        csv_file.name = 'export.csv'
+        return self.client.post(
+            reverse('transaction-csv-upload'),
+            {'file': csv_file, 'account_base_currency': 'AUD'},
+            format='multipart'
+        )
+
+    @patch('transactions.csv_import.CSV_IMPORT_CHUNK_SIZE', 3)
+    def test_rows_are_imported_across_chunks(self):
+        # Identical rows inside one file are kept, even when they land in different chunks
+        response = self._upload(HEADER + _csv_rows(10))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['imported_count'], 10)
+        self.assertEqual(response.data['total_rows_processed'], 10)
+        self.assertEqual(Transaction.objects.filter(user=self.user, source='csv').count(), 10)
+        tx = Transaction.objects.filter(user=self.user).order_by('id').first()
+        self.assertEqual(tx.aud_amount, Decimal('1.50'))
+        self.assertEqual(tx.account_base_currency, 'AUD')
+
+    @patch('transactions.csv_import.CSV_IMPORT_CHUNK_SIZE', 3)
+    def test_reupload_is_detected_as_duplicates(self):
+        self._upload(HEADER + _csv_rows(7))
+        response = self._upload(HEADER + _csv_rows(7))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['imported_count'], 0)
+        self.assertEqual(response.data['duplicate_count'], 7)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 7)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        response = self._upload(HEADER + _csv_rows(2) + "2024xx01,Bad date,ACC001,,C1,DEBIT,1.00,PURCHASE,\nshort,row\n")
+
+        self.assertEqual(response.data['imported_count'], 2)
+        self.assertEqual(len(response.data['errors']), 2)
+        self.assertTrue(response.data['errors'][1].startswith('Row 5: Incorrect number of columns'))
+
+    def test_header_mismatch_is_rejected(self):
+        response = self._upload("Date,Description\n20240101,Coffee\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('CSV headers do not match', response.data['error'])
+
+    def test_invalid_encoding_before_any_import_is_rejected(self):
+        response = self._upload(HEADER.encode('utf-8') + b"20240101,Caf\xe9,ACC001,,C1,DEBIT,1.00,PURCHASE,\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 0)
+
+    def test_import_from_temporary_uploaded_file(self):
+        upload = TemporaryUploadedFile('large.csv', 'text/csv', 0, 'utf-8')
+        upload.write((HEADER + _csv_rows(25)).encode('utf-8'))
+        upload.seek(0)
+
+        result = CSVTransactionImporter(self.user, 'AUD', chunk_size=10).import_file(upload)
+        upload.close()
+
+        self.assertEqual(result.created_count, 25)
+        self.assertEqual(result.errors, [])
+
+
+class DedupFingerprintTests(TestCase):
+    """Tests for the persisted duplicate-check fingerprint."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='fingerprint_user', password='password123')
+
+    def _transaction(self, **overrides):
+        fields = dict(
+            user=self.user, description='COFFEE SHOP 1', transaction_date=date(2024, 1, 1),
+            original_amount=Decimal('2.5'), original_currency='AUD', direction='DEBIT', source='csv',
+            original_vendor_name='COFFEE SHOP', vendor_name='COFFEE SHOP',
+        )
+        fields.update(overrides)
+        return Transaction.objects.create(**fields)
+
+    def test_fingerprint_follows_dedup_fields(self):
+        tx = self._transaction()
+        self.assertEqual(tx.dedup_fingerprint, compute_dedup_fingerprint(
+            date(2024, 1, 1), Decimal('2.50'), 'DEBIT', 'COFFEE SHOP 1', 'aud'
+        ))
+
+        tx.description = 'COFFEE SHOP 2'
+        tx.save(update_fields=['description'])
+        tx.refresh_from_db()
+        self.assertEqual(tx.dedup_fingerprint, tx.build_dedup_fingerprint())
+
+    def test_backfill_command_and_legacy_rows_are_deduplicated(self):
+        tx = self._transaction()
+        Transaction.objects.filter(pk=tx.pk).update(dedup_fingerprint=None)
+
+        out = io.StringIO()
+        call_command('backfill_dedup_fingerprints', batch_size=1, stdout=out)
+        self.assertIn('Backfilled dedup fingerprints for 1 transactions', out.getvalue())
+        tx.refresh_from_db()
+        self.assertEqual(tx.dedup_fingerprint, tx.build_dedup_fingerprint())
+
+        # Rows missing a fingerprint are backfilled by the importer before it checks for duplicates
+        Transaction.objects.filter(pk=tx.pk).update(dedup_fingerprint=None)
+        result = CSVTransactionImporter(self.user, 'AUD').import_rows(
+            csv.reader(io.StringIO(HEADER + _csv_rows(2)))
+        )
+        self.assertEqual(result.duplicate_count, 1)
+        self.assertEqual(result.created_count, 1)
+
+
+class ParallelCSVParsingTests(TestCase):
+    """Tests for process-pool parsing and the import_csv command."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='parallel_user', password='password123')
+
+    def test_parallel_parse_matches_sequential(self):
+        content = HEADER + _csv_rows(23) + "2024xx01,Bad date,ACC001,,C1,DEBIT,1.00,PURCHASE,\n" + _csv_rows(9, 'BAKERY', day=2)
+        rows = list(csv.reader(io.StringIO(content)))[1:]
+
+        sequential = list(CSVTransactionImporter(self.user, 'AUD')._parse_rows(iter(rows)))
+        with patch('transactions.csv_import.PARALLEL_PARSE_BATCH_SIZE', 4):
+            parallel = list(CSVTransactionImporter(self.user, 'AUD', parse_workers=2)._parse_rows(iter(rows)))
+
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(len(parallel), 33)
+        self.assertIsNone(parallel[23][1])
+        self.assertTrue(parallel[23][2].startswith('Row 25: '))
+
+    def test_import_csv_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write(HEADER + _csv_rows(12))
+        self.addCleanup(os.remove, csv_file.name)
+
+        out = io.StringIO()
+        with patch('transactions.csv_import.PARALLEL_PARSE_BATCH_SIZE', 5):
+            call_command('import_csv', csv_file.name, user='parallel_user', currency='AUD', workers=2, stdout=out)
+
+        self.assertIn('Imported 12 transactions from 1 files', out.getvalue())
+        self.assertEqual(Transaction.objects.filter(user=self.user, source='csv').count(), 12)
+
+    @patch('transactions.csv_import.ProcessPoolExecutor', side_effect=AssertionError('web uploads must not fork'))
+    def test_upload_endpoint_parses_in_process(self, _):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        csv_file = io.BytesIO((HEADER + _csv_rows(6)).encode('utf-8'))
+        csv_file.name = 'export.csv'
+
+        response = self.client.post(
+            reverse('transaction-csv-upload'),
+            {'file': csv_file, 'account_base_currency': 'AUD', 'parallel': 'true'},
+            format='multipart'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['imported_count'], 6)
+
+
+class BatchCSVUploadTests(TestCase):
+    """Tests for the multi-file upload endpoint."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='batch_user', password='password123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _file(self, name, content):
+        csv_file = io.BytesIO(content.encode('utf-8'))
+        csv_file.name = name
+        return csv_file
+
+    def test_overlapping_files_are_deduplicated_across_the_batch(self):
+        january = HEADER + _csv_rows(4) + _csv_rows(4)  # repeated rows within one file are kept
+        january_and_february = HEADER + _csv_rows(4) + _csv_rows(3, 'BAKERY', day=2)
+
+        response = self.client.post(reverse('transaction-csv-batch-upload'), {
+            'files': [self._file('jan.csv', january), self._file('jan_feb.csv', january_and_february),
+                      self._file('bad.csv', 'Date\n')],
+            'account_base_currency': 'AUD',
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['imported_count'], 11)
+        self.assertEqual(response.data['duplicate_count'], 4)
+        files = response.data['files']
+        self.assertEqual([f['file'] for f in files], ['jan.csv', 'jan_feb.csv', 'bad.csv'])
+        self.assertEqual(files[0]['imported_count'], 8)
+        self.assertEqual(files[1]['imported_count'], 3)
+        self.assertEqual(files[1]['duplicate_count'], 4)
+        self.assertIn('CSV headers do not match', files[2]['error'])
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 11)
+
+    def test_mappings_are_loaded_once_per_batch(self):
+        importer = CSVTransactionImporter(self.user, 'AUD')
+        with patch.object(DescriptionMapping.objects, 'filter', wraps=DescriptionMapping.objects.filter) as mapping_filter:
+            outcomes = importer.import_files([
+                ('a.csv', self._file('a.csv', HEADER + _csv_rows(2))),
+                ('b.csv', self._file('b.csv', HEADER + _csv_rows(2, 'BAKERY'))),
+            ])
+        self.assertEqual([result.created_count for _, result, _ in outcomes], [2, 2])
+        self.assertEqual(mapping_filter.call_count, 1)
+
+    def test_fingerprints_are_loaded_once_per_batch(self):
+        CSVTransactionImporter(self.user, 'AUD').import_files([('old.csv', self._file('old.csv', HEADER + _csv_rows(2)))])
+
+        importer = CSVTransactionImporter(self.user, 'AUD', chunk_size=3)  # Chunks span both files
+        with patch('transactions.csv_import.backfill_dedup_fingerprints', wraps=backfill_dedup_fingerprints) as backfill:
+            outcomes = importer.import_files([
+                ('a.csv', self._file('a.csv', HEADER + _csv_rows(4))),
+                ('b.csv', self._file('b.csv', HEADER + _csv_rows(4) + _csv_rows(2, 'BAKERY'))),
+            ])
+        self.assertEqual(backfill.call_count, 1)
+        self.assertEqual([(result.created_count, result.duplicate_count) for _, result, _ in outcomes], [(2, 2), (2, 4)])
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 6)
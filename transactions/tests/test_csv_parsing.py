@@ -0,0 +1,82 @@
+from datetime import date, datetime
+from decimal import Decimal
+import random
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..csv_parsing import parse_amount, parse_csv_row, parse_csv_rows, parse_date
+
+
+def _reference_parse(row):
+    """The straightforward strptime/Decimal parsing the fast paths must agree with."""
+    raw_date, _, _, _, _, _, raw_amount, _, _ = [r.strip() for r in row]
+    return datetime.strptime(raw_date, '%Y%m%d').date(), Decimal(raw_amount.replace(',', '.'))
+
+
+def _export_rows(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        [f"2024{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}", f"SHOP {rng.randint(1, 500)}", 'ACC001', '',
+         f"C{i}", rng.choice(['DEBIT', 'Credit']), f"{rng.randint(0, 999)},{rng.randint(0, 99):02d}", 'PURCHASE', '']
+        for i in range(count)
+    ]
+
+
+class CSVParsingTests(SimpleTestCase):
+    """Tests for the fast-path date and amount decoders."""
+
+    def setUp(self):
+        parse_date.cache_clear()
+        parse_amount.cache_clear()
+
+    def test_parse_date(self):
+        self.assertEqual(parse_date('20240229'), date(2024, 2, 29))
+        # Off-format input goes through strptime: same results, same error messages
+        for raw in ('2024011', '2024111'):
+            with self.subTest(raw=raw):
+                self.assertEqual(parse_date(raw), datetime.strptime(raw, '%Y%m%d').date())
+        for raw in ('20230229', '20241301', '2024xx01', '２０２４０１０１', '20240101 ', ''):
+            with self.subTest(raw=raw), self.assertRaises(ValueError) as ctx:
+                parse_date(raw)
+            with self.assertRaises(ValueError) as reference:
+                datetime.strptime(raw, '%Y%m%d')
+            self.assertEqual(str(ctx.exception), str(reference.exception))
+
+    def test_parse_amount(self):
+        for raw in ('12', '12,5', '12,50', '12.05', '0,00', '1234567.89', '5.', '.5', '1,234', '1e3', '-3,00'):
+            with self.subTest(raw=raw):
+                self.assertEqual(parse_amount(raw), Decimal(raw.replace(',', '.')))
+        self.assertEqual(str(parse_amount('12,5')), '12.50')
+
+    def test_row_errors_are_unchanged(self):
+        row = ['20240101', 'SHOP', 'ACC001', '', 'C1', 'DEBIT', '-3,00', 'PURCHASE', '']
+        self.assertEqual(parse_csv_row(5, row, 'AUD'), (5, None, 'Row 5: Amount in CSV should be positive.'))
+        row[6] = 'abc'
+        self.assertEqual(parse_csv_row(5, row, 'AUD'), (5, None, 'Row 5: Unexpected processing error.'))
+        row[6], row[5] = '3,00', 'SIDEWAYS'
+        self.assertEqual(parse_csv_row(5, row, 'AUD'), (5, None, 'Row 5: Invalid direction.'))
+
+    def test_fast_paths_match_reference_parsing(self):
+        """The fast paths agree with strptime/Decimal on a synthetic export (timings: benchmark_csv_parsing)."""
+        rows = _export_rows(5000)
+        parsed = [parse_csv_row(row_num, row, 'AUD') for row_num, row in enumerate(rows, start=2)]
+        self.assertEqual(
+            [(item['transaction_date'], item['original_amount']) for _, item, _ in parsed],
+            [_reference_parse(row) for row in rows],
+        )
+
+    def test_export_rows_take_the_fast_paths(self):
+        """Regression check for parse throughput: export-format rows never fall back to strptime/Decimal(str)."""
+        rows = _export_rows(3000, seed=11)
+        with mock.patch('transactions.csv_parsing.datetime') as mock_datetime, \
+                mock.patch('transactions.csv_parsing.Decimal', wraps=Decimal) as mock_decimal:
+            parsed = parse_csv_rows(list(enumerate(rows, start=2)), 'AUD')
+
+        mock_datetime.strptime.assert_not_called()
+        self.assertTrue(mock_decimal.call_args_list)
+        self.assertTrue(all(isinstance(call.args[0], int) for call in mock_decimal.call_args_list))
+        self.assertEqual(
+            [(item['transaction_date'], item['original_amount']) for _, item, _ in parsed],
+            [_reference_parse(row) for row in rows],
+        )
@@ -0,0 +1,158 @@
+# transactions/tests/test_custom_views.py
+import io
+import uuid
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from ..models import Category, CustomView, CustomViewMembership, Transaction, Vendor
+from ..search import get_search_backend
+from ..view_engine import compile_criteria, sync_custom_view_membership
+
+User = get_user_model()
+
+
+class CustomViewMembershipTests(TestCase):
+    """Tests for compiled custom view criteria and their materialized membership."""
+
+    def setUp(self):
+        # Migrations are not run in the test settings, so the search index is installed here
+        get_search_backend(connection).install(connection)
+        self.user = User.objects.create_user(username='viewer', password='password123')
+        self.other_user = User.objects.create_user(username='other_viewer', password='password123')
+        self.food = Category.objects.create(name='Food', user=self.user)
+        self.travel = Category.objects.create(name='Travel', user=self.user)
+        self.cafe = Vendor.objects.create(name='Cafe', user=self.user)
+
+        self.coffee = self._create('Coffee Shop Sydney', '4.50', category=self.food, vendor=self.cafe)
+        self.lunch = self._create('Lunch Bar', '15.00', category=self.food, transaction_date=date(2024, 6, 2))
+        self.flight = self._create('Qantas Flight', '420.00', category=self.travel)
+        self.refund = self._create('Coffee refund', '4.50', direction='CREDIT', category=self.food)
+        self._create('Coffee Shop Sydney', '4.50', user=self.other_user)
+
+        self.view = self._view({'category_ids': [self.food.id], 'amount_max': '100'})
+
+    def _create(self, description, amount, user=None, **fields):
+        fields.setdefault('transaction_date', date(2024, 5, 1))
+        fields.setdefault('direction', 'DEBIT')
+        return Transaction.objects.create(
+            user=user or self.user, description=description, original_amount=Decimal(amount),
+            aud_amount=Decimal(amount), original_currency='AUD', **fields,
+        )
+
+    def _view(self, criteria, name=None):
+        return CustomView.objects.create(
+            id=str(uuid.uuid4()), user=self.user, name=name or f"View {uuid.uuid4()}", search_criteria=criteria,
+        )
+
+    def _members(self, view):
+        return set(view.get_matching_transactions())
+
+    def test_plan_agrees_with_the_database(self):
+        transactions = list(Transaction.objects.all())
+        for criteria in [
+            {'description_contains': 'coffee'},
+            {'description_contains': 'SHOP syd', 'direction': 'DEBIT'},
+            {'date_from': '2024-05-02', 'date_to': 'not a date'},
+            {'amount_min': '5', 'amount_max': 'abc'},
+            {'amount_min': 'NaN', 'amount_max': 'sNaN'},
+            {'amount_min': '-Infinity', 'amount_max': 'Infinity'},
+            {'vendor_ids': [str(self.cafe.id)]},
+            {'category_ids': [self.travel.id, 'x']},
+            {'direction': 'CREDIT', 'category_ids': []},
+            {},
+        ]:
+            with self.subTest(criteria=criteria):
+                plan = compile_criteria(criteria)
+                expected = set(plan.filter(Transaction.objects.all()))
+                self.assertEqual({t for t in transactions if plan.matches(t)}, expected)
+        self.assertIs(compile_criteria({'direction': 'DEBIT'}), compile_criteria({'direction': 'DEBIT'}))
+
+    def test_membership_and_totals_are_built_on_first_use(self):
+        self.assertEqual(self._members(self.view), {self.coffee, self.lunch, self.refund})
+        self.assertEqual(self.view.get_totals(), {
+            'transaction_count': 3, 'total_debit': Decimal('19.50'), 'total_credit': Decimal('4.50'),
+        })
+        self.assertEqual(CustomViewMembership.objects.filter(custom_view=self.view).count(), 3)
+
+    def test_opening_a_view_costs_the_same_for_any_criteria(self):
+        complex_view = self._view({
+            'description_contains': 'coffee', 'date_from': '2024-01-01', 'date_to': '2024-12-31',
+            'amount_min': '1', 'amount_max': '10', 'vendor_ids': [self.cafe.id], 'category_ids': [self.food.id],
+            'direction': 'DEBIT',
+        })
+        for view in (self.view, complex_view):
+            view.get_totals()  # Builds the membership
+            with self.assertNumQueries(3):
+                list(view.get_matching_transactions())
+                view.get_totals()
+        self.assertEqual(self._members(complex_view), {self.coffee})
+
+    def test_writes_update_membership_incrementally(self):
+        self.view.get_totals()
+
+        snack = self._create('Snack', '3.00', category=self.food)
+        self.assertEqual(self.view.get_totals()['total_debit'], Decimal('22.50'))
+
+        snack.original_amount = snack.aud_amount = Decimal('5.00')
+        snack.save()
+        self.assertEqual(self.view.get_totals(), {
+            'transaction_count': 4, 'total_debit': Decimal('24.50'), 'total_credit': Decimal('4.50'),
+        })
+
+        self.lunch.category = self.travel
+        self.lunch.save()
+        self.coffee.delete()
+        self.assertEqual(self._members(self.view), {snack, self.refund})
+        self.assertEqual(self.view.get_totals(), {
+            'transaction_count': 2, 'total_debit': Decimal('5.00'), 'total_credit': Decimal('4.50'),
+        })
+        # Applied incrementally, so a rebuild finds the same membership
+        call_command('rebuild_custom_views', user='viewer', stdout=io.StringIO())
+        self.assertEqual(CustomView.objects.get(pk=self.view.pk).transaction_count, 2)
+
+    def test_non_finite_amounts_are_ignored(self):
+        view = self._view({'category_ids': [self.food.id], 'amount_min': 'sNaN', 'amount_max': 'NaN'})
+        self.assertEqual(self._members(view), {self.coffee, self.lunch, self.refund})
+
+        # Syncing a saved transaction compares its amount with the view's bounds
+        self._create('Snack', '3.00', category=self.food)
+        self.assertEqual(view.get_totals()['transaction_count'], 4)
+
+    def test_saves_that_keep_the_view_fields_skip_the_views(self):
+        self.view.get_totals()
+        self.coffee.source_notifications = 'Tap and pay'
+        self.coffee.transaction_date = '2024-05-01'  # Unchanged, as a string
+        with self.assertNumQueries(1):  # Just the UPDATE
+            self.coffee.save()
+        with self.assertNumQueries(1):
+            self.coffee.save(update_fields=['source_notifications'])
+
+        self.coffee.original_amount = self.coffee.aud_amount = Decimal('150.00')
+        self.coffee.save(update_fields=['original_amount', 'aud_amount'])
+        self.assertEqual(self._members(self.view), {self.lunch, self.refund})
+
+    def test_bulk_writes_are_synced(self):
+        self.view.get_totals()
+        created = Transaction.objects.bulk_create([
+            Transaction(user=self.user, description='Bakery', original_amount=Decimal('7.00'), aud_amount=Decimal('7.00'),
+                        direction='DEBIT', category=self.food, transaction_date=date(2024, 5, 3), original_currency='AUD'),
+        ])
+        sync_custom_view_membership(self.user.id, created)
+        self.assertEqual(self.view.get_totals()['transaction_count'], 4)
+
+    def test_changed_criteria_and_deleted_categories_rebuild_the_view(self):
+        self.view.get_totals()
+        self.view.search_criteria = {'category_ids': [self.travel.id]}
+        self.view.save()
+        self.assertEqual(self._members(self.view), {self.flight})
+
+        # Deleting a category unassigns its transactions without signals
+        Transaction.objects.filter(category=self.travel).update(category=None)
+        self.travel.delete()
+        self.assertEqual(self._members(self.view), set())
+        self.assertEqual(self.view.get_totals()['transaction_count'], 0)
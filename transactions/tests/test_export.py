@@ -0,0 +1,110 @@
+# transactions/tests/test_export.py
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .. import export
+from ..export import EXPORT_COLUMNS, read_columnar
+from ..models import Category, Transaction
+
+User = get_user_model()
+
+
+class TransactionExportTests(APITestCase):
+    """
+    Tests for the streaming transaction export endpoint.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='exporter', password='password123')
+        cls.other_user = User.objects.create_user(username='other', password='password123')
+        cls.category = Category.objects.create(name='Groceries', user=None)
+        for day in range(1, 8):
+            Transaction.objects.create(
+                user=cls.user, category=cls.category if day % 2 else None, transaction_date=date(2024, 2, day),
+                description=f'Purchase, "day" {day}', original_amount=Decimal(f'{day}.25'), direction='DEBIT',
+                original_currency='AUD', aud_amount=Decimal(f'{day}.25'),
+            )
+        Transaction.objects.create(
+            user=cls.other_user, transaction_date=date(2024, 2, 3), description='Not yours',
+            original_amount=Decimal('1.00'), direction='DEBIT', original_currency='AUD',
+        )
+        cls.url = reverse('transaction-export')
+        cls.list_url = reverse('transaction-list')
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def _export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def _listed(self, **params):
+        """The same transactions as served by the list endpoint."""
+        response = self.client.get(self.list_url, {'page_size': 100, **params})
+        return [dict(row) for row in response.data['results']]
+
+    def test_csv_export_matches_list_serialization(self):
+        response, content = self._export()
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment; filename="transactions-', response['Content-Disposition'])
+
+        rows = list(csv.DictReader(io.StringIO(content.decode('utf-8'))))
+        self.assertEqual(tuple(rows[0].keys()), EXPORT_COLUMNS)
+        expected = [{key: '' if value is None else str(value) for key, value in row.items()} for row in self._listed()]
+        self.assertEqual(rows, expected)
+
+    def test_ndjson_export_applies_filters(self):
+        response, content = self._export(export_format='ndjson', start_date='2024-02-03', end_date='2024-02-05')
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in content.decode('utf-8').splitlines()]
+        self.assertEqual([row['transaction_date'] for row in rows], ['2024-02-05', '2024-02-04', '2024-02-03'])
+        self.assertEqual(rows, self._listed(start_date='2024-02-03', end_date='2024-02-05'))
+
+    def test_columnar_export_round_trips_across_row_groups(self):
+        with mock.patch.object(export, 'EXPORT_CHUNK_SIZE', 3):
+            response, content = self._export(export_format='columnar')
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        self.assertEqual(list(read_columnar(io.BytesIO(content))), self._listed())
+
+    def test_empty_exports(self):
+        _, content = self._export(start_date='2030-01-01')
+        self.assertEqual(content.decode('utf-8').strip(), ','.join(EXPORT_COLUMNS))
+        _, content = self._export(export_format='ndjson', start_date='2030-01-01')
+        self.assertEqual(content, b'')
+        _, content = self._export(export_format='columnar', start_date='2030-01-01')
+        self.assertEqual(list(read_columnar(io.BytesIO(content))), [])
+
+    def test_format_follows_the_accept_header(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertEqual(b''.join(response.streaming_content), self._export()[1])
+
+        response = self.client.get(self.url, HTTP_ACCEPT='application/x-ndjson, */*;q=0.1')
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        # ?export_format= wins over Accept
+        response = self.client.get(self.url, {'export_format': 'csv'}, HTTP_ACCEPT='application/x-ndjson')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(self.url, {'export_format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {'export_format': 'xlsx'}, HTTP_ACCEPT='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,134 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..import_jobs import claim_next_job, requeue_stale_jobs, run_job
+from ..models import ImportJob, Transaction
+
+User = get_user_model()
+
+HEADER = "Date,Name / Description,Account,Counterparty,Code,Debit/credit,Amount (AUD),Transaction type,Notifications\n"
+ROWS = ''.join(f"2024010{i % 9 + 1},GROCER {i},ACC001,,C{i},DEBIT,{i + 1}.00,PURCHASE,\n" for i in range(12))
+
+
+class ImportJobTests(TestCase):
+    """Tests for queued CSV imports and the import worker."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls._media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls._media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='job_user', password='password123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _queue_upload(self, content):
+        csv_file = io.BytesIO(content.encode('utf-8'))
+        csv_file.name = 'export.csv'
+        return self.client.post(
+            reverse('transaction-csv-upload'),
+            {'file': csv_file, 'account_base_currency': 'AUD', 'background': 'true'},
+            format='multipart'
+        )
+
+    @patch('transactions.csv_import.CSV_IMPORT_CHUNK_SIZE', 5)
+    def test_background_upload_is_processed_by_worker(self):
+        response = self._queue_upload(HEADER + ROWS)
+
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['job_id']
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 0)
+
+        progress = self.client.get(response.data['progress_url'])
+        self.assertEqual(progress.data['status'], 'pending')
+
+        out = StringIO()
+        call_command('run_import_worker', once=True, stdout=out)
+        self.assertIn('processed 1 jobs', out.getvalue())
+
+        progress = self.client.get(reverse('import-job-detail', kwargs={'pk': job_id}))
+        self.assertEqual(progress.data['status'], 'completed')
+        self.assertEqual(progress.data['phase'], 'done')
+        self.assertEqual(progress.data['rows_parsed'], 12)
+        self.assertEqual(progress.data['rows_inserted'], 12)
+        self.assertEqual(progress.data['result']['imported_count'], 12)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 12)
+        self.assertFalse(ImportJob.objects.get(pk=job_id).upload)
+
+    def test_invalid_file_marks_job_failed(self):
+        self._queue_upload("Date,Description\n20240101,Coffee\n")
+        job = run_job(claim_next_job())
+
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('CSV headers do not match', job.message)
+
+    def test_job_is_claimed_once(self):
+        self._queue_upload(HEADER + ROWS)
+        self.assertIsNotNone(claim_next_job())
+        self.assertIsNone(claim_next_job())
+
+    def test_requeued_job_is_finished_by_its_latest_claim_only(self):
+        job_id = self._queue_upload(HEADER + ROWS).data['job_id']
+        first = claim_next_job()
+        # The first worker is still running when another one requeues and claims the job
+        ImportJob.objects.filter(pk=job_id).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=30)), 1)
+        second = claim_next_job()
+        self.assertEqual((first.attempt, second.attempt), (1, 2))
+
+        run_job(first)
+        job = ImportJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, 'running')
+        self.assertTrue(job.upload)
+
+        run_job(second)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_inserted), ('completed', 12))
+        self.assertFalse(job.upload)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 12)
+
+    def test_jobs_are_private_to_their_user(self):
+        job_id = self._queue_upload(HEADER + ROWS).data['job_id']
+        other = User.objects.create_user(username='other_job_user', password='password123')
+        self.client.force_authenticate(user=other)
+
+        self.assertEqual(self.client.get(reverse('import-job-detail', kwargs={'pk': job_id})).status_code, 404)
+        self.assertEqual(self.client.get(reverse('import-job-list')).data['count'], 0)
+
+    def test_up_sync_job_reports_progress_per_page(self):
+        job = ImportJob.objects.create(user=self.user, source='up_bank', options={'initial_sync': True})
+        claimed = claim_next_job()
+
+        def sync(user_id, progress_callback=None, **kwargs):
+            # A sync that has been running for an hour stores another page
+            ImportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+            progress_callback({'created_count': 3, 'duplicate_count': 1})
+            self.assertEqual(requeue_stale_jobs(timedelta(minutes=30)), 0)
+            self.assertEqual(ImportJob.objects.get(pk=job.pk).rows_inserted, 3)
+            return {'success': True, 'message': 'Up Bank sync complete.', 'created_count': 5, 'duplicate_count': 1}
+
+        with patch('integrations.logic.sync_up_transactions_for_user', side_effect=sync):
+            run_job(claimed)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_inserted, job.rows_parsed), ('completed', 5, 6))
@@ -0,0 +1,117 @@
+# transactions/tests/test_search.py
+from datetime import date
+from decimal import Decimal
+from importlib import import_module
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from ..models import Transaction
+from ..search import (
+    IContainsSearchBackend, PostgresSearchBackend, SQLiteFTSSearchBackend, get_search_backend, search_transactions,
+)
+
+search_index_migration = import_module('transactions.migrations.0028_transaction_search_index')
+
+User = get_user_model()
+
+
+class TransactionSearchTests(APITestCase):
+    """
+    Tests for ?search= on the transaction list and the search index behind it.
+    """
+
+    def setUp(self):
+        # Migrations are not run in the test settings, so the index is installed here
+        self.backend = get_search_backend(connection)
+        self.backend.install(connection)
+        self.user = User.objects.create_user(username='searcher', password='password123')
+        self.other_user = User.objects.create_user(username='other', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('transaction-list')
+
+        self.coffee = self._create(description='Coffee Shop Sydney', vendor_name='Bean There')
+        self.groceries = self._create(description='WOOLWORTHS 1234 SYDNEY', original_vendor_name='Woolworths Metro')
+        self.noted = self._create(description='Card purchase', source_notifications='Birthday present for Sam')
+        self._create(description='Coffee Shop Sydney', user=self.other_user)
+
+    def _create(self, user=None, **fields):
+        return Transaction.objects.create(
+            user=user or self.user, transaction_date=date(2024, 3, 1), original_amount=Decimal('10.00'),
+            direction='DEBIT', original_currency='AUD', **fields,
+        )
+
+    def _search_ids(self, query):
+        response = self.client.get(self.url, {'search': query, 'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.data['results']}
+
+    def test_search_matches_description_vendor_and_notes(self):
+        self.assertEqual(self._search_ids('coffee'), {self.coffee.id})
+        self.assertEqual(self._search_ids('bean'), {self.coffee.id})
+        self.assertEqual(self._search_ids('metro'), {self.groceries.id})
+        self.assertEqual(self._search_ids('birthday'), {self.noted.id})
+
+    def test_search_is_case_insensitive_substring_and_requires_every_term(self):
+        self.assertEqual(self._search_ids('sydney'), {self.coffee.id, self.groceries.id})
+        self.assertEqual(self._search_ids('SYDNEY worth'), {self.groceries.id})
+        self.assertEqual(self._search_ids('sydney birthday'), set())
+
+    def test_index_follows_updates_deletes_and_bulk_writes(self):
+        self.coffee.description = 'Tea House'
+        self.coffee.save()
+        Transaction.objects.filter(pk=self.groceries.pk).update(vendor_name='Corner Store')
+        bulk = Transaction.objects.bulk_create([Transaction(
+            user=self.user, transaction_date=date(2024, 3, 2), original_amount=Decimal('3.00'),
+            direction='DEBIT', original_currency='AUD', description='Bakery Bulk',
+        )])
+        self.noted.delete()
+
+        self.assertEqual(self._search_ids('coffee'), set())
+        self.assertEqual(self._search_ids('tea house'), {self.coffee.id})
+        self.assertEqual(self._search_ids('corner'), {self.groceries.id})
+        self.assertEqual(self._search_ids('bakery'), {bulk[0].id})
+        self.assertEqual(self._search_ids('birthday'), set())
+
+    def test_fallback_returns_the_same_rows(self):
+        queryset = Transaction.objects.filter(user=self.user)
+        for query in ('sydney', 'SYDNEY worth', 'sy', 'present sam', '100%'):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    set(search_transactions(queryset, query).values_list('id', flat=True)),
+                    set(IContainsSearchBackend().search(queryset, query).values_list('id', flat=True)),
+                )
+
+        self.backend.uninstall(connection)
+        self.assertEqual(self._search_ids('sydney'), {self.coffee.id, self.groceries.id})
+
+    @override_settings(TRANSACTION_SEARCH_BACKEND='transactions.search.IContainsSearchBackend')
+    def test_configured_backend_is_used(self):
+        self.assertIsInstance(get_search_backend(connection), IContainsSearchBackend)
+        self.assertEqual(self._search_ids('bean'), {self.coffee.id})
+
+    def test_vendor_name_search_still_matches_description_substrings(self):
+        response = self.client.get(reverse('vendor-names-search'), {'q': 'shop syd'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Coffee Shop Sydney', response.data)
+
+    def test_migration_creates_the_indexes_the_backends_query(self):
+        # The migration's frozen DDL must match what the backends install and query
+        for vendor, backend in (('sqlite', SQLiteFTSSearchBackend()), ('postgresql', PostgresSearchBackend())):
+            for migration_step, backend_step in (
+                (search_index_migration.install_search_index, backend.install),
+                (search_index_migration.uninstall_search_index, backend.uninstall),
+            ):
+                executed = []
+                schema_editor = SimpleNamespace(connection=SimpleNamespace(vendor=vendor), execute=lambda sql, params=None: executed.append(sql))
+                migration_step(None, schema_editor)
+                cursor = mock.MagicMock()
+                backend_step(mock.Mock(cursor=mock.Mock(return_value=cursor)))
+                with self.subTest(vendor=vendor, step=backend_step.__name__):
+                    self.assertTrue(executed)
+                    self.assertEqual(executed, [call.args[0] for call in cursor.__enter__.return_value.execute.call_args_list])
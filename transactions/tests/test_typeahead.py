@@ -0,0 +1,141 @@
+# transactions/tests/test_typeahead.py
+import random
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .. import typeahead
+from ..cache_versions import get_cache_version
+from ..models import Category, Transaction, Vendor, VendorMapping
+from ..typeahead import CATEGORY, DESCRIPTION, VENDOR_NAME, VENDOR_SUGGESTIONS, TypeaheadIndex, get_typeahead_index
+
+User = get_user_model()
+
+
+class TypeaheadIndexTests(SimpleTestCase):
+    """Tests for the in-memory prefix/trigram index."""
+
+    def test_matches_like_icontains(self):
+        rng = random.Random(7)
+        words = ['coffee', 'Shop', 'SYDNEY', 'woolworths', 'metro', 'bp', 'Uber', 'eats', 'café', 'au']
+        names = {' '.join(rng.choice(words) for _ in range(rng.randint(1, 4))) for _ in range(300)}
+        index = TypeaheadIndex((name, DESCRIPTION) for name in names)
+
+        for query in ['co', 'coffee', 'SHOP syd', 'ee s', 'b', 'é', 'rth', 'uber eats', 'zzz', 'p s']:
+            with self.subTest(query=query):
+                expected = {name for name in names if query.lower() in name.lower()}
+                self.assertEqual(set(index.search(query, DESCRIPTION, limit=None)), expected)
+
+    def test_ranking_and_limit(self):
+        index = TypeaheadIndex((name, VENDOR_NAME) for name in [
+            'Bakery Shop', 'The Shop', 'Shop', 'Shopping Centre', 'Workshop', 'Shopify', 'Coffee Shop Sydney',
+        ])
+
+        self.assertEqual(index.search('shop', VENDOR_NAME, limit=None), [
+            'Shop',                                          # exact
+            'Shopify', 'Shopping Centre',                    # prefix, shorter first
+            'The Shop', 'Bakery Shop', 'Coffee Shop Sydney', # word start
+            'Workshop',                                      # anywhere
+        ])
+        self.assertEqual(index.search('shop', VENDOR_NAME, limit=2), ['Shop', 'Shopify'])
+
+    def test_kinds_filter_and_merge(self):
+        index = TypeaheadIndex([('Groceries', CATEGORY), ('Grocer Joe', VENDOR_NAME), ('Groceries', DESCRIPTION)])
+
+        self.assertEqual(index.search('groc', CATEGORY), ['Groceries'])
+        self.assertEqual(index.search('groc', VENDOR_SUGGESTIONS), ['Groceries', 'Grocer Joe'])
+        self.assertEqual(index.search('   ', VENDOR_SUGGESTIONS), [])
+
+
+class TypeaheadEndpointTests(APITestCase):
+    """Tests for the autocomplete endpoints served from the typeahead index."""
+
+    def setUp(self):
+        # Test transactions roll back the cache versions but not the cached indexes
+        typeahead._index_cache.clear()
+        self.user = User.objects.create_user(username='typeahead_user', password='password123')
+        other_user = User.objects.create_user(username='typeahead_other', password='password123')
+        self.client.force_authenticate(user=self.user)
+        Vendor.objects.create(name='Bean There Coffee', user=self.user)
+        Vendor.objects.create(name='Coffee Club', user=other_user)
+        VendorMapping.objects.create(user=self.user, original_name='SQ *BEANS', mapped_vendor='Beans & Co')
+        Category.objects.create(name='Coffee & Tea', user=self.user)
+        Category.objects.create(name='Coffee Machines', user=other_user)
+        self._transaction('COFFEE SHOP 1234 SYDNEY')
+        self.vendor_url = reverse('vendor-names-search')
+        self.category_url = reverse('category-names-search')
+
+    def _transaction(self, description, user=None):
+        return Transaction.objects.create(
+            user=user or self.user, transaction_date=date(2024, 5, 1), description=description,
+            original_amount=Decimal('4.50'), direction='DEBIT', original_currency='AUD',
+        )
+
+    def test_vendor_suggestions_combine_sources(self):
+        response = self.client.get(self.vendor_url, {'q': 'bean'})
+        self.assertEqual(response.data, ['Beans & Co', 'Bean There Coffee'])
+
+        response = self.client.get(self.vendor_url, {'q': 'coffee'})
+        self.assertEqual(response.data, ['COFFEE SHOP 1234 SYDNEY', 'Bean There Coffee'])
+
+    def test_category_suggestions(self):
+        response = self.client.get(self.category_url, {'q': 'coffee'})
+        self.assertEqual(response.data, ['Coffee & Tea'])
+        self.assertEqual(self.client.get(self.category_url, {'q': ''}).data, [])
+
+    def test_searches_after_the_first_only_check_the_version(self):
+        self.client.get(self.vendor_url, {'q': 'bean'})
+        with self.assertNumQueries(2):
+            self.client.get(self.vendor_url, {'q': 'bean t'})
+            self.client.get(self.category_url, {'q': 'tea'})
+
+    def test_writes_in_another_process_invalidate_the_index(self):
+        self.assertEqual(self.client.get(self.vendor_url, {'q': 'pastry'}).data, [])
+
+        # Another process (a web worker, the import worker) has its own index cache
+        with mock.patch.object(typeahead, '_index_cache', OrderedDict()):
+            self.assertEqual(self.client.get(self.vendor_url, {'q': 'pastry'}).data, [])
+            Vendor.objects.create(name='Pastry Cart', user=self.user)
+        self.assertEqual(self.client.get(self.vendor_url, {'q': 'pastry'}).data, ['Pastry Cart'])
+
+    def test_writes_invalidate_the_index(self):
+        self.assertEqual(self.client.get(self.vendor_url, {'q': 'pastry'}).data, [])
+
+        transaction = self._transaction('Pastry Palace')
+        self.assertEqual(self.client.get(self.vendor_url, {'q': 'pastry'}).data, ['Pastry Palace'])
+
+        transaction.delete()
+        self.assertEqual(self.client.get(self.vendor_url, {'q': 'pastry'}).data, [])
+
+        Vendor.objects.create(name='Pastry Cart', user=self.user)
+        Category.objects.create(name='Pastries', user=None) # System categories reach every user
+        self.assertEqual(self.client.get(self.vendor_url, {'q': 'pastry'}).data, ['Pastry Cart'])
+        self.assertEqual(self.client.get(self.category_url, {'q': 'past'}).data, ['Pastries'])
+
+    def test_saves_that_keep_the_names_do_not_invalidate_the_index(self):
+        transaction = Transaction.objects.get(user=self.user, description='COFFEE SHOP 1234 SYDNEY')
+        version = get_cache_version(typeahead.CACHE_SCOPE, self.user.pk)
+
+        transaction.category = Category.objects.get(name='Coffee & Tea')
+        transaction.transaction_date = '2024-05-01'  # Unchanged, as a string
+        transaction.save()
+        transaction.save(update_fields=['category'])
+        self.assertEqual(get_cache_version(typeahead.CACHE_SCOPE, self.user.pk), version)
+
+        transaction.description = 'COFFEE SHOP 1234 MELBOURNE'
+        transaction.save(update_fields=['description'])
+        self.assertNotEqual(get_cache_version(typeahead.CACHE_SCOPE, self.user.pk), version)
+
+    def test_cache_is_bounded(self):
+        others = [User.objects.create_user(username=f'lru_{index}', password='password123') for index in range(3)]
+        with mock.patch.object(typeahead, 'TYPEAHEAD_CACHE_USERS', 2):
+            for user in [self.user] + others:
+                get_typeahead_index(user)
+            self.assertLessEqual(len(typeahead._index_cache), 2)
+            self.assertNotIn(self.user.pk, typeahead._index_cache)
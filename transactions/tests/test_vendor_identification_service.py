@@ -0,0 +1,173 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import vendor_matcher
+from ..models import Transaction, Vendor
+from ..vendor_identification_service import identify_vendors_for_user_transactions
+from ..vendor_matcher import VendorMatcher, get_vendor_matcher, invalidate_vendor_matcher
+
+User = get_user_model()
+
+
+class VendorMatcherTests(TestCase):
+    """Tests for the Aho-Corasick vendor matcher."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='matcher_user', password='password123')
+
+    def setUp(self):
+        invalidate_vendor_matcher(self.user.id)
+
+    def _vendor(self, name, display_name='', patterns=None, age_days=0):
+        vendor = Vendor.objects.create(
+            user=self.user, name=name, display_name=display_name,
+            description_patterns=patterns or [],
+        )
+        Vendor.objects.filter(pk=vendor.pk).update(created_at=timezone.now() - timedelta(days=age_days))
+        vendor.refresh_from_db()
+        return vendor
+
+    def test_matches_name_display_name_and_patterns(self):
+        woolies = self._vendor('Woolworths', display_name='Woolies Supermarket')
+        shell = self._vendor('Shell', patterns=['SHELL COLES EXPRESS'])
+        matcher = VendorMatcher([woolies, shell])
+
+        self.assertEqual(matcher.match('woolworths 1234 sydney'), woolies)
+        self.assertEqual(matcher.match('Paid at WOOLIES SUPERMARKET'), woolies)
+        self.assertEqual(matcher.match('shell coles express 42'), shell)
+        self.assertIsNone(matcher.match('netflix.com'))
+
+    def test_newest_vendor_wins_when_several_match(self):
+        older = self._vendor('Coffee', age_days=10)
+        newer = self._vendor('Coffee Club', age_days=1)
+        matcher = get_vendor_matcher(self.user)
+
+        self.assertEqual(matcher.match('the coffee club brisbane'), newer)
+        self.assertEqual(matcher.match('coffee at home'), older)
+
+    def test_overlapping_patterns_use_suffix_links(self):
+        # 'bcd' only matches through the failure link from the 'abc' branch
+        first = self._vendor('abce', age_days=2)
+        second = self._vendor('bcd', age_days=1)
+        matcher = VendorMatcher([second, first])
+
+        self.assertEqual(matcher.match('xxabcdxx'), second)
+        self.assertEqual(matcher.match('abce'), first)
+
+    def test_counterparty_text_is_matched(self):
+        vendor = self._vendor('Spotify')
+        matcher = VendorMatcher([vendor])
+        self.assertEqual(matcher.match('card purchase', 'SPOTIFY AB'), vendor)
+
+    def test_cache_is_reused_and_invalidated_on_vendor_write(self):
+        self._vendor('Aldi')
+        matcher = get_vendor_matcher(self.user)
+        self.assertIs(get_vendor_matcher(self.user), matcher)
+
+        kmart = self._vendor('Kmart')
+        rebuilt = get_vendor_matcher(self.user)
+        self.assertIsNot(rebuilt, matcher)
+        self.assertEqual(rebuilt.match('kmart bondi'), kmart)
+
+        kmart.delete()
+        self.assertIsNone(get_vendor_matcher(self.user).match('kmart bondi'))
+
+    def test_cache_is_bounded(self):
+        others = [User.objects.create_user(username=f'matcher_lru_{index}', password='password123') for index in range(3)]
+        with mock.patch.object(vendor_matcher, 'VENDOR_MATCHER_CACHE_USERS', 2):
+            for user in [self.user] + others:
+                get_vendor_matcher(user)
+            self.assertLessEqual(len(vendor_matcher._matcher_cache), 2)
+            self.assertNotIn(self.user.pk, vendor_matcher._matcher_cache)
+            self.assertIn(others[-1].pk, vendor_matcher._matcher_cache)
+
+
+class VendorIdentificationServiceTests(TestCase):
+    """Tests for bulk vendor identification of transactions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='identify_user', password='password123')
+
+    def _transaction(self, description):
+        return Transaction.objects.create(
+            user=self.user, description=description, transaction_date=date(2024, 1, 15),
+            original_amount=Decimal('10.00'), original_currency='AUD', direction='DEBIT',
+            original_vendor_name=description, vendor_name=description,
+        )
+
+    def test_existing_vendor_is_assigned(self):
+        vendor = Vendor.objects.create(user=self.user, name='Bunnings')
+        tx = self._transaction('BUNNINGS WAREHOUSE 123')
+
+        result = identify_vendors_for_user_transactions(self.user)
+
+        tx.refresh_from_db()
+        self.assertEqual(tx.vendor, vendor)
+        self.assertEqual(result.identified_count, 1)
+        self.assertEqual(result.created_vendors_count, 0)
+
+    def test_repeated_descriptions_create_each_vendor_once(self):
+        for _ in range(5):
+            self._transaction('NETFLIX.COM')
+            self._transaction('netflix.com')
+            self._transaction('UBER EATS - SYDNEY')
+        self._transaction('PAYMENT')
+
+        result = identify_vendors_for_user_transactions(self.user)
+
+        self.assertEqual(Vendor.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(result.identified_count, 15)
+        self.assertEqual(result.created_vendors_count, 2)
+        self.assertEqual(result.skipped_count, 1)
+        netflix = Vendor.objects.get(user=self.user, name__iexact='netflix.com')
+        self.assertEqual(Transaction.objects.filter(vendor=netflix).count(), 10)
+        self.assertTrue(Vendor.objects.filter(user=self.user, name='UBER EATS').exists())
+
+    def test_vendors_inserted_concurrently_are_reused(self):
+        self._transaction('NETFLIX.COM')
+        self._transaction('UBER EATS - SYDNEY')
+        bulk_create = Vendor.objects.bulk_create
+
+        def racing_bulk_create(vendors, **kwargs):
+            # Another import inserts one of the vendors between the lookup and the insert
+            Vendor.objects.create(user=self.user, name='NETFLIX.COM')
+            return bulk_create(vendors, **kwargs)
+
+        with mock.patch.object(Vendor.objects, 'bulk_create', side_effect=racing_bulk_create):
+            result = identify_vendors_for_user_transactions(self.user)
+
+        self.assertEqual(result.identified_count, 2)
+        self.assertEqual(Vendor.objects.filter(user=self.user).count(), 2)
+
+    def test_later_batches_match_vendors_created_by_earlier_ones(self):
+        self._transaction('NETFLIX.COM')
+        self._transaction('NETFLIX.COM MONTHLY PLAN')
+        with mock.patch('transactions.vendor_identification_service.IDENTIFICATION_BATCH_SIZE', 1):
+            result = identify_vendors_for_user_transactions(self.user)
+
+        self.assertEqual(result.identified_count, 2)
+        self.assertEqual(result.created_vendors_count, 1)
+        self.assertEqual(Vendor.objects.filter(user=self.user).count(), 1)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        Vendor.objects.create(user=self.user, name='Aldi')
+        for i in range(3):
+            self._transaction('ALDI STORES')
+            self._transaction(f'NEW SHOP {chr(65 + i)}XYZ')
+        identify_vendors_for_user_transactions(self.user)  # warm the matcher cache, with the new vendors
+
+        for i in range(40):
+            self._transaction('ALDI STORES')
+            self._transaction(f'NEW SHOP {chr(65 + i % 3)}XYZ')
+        # ids, matcher stamp, batch load, savepoint pair, bulk update, custom views to sync
+        with self.assertNumQueries(7):
+            result = identify_vendors_for_user_transactions(self.user)
+        self.assertEqual(result.identified_count, 80)
+        self.assertEqual(result.created_vendors_count, 0)
@@ -0,0 +1,180 @@
+"""
+Per-user typeahead index for the vendor and category name autocomplete endpoints.
+
+Holds every name a user can be suggested (system and own vendor names, mapped vendor
+names, their most recent distinct transaction descriptions and category names) in
+memory, so a keystroke is answered with a single query (the version check, see below):
+
+- a sorted array of lowercased names answers prefix matches with two bisections;
+- trigram postings (sorted arrays of name positions) answer substring matches by
+  intersecting the postings of the query's trigrams and checking the survivors.
+
+Matching is case-insensitive substring matching, as with icontains. Results are ranked
+exact match, then prefix, then word start, then anywhere, shorter names first.
+
+Indexes are cached per process for the TYPEAHEAD_CACHE_USERS most recently used users
+and rebuilt when the user's typeahead cache version, kept in the database, changes
+(see cache_versions.py), so a write in any process invalidates them in all of them.
+TYPEAHEAD_MAX_DESCRIPTIONS bounds the number of descriptions indexed per user.
+"""
+
+import heapq
+import logging
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Max, Q
+
+from .cache_versions import bump_cache_version, get_cache_version
+from .models import Category, Transaction, Vendor, VendorMapping
+
+logger = logging.getLogger(__name__)
+
+# Users whose index is kept in memory by each process
+TYPEAHEAD_CACHE_USERS = int(os.getenv('TYPEAHEAD_CACHE_USERS', '128'))
+# Most recent distinct transaction descriptions indexed per user
+TYPEAHEAD_MAX_DESCRIPTIONS = int(os.getenv('TYPEAHEAD_MAX_DESCRIPTIONS', '5000'))
+# Suggestions returned per query
+TYPEAHEAD_RESULT_LIMIT = 20
+CACHE_SCOPE = 'typeahead'
+# Transaction fields the index is built from; saves that change none of them keep it
+TYPEAHEAD_TRANSACTION_FIELDS = ('description', 'transaction_date')
+
+# Kinds of names, combined as a bit mask per name
+VENDOR_NAME = 1
+MAPPED_VENDOR = 2
+DESCRIPTION = 4
+CATEGORY = 8
+VENDOR_SUGGESTIONS = VENDOR_NAME | MAPPED_VENDOR | DESCRIPTION
+
+NGRAM = 3
+
+
+def _ngrams(text: str) -> set:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class TypeaheadIndex:
+    """Prefix and trigram index over a set of (name, kind) entries."""
+
+    def __init__(self, entries: Iterable[Tuple[str, int]]):
+        kinds: Dict[str, int] = {}
+        for name, kind in entries:
+            if name:
+                kinds[name] = kinds.get(name, 0) | kind
+        # Position order is case-sensitive name order, the final tie-break of the ranking
+        self.names: List[str] = sorted(kinds)
+        self.kinds = array('B', (kinds[name] for name in self.names))
+        self.lowered: List[str] = [name.lower() for name in self.names]
+
+        self._prefix_positions = sorted(range(len(self.names)), key=self.lowered.__getitem__)
+        self._prefix_keys = [self.lowered[position] for position in self._prefix_positions]
+
+        postings: Dict[str, List[int]] = {}
+        for position, text in enumerate(self.lowered):
+            for gram in _ngrams(text):
+                postings.setdefault(gram, []).append(position)
+        # Positions were appended in order, so every posting list is sorted
+        self._postings: Dict[str, array] = {gram: array('I', positions) for gram, positions in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _prefix_matches(self, query: str) -> List[int]:
+        start = bisect_left(self._prefix_keys, query)
+        # '\uffff' sorts after every character that can follow the prefix
+        end = bisect_left(self._prefix_keys, query + '\uffff', start)
+        return self._prefix_positions[start:end]
+
+    def _substring_matches(self, query: str) -> Iterable[int]:
+        if len(query) < NGRAM:
+            return (position for position, text in enumerate(self.lowered) if query in text)
+        postings = sorted((self._postings.get(gram) for gram in _ngrams(query)), key=lambda p: len(p) if p else 0)
+        if not postings[0]:
+            return ()
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return ()
+        # Trigrams can all occur without the query occurring as a whole
+        return (position for position in candidates if query in self.lowered[position])
+
+    def _rank(self, position: int, query: str) -> tuple:
+        text = self.lowered[position]
+        if text == query:
+            tier = 0
+        elif text.startswith(query):
+            tier = 1
+        elif f" {query}" in text:
+            tier = 2
+        else:
+            tier = 3
+        return (tier, len(text), position)
+
+    def search(self, query: str, kinds: int, limit: Optional[int] = TYPEAHEAD_RESULT_LIMIT) -> List[str]:
+        """Names of the given kinds containing query (case-insensitive), best matches first."""
+        query = (query or '').strip().lower()
+        if not query:
+            return []
+        matches = [position for position in self._prefix_matches(query) if self.kinds[position] & kinds]
+        # Prefix matches outrank every other match, so the rest is only needed when they run short
+        if limit is None or len(matches) < limit:
+            matches = [position for position in self._substring_matches(query) if self.kinds[position] & kinds]
+
+        def rank(position):
+            return self._rank(position, query)
+        ranked = sorted(matches, key=rank) if limit is None else heapq.nsmallest(limit, matches, key=rank)
+        return [self.names[position] for position in ranked]
+
+
+def _index_entries(user_id: int) -> Iterable[Tuple[str, int]]:
+    for name in Vendor.objects.filter(Q(user__isnull=True) | Q(user_id=user_id)).values_list('name', flat=True):
+        yield name, VENDOR_NAME
+    for name in VendorMapping.objects.filter(user_id=user_id).values_list('mapped_vendor', flat=True):
+        yield name, MAPPED_VENDOR
+    descriptions = (
+        Transaction.objects.filter(user_id=user_id).values('description')
+        .annotate(latest=Max('transaction_date')).order_by('-latest')[:TYPEAHEAD_MAX_DESCRIPTIONS]
+    )
+    for row in descriptions:
+        yield row['description'], DESCRIPTION
+    for name in Category.objects.filter(Q(user__isnull=True) | Q(user_id=user_id)).values_list('name', flat=True):
+        yield name, CATEGORY
+
+
+# --- Per-user index cache ---
+# Least recently used first; each entry stores the cache version it was built for.
+_index_cache: 'OrderedDict[int, Tuple[tuple, TypeaheadIndex]]' = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def get_typeahead_index(user) -> TypeaheadIndex:
+    """Return the cached index for a user, rebuilding it if their names changed."""
+    user_id = getattr(user, 'pk', user)
+    version = get_cache_version(CACHE_SCOPE, user_id)
+
+    with _index_cache_lock:
+        cached = _index_cache.get(user_id)
+        if cached and cached[0] == version:
+            _index_cache.move_to_end(user_id)
+            return cached[1]
+
+    index = TypeaheadIndex(_index_entries(user_id))
+    logger.debug(f"User {user_id}: Built typeahead index of {len(index)} names")
+
+    with _index_cache_lock:
+        _index_cache[user_id] = (version, index)
+        _index_cache.move_to_end(user_id)
+        while len(_index_cache) > TYPEAHEAD_CACHE_USERS:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def invalidate_typeahead_index(user_id: Optional[int]) -> None:
+    """Mark a user's index (every user's, for None) as stale in every process."""
+    bump_cache_version(CACHE_SCOPE, user_id)
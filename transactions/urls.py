@@ -5,6 +5,7 @@ from .views import (
     CategoryListCreateView,
     CategoryDetailView,
     CategoryNamesSearchView,
+    CategoryTreeView,
     VendorListCreateView,
     VendorDetailView,
     VendorNamesSearchView,
@@ -12,7 +13,9 @@ from .views import (
     VendorRuleDetailView,
     VendorMappingViewSet,
     TransactionCSVUploadView,
+    TransactionCSVBatchUploadView,
     TransactionListView,
+    TransactionExportView,
     TransactionCreateView,
     TransactionUpdateView,
     TransactionDestroyView,
@@ -27,7 +30,9 @@ from .views import (
     AutoCategorizeSingleTransactionView,
     CategorizationSuggestionsView,
     HiddenTransactionGroupView,
-    BatchHideTransactionView
+    BatchHideTransactionView,
+    ImportJobListView,
+    ImportJobDetailView
 )
 
 # Create a router and register our ViewSets with it
@@ -41,6 +46,7 @@ urlpatterns = [
     # Category URLs
     path('categories/', CategoryListCreateView.as_view(), name='category-list-create'),
     path('categories/search_names/', CategoryNamesSearchView.as_view(), name='category-names-search'),
+    path('categories/tree/', CategoryTreeView.as_view(), name='category-tree'),
     path('categories/<int:pk>/', CategoryDetailView.as_view(), name='category-detail'),
 
     # Vendor URLs
@@ -54,7 +60,11 @@ urlpatterns = [
 
     # Transaction URLs
     path('transactions/upload/', TransactionCSVUploadView.as_view(), name='transaction-csv-upload'),
+    path('transactions/upload/batch/', TransactionCSVBatchUploadView.as_view(), name='transaction-csv-batch-upload'),
+    path('import-jobs/', ImportJobListView.as_view(), name='import-job-list'),
+    path('import-jobs/<str:pk>/', ImportJobDetailView.as_view(), name='import-job-detail'),
     path('transactions/', TransactionListView.as_view(), name='transaction-list'),
+    path('transactions/export/', TransactionExportView.as_view(), name='transaction-export'),
     path('transactions/create/', TransactionCreateView.as_view(), name='transaction-create'),
     path('transactions/<int:pk>/', TransactionUpdateView.as_view(), name='transaction-detail-update'),
     path('transactions/uncategorized-groups/', UncategorizedTransactionGroupView.as_view(), name='transaction-uncategorized-groups'),
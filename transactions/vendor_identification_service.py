@@ -6,16 +6,24 @@ and counterparty information, with pattern matching and automatic vendor creatio
 """
 
 import logging
-import re
 from typing import List, Dict, Optional, Tuple
 from django.db import transaction as db_transaction
 from django.db.models import Q, QuerySet
+from django.db.models.functions import Lower
 from django.utils import timezone
 
 from .models import Transaction, Vendor
+from .typeahead import invalidate_typeahead_index
+from .vendor_matcher import VendorMatcher, get_applicable_vendors, get_vendor_matcher
+from .vendor_names import clean_vendor_name, extract_vendor_name
+from .view_engine import sync_custom_view_membership
 
 logger = logging.getLogger(__name__)
 
+# Transactions loaded and resolved per batch, and rows per UPDATE statement
+IDENTIFICATION_BATCH_SIZE = 500
+VENDOR_ASSIGNMENT_BATCH_SIZE = 500
+
 
 class VendorIdentificationResult:
     """Result object for vendor identification operations."""
@@ -95,7 +103,8 @@ class VendorIdentificationService:
         
         # Get transactions that don't have vendors assigned
         transactions = transactions.filter(vendor__isnull=True).order_by('transaction_date', 'id')
-        transaction_count = transactions.count()
+        transaction_ids = list(transactions.values_list('id', flat=True))
+        transaction_count = len(transaction_ids)
         
         self.logger.info(f"User {self.user.id}: Starting vendor identification for {transaction_count} transactions")
         
@@ -103,19 +112,26 @@ class VendorIdentificationService:
             self.logger.info(f"User {self.user.id}: No transactions need vendor identification")
             return result
             
-        # Get applicable vendors for this user
-        vendors = self._get_applicable_vendors()
-        vendor_count = vendors.count()
+        # Get the cached pattern matcher over all applicable vendors for this user
+        matcher = get_vendor_matcher(self.user)
+        
+        self.logger.info(f"User {self.user.id}: Found {len(matcher.vendors)} applicable vendors")
         
-        self.logger.info(f"User {self.user.id}: Found {vendor_count} applicable vendors")
+        # Distinct (description, counterparty) keys are resolved once across all batches
+        resolved_keys: Dict[Tuple[str, str], Tuple[Optional[Vendor], bool]] = {}
         
         # Process transactions in batches
-        batch_size = 100
-        for i in range(0, transaction_count, batch_size):
-            batch = transactions[i:i + batch_size]
-            self._process_transaction_batch(batch, vendors, result)
+        for i in range(0, transaction_count, IDENTIFICATION_BATCH_SIZE):
+            batch = Transaction.objects.filter(
+                id__in=transaction_ids[i:i + IDENTIFICATION_BATCH_SIZE],
+                vendor__isnull=True
+            ).only('id', 'description').order_by('transaction_date', 'id')
+            if self._process_transaction_batch(batch, matcher, resolved_keys, result):
+                # Later batches match the vendors this one created, as a per-row lookup would
+                matcher = get_vendor_matcher(self.user)
             
         self.logger.info(f"User {self.user.id}: Vendor identification complete. "
+                        f"Distinct descriptions: {len(resolved_keys)}, "
                         f"Identified: {result.identified_count}, "
                         f"Created: {result.created_vendors_count}, "
                         f"Skipped: {result.skipped_count}, "
@@ -137,11 +153,11 @@ class VendorIdentificationService:
             self.logger.debug(f"Transaction {transaction.id} already has vendor {transaction.vendor.name}")
             return transaction.vendor
             
-        # Get applicable vendors
-        vendors = self._get_applicable_vendors()
+        # Get the cached pattern matcher
+        matcher = get_vendor_matcher(self.user)
         
         # Try to find matching vendor
-        vendor = self._find_matching_vendor(transaction, vendors)
+        vendor = self._find_matching_vendor(transaction, matcher)
         
         if vendor:
             # Assign vendor to transaction
@@ -176,56 +192,132 @@ class VendorIdentificationService:
         
     def _get_applicable_vendors(self) -> QuerySet:
         """Get vendors applicable to this user."""
-        return Vendor.objects.filter(
-            user=self.user  # Only user's vendors
-        ).order_by('-created_at')
+        return get_applicable_vendors(self.user.id)  # Only user's vendors, newest first
+        
+    def _process_transaction_batch(self, transactions: QuerySet, matcher: VendorMatcher,
+                                 resolved_keys: Dict[Tuple[str, str], Tuple[Optional[Vendor], bool]],
+                                 result: VendorIdentificationResult) -> bool:
+        """
+        Process a batch of transactions for vendor identification.
         
-    def _process_transaction_batch(self, transactions: QuerySet, vendors: QuerySet, 
-                                 result: VendorIdentificationResult) -> None:
-        """Process a batch of transactions for vendor identification."""
+        Transactions are grouped by their (description, counterparty) key so each distinct
+        key is matched or turned into a new vendor once. Missing vendors are created with a
+        single bulk insert and assignments are written with a chunked bulk update.
+        Returns whether vendors were created.
+        """
+        groups: Dict[Tuple[str, str], List[Transaction]] = {}
         for transaction in transactions:
-            try:
-                # Skip if already has vendor (shouldn't happen due to filtering)
-                if transaction.vendor:
-                    result.add_skip(transaction.id, f"Already has vendor {transaction.vendor.name}")
-                    continue
-                    
-                # Try to find matching vendor
-                vendor = self._find_matching_vendor(transaction, vendors)
-                
+            groups.setdefault(self._transaction_key(transaction), []).append(transaction)
+            
+        # 1. Resolve keys against existing vendor patterns; collect names for new vendors
+        pending_keys: Dict[Tuple[str, str], str] = {}  # key -> lowercased vendor name
+        pending_names: Dict[str, Tuple[str, str]] = {}  # lowercased name -> (name, sample description)
+        for key, group in groups.items():
+            if key in resolved_keys:
+                continue
+            vendor = matcher.match(*key)
+            if vendor:
+                resolved_keys[key] = (vendor, False)
+                continue
+            vendor_name = self._vendor_name_for_transaction(group[0])
+            if not vendor_name:
+                resolved_keys[key] = (None, False)
+                continue
+            pending_keys[key] = vendor_name.lower()
+            pending_names.setdefault(vendor_name.lower(), (vendor_name, group[0].description))
+            
+        vendors_created = False
+        try:
+            with db_transaction.atomic():
+                # 2. Create missing vendors in bulk and map them back to their keys
+                if pending_names:
+                    vendors_by_name = self._get_or_create_vendors_by_name(pending_names)
+                    vendors_created = any(created for _, created in vendors_by_name.values())
+                    for key, name_lower in pending_keys.items():
+                        resolved_keys[key] = vendors_by_name.get(name_lower, (None, False))
+                        
+                # 3. Assign vendors with a chunked bulk update
+                now = timezone.now()
+                to_update = []
+                for key, group in groups.items():
+                    vendor, _ = resolved_keys[key]
+                    if not vendor:
+                        continue
+                    for transaction in group:
+                        transaction.vendor = vendor
+                        transaction.updated_at = now
+                        to_update.append(transaction)
+                if to_update:
+                    Transaction.objects.bulk_update(to_update, ['vendor', 'updated_at'],
+                                                    batch_size=VENDOR_ASSIGNMENT_BATCH_SIZE)
+                    # bulk_update sends no post_save; the batch was loaded with only some fields
+                    sync_custom_view_membership(
+                        self.user.id, Transaction.objects.filter(pk__in=[transaction.id for transaction in to_update])
+                    )
+        except Exception as e:
+            for group in groups.values():
+                for transaction in group:
+                    result.add_error(transaction.id, str(e), e)
+            return False
+            
+        for key, group in groups.items():
+            vendor, is_new_vendor = resolved_keys[key]
+            for transaction in group:
                 if vendor:
-                    # Assign existing vendor
-                    transaction.vendor = vendor
-                    transaction.save(update_fields=['vendor', 'updated_at'])
-                    result.add_identified(transaction.id, vendor.name)
-                    
-                    self.logger.debug(f"Assigned existing vendor {vendor.name} to transaction {transaction.id}")
+                    result.add_identified(transaction.id, vendor.name, is_new_vendor=is_new_vendor)
                 else:
-                    # Try to create new vendor
-                    vendor = self._create_vendor_from_transaction(transaction)
-                    if vendor:
-                        transaction.vendor = vendor
-                        transaction.save(update_fields=['vendor', 'updated_at'])
-                        result.add_identified(transaction.id, vendor.name, is_new_vendor=True)
-                        
-                        self.logger.debug(f"Created and assigned new vendor {vendor.name} to transaction {transaction.id}")
-                    else:
-                        result.add_skip(transaction.id, "Could not identify or create vendor")
-                        
-            except Exception as e:
-                result.add_error(transaction.id, str(e), e)
-                
-    def _find_matching_vendor(self, transaction: Transaction, vendors: QuerySet) -> Optional[Vendor]:
-        """Find a matching vendor for the transaction."""
+                    result.add_skip(transaction.id, "Could not identify or create vendor")
+        return vendors_created
+                    
+    def _get_or_create_vendors_by_name(self, pending_names: Dict[str, Tuple[str, str]]) -> Dict[str, Tuple[Vendor, bool]]:
+        """
+        Fetch or bulk-create vendors for the given lowercased names.
+        
+        Returns:
+            Dict mapping lowercased name -> (vendor, created_by_this_call)
+        """
+        def fetch(names_lower):
+            return {
+                vendor.name.lower(): vendor
+                for vendor in Vendor.objects.annotate(name_lower=Lower('name')).filter(
+                    user=self.user, name_lower__in=list(names_lower)
+                )
+            }
+            
+        existing = fetch(pending_names.keys())
+        missing = [name_lower for name_lower in pending_names if name_lower not in existing]
+        
+        vendors_by_name = {name_lower: (vendor, False) for name_lower, vendor in existing.items()}
+        if missing:
+            new_vendors = [
+                Vendor(
+                    name=pending_names[name_lower][0],
+                    display_name=pending_names[name_lower][0],
+                    description_patterns=[pending_names[name_lower][1]],
+                    user=self.user
+                )
+                for name_lower in missing
+            ]
+            Vendor.objects.bulk_create(new_vendors, ignore_conflicts=True)  # (user, name) is unique; concurrent imports may race
+            invalidate_typeahead_index(self.user.id)  # bulk_create sends no post_save
+            # ignore_conflicts returns no pks: re-fetch the names that did not exist before the insert
+            created = fetch(missing)
+            for name_lower, vendor in created.items():
+                vendors_by_name[name_lower] = (vendor, True)
+            self.logger.info(f"User {self.user.id}: Bulk created {len(created)} new vendors")
+            
+        return vendors_by_name
+        
+    def _transaction_key(self, transaction: Transaction) -> Tuple[str, str]:
+        """Normalized (description, counterparty) key used to group identical transactions."""
         description = transaction.description.lower()
         counterparty = getattr(transaction, 'counterparty', '').lower() if hasattr(transaction, 'counterparty') else ''
+        return description, counterparty
         
-        # Check each vendor's patterns
-        for vendor in vendors:
-            if self._vendor_matches_transaction(vendor, description, counterparty):
-                return vendor
-                
-        return None
+    def _find_matching_vendor(self, transaction: Transaction, matcher: VendorMatcher) -> Optional[Vendor]:
+        """Find a matching vendor for the transaction."""
+        # Single pass over the description/counterparty; newest vendor wins
+        return matcher.match(*self._transaction_key(transaction))
         
     def _vendor_matches_transaction(self, vendor: Vendor, description: str, counterparty: str) -> bool:
         """Check if a vendor matches the transaction description/counterparty."""
@@ -247,8 +339,8 @@ class VendorIdentificationService:
                         
         return False
         
-    def _create_vendor_from_transaction(self, transaction: Transaction) -> Optional[Vendor]:
-        """Create a new vendor based on transaction description/counterparty."""
+    def _vendor_name_for_transaction(self, transaction: Transaction) -> Optional[str]:
+        """Derive a new vendor name from the transaction description/counterparty."""
         # Extract potential vendor name from description
         vendor_name = self._extract_vendor_name_from_description(transaction.description)
         
@@ -256,6 +348,12 @@ class VendorIdentificationService:
             # Check if transaction has counterparty field
             if hasattr(transaction, 'counterparty') and transaction.counterparty:
                 vendor_name = self._clean_vendor_name(transaction.counterparty)
+                
+        return vendor_name
+        
+    def _create_vendor_from_transaction(self, transaction: Transaction) -> Optional[Vendor]:
+        """Create a new vendor based on transaction description/counterparty."""
+        vendor_name = self._vendor_name_for_transaction(transaction)
             
         if not vendor_name:
             return None
@@ -287,88 +385,11 @@ class VendorIdentificationService:
             
     def _extract_vendor_name_from_description(self, description: str) -> Optional[str]:
         """Extract vendor name from transaction description."""
-        # Common patterns for vendor names in transaction descriptions
-        
-        # Remove common prefixes/suffixes
-        cleaned = description.strip()
-        
-        # Remove common transaction codes and patterns
-        patterns_to_remove = [
-            r'\b\d{4}\*+\d{4}\b',  # Card numbers like 1234****5678
-            r'\b\d{2}/\d{2}\b',    # Dates like 12/25
-            r'\bPOS\b',            # Point of sale
-            r'\bEFTPOS\b',         # EFTPOS
-            r'\bVISA\b',           # VISA
-            r'\bMC\b',             # MasterCard
-            r'\bMASTERCARD\b',     # MasterCard
-            r'\bAU\b',             # Australia
-            r'\b[A-Z]{2,3}\d+\b',  # Transaction codes
-        ]
-        
-        for pattern in patterns_to_remove:
-            cleaned = re.sub(pattern, '', cleaned, flags=re.IGNORECASE)
-            
-        # Split by common delimiters and take the first meaningful part
-        delimiters = [' - ', ' / ', ' \\ ', '  ', ' * ', ' # ']
-        for delimiter in delimiters:
-            if delimiter in cleaned:
-                parts = cleaned.split(delimiter)
-                for part in parts:
-                    part = part.strip()
-                    if len(part) > 2 and not part.isdigit():
-                        return self._clean_vendor_name(part)
-                        
-        # If no delimiters, clean the whole description
-        return self._clean_vendor_name(cleaned)
+        return extract_vendor_name(description)
         
     def _clean_vendor_name(self, name: str) -> Optional[str]:
         """Clean and validate vendor name."""
-        if not name:
-            return None
-            
-        # Remove extra whitespace
-        cleaned = ' '.join(name.split())
-        
-        # Remove common suffixes
-        suffixes_to_remove = [
-            'PTY LTD',
-            'LIMITED',
-            'LTD',
-            'AUSTRALIA',
-            'AU',
-            'STORE',
-            'SHOP',
-        ]
-        
-        for suffix in suffixes_to_remove:
-            if cleaned.upper().endswith(' ' + suffix):
-                cleaned = cleaned[:-len(suffix)-1].strip()
-                
-        # Validate length and content
-        if len(cleaned) < 2 or len(cleaned) > 100:
-            return None
-            
-        # Don't create vendors for generic terms
-        generic_terms = [
-            'PAYMENT',
-            'TRANSFER',
-            'WITHDRAWAL',
-            'DEPOSIT',
-            'CREDIT',
-            'DEBIT',
-            'REFUND',
-            'CASH',
-            'ATM',
-            'BANK',
-            'TRANSACTION',
-            'PURCHASE',
-            'SALE',
-        ]
-        
-        if cleaned.upper() in generic_terms:
-            return None
-            
-        return cleaned
+        return clean_vendor_name(name)
 
 
 def identify_vendors_for_user_transactions(user, transactions: QuerySet = None) -> VendorIdentificationResult:
@@ -0,0 +1,174 @@
+"""
+Multi-pattern vendor matcher for FundFlow transactions.
+
+Builds an Aho-Corasick automaton over every lowercased vendor name, display name
+and description pattern of a user, so that each transaction description is
+scanned once instead of being compared against every vendor in turn.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Count, Max
+
+from .models import Vendor
+
+logger = logging.getLogger(__name__)
+
+# Users whose matcher is kept in memory by each process
+VENDOR_MATCHER_CACHE_USERS = int(os.getenv('VENDOR_MATCHER_CACHE_USERS', '128'))
+
+_NO_MATCH = float('inf')
+
+
+class VendorMatcher:
+    """
+    Aho-Corasick automaton mapping vendor patterns to vendors.
+
+    Vendors are ranked by the order they are given in (rank 0 wins), which mirrors
+    the newest-first iteration previously used by the vendor identification service.
+    """
+
+    def __init__(self, vendors: Iterable[Vendor]):
+        self.vendors: List[Vendor] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[float] = [_NO_MATCH]
+        # A vendor with an empty name matches every description (substring semantics)
+        self._always_rank = _NO_MATCH
+
+        for rank, vendor in enumerate(vendors):
+            self.vendors.append(vendor)
+            for pattern in self._patterns_for_vendor(vendor):
+                if pattern:
+                    self._add_pattern(pattern, rank)
+                elif rank < self._always_rank:
+                    self._always_rank = rank
+
+        self._build_failure_links()
+
+    @property
+    def pattern_state_count(self) -> int:
+        return len(self._goto)
+
+    @staticmethod
+    def _patterns_for_vendor(vendor: Vendor) -> List[str]:
+        """Return the lowercased patterns that identify a vendor."""
+        patterns = [(vendor.name or '').lower()]
+        if vendor.display_name:
+            patterns.append(vendor.display_name.lower())
+        if vendor.description_patterns:
+            for pattern in vendor.description_patterns:
+                if isinstance(pattern, str) and pattern:
+                    patterns.append(pattern.lower())
+        return patterns
+
+    def _add_pattern(self, pattern: str, rank: int) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(_NO_MATCH)
+                self._goto[state][char] = next_state
+            state = next_state
+        if rank < self._best[state]:
+            self._best[state] = rank
+
+    def _build_failure_links(self) -> None:
+        goto, fail, best = self._goto, self._fail, self._best
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                # Propagate the best (lowest) rank reachable through the suffix chain
+                if best[fail[next_state]] < best[next_state]:
+                    best[next_state] = best[fail[next_state]]
+
+    def _best_rank(self, text: str, best_rank: float) -> float:
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best[state] < best_rank:
+                best_rank = best[state]
+                if best_rank == 0:
+                    break
+        return best_rank
+
+    def match(self, *texts: str) -> Optional[Vendor]:
+        """
+        Return the highest-priority vendor whose patterns occur in any of the texts.
+        Texts are matched case-insensitively.
+        """
+        best_rank = self._always_rank
+        for text in texts:
+            if best_rank == 0:
+                break
+            if text:
+                best_rank = self._best_rank(text.lower(), best_rank)
+        if best_rank == _NO_MATCH:
+            return None
+        return self.vendors[int(best_rank)]
+
+
+# --- Per-user matcher cache ---
+# Keyed by user id; each entry stores the vendor stamp it was built from so that
+# writes made by other processes (or bulk operations that bypass signals) are detected.
+# Least recently used first; only VENDOR_MATCHER_CACHE_USERS users are kept.
+_matcher_cache: 'OrderedDict[int, Tuple[tuple, VendorMatcher]]' = OrderedDict()
+_matcher_cache_lock = threading.Lock()
+
+
+def _vendor_stamp(user_id: int) -> tuple:
+    stamp = Vendor.objects.filter(user_id=user_id).aggregate(
+        count=Count('id'), latest=Max('updated_at'), max_id=Max('id')
+    )
+    return (stamp['count'], stamp['latest'], stamp['max_id'])
+
+
+def get_applicable_vendors(user_id: int):
+    """Vendors considered for identification, newest first."""
+    return Vendor.objects.filter(user_id=user_id).order_by('-created_at', '-id')
+
+
+def get_vendor_matcher(user) -> VendorMatcher:
+    """Return the cached matcher for a user, rebuilding it if their vendors changed."""
+    user_id = getattr(user, 'pk', user)
+    stamp = _vendor_stamp(user_id)
+
+    with _matcher_cache_lock:
+        cached = _matcher_cache.get(user_id)
+        if cached and cached[0] == stamp:
+            _matcher_cache.move_to_end(user_id)
+            return cached[1]
+
+    matcher = VendorMatcher(get_applicable_vendors(user_id))
+    logger.debug(f"User {user_id}: Built vendor matcher for {len(matcher.vendors)} vendors "
+                 f"({matcher.pattern_state_count} automaton states)")
+
+    with _matcher_cache_lock:
+        _matcher_cache[user_id] = (stamp, matcher)
+        _matcher_cache.move_to_end(user_id)
+        while len(_matcher_cache) > VENDOR_MATCHER_CACHE_USERS:
+            _matcher_cache.popitem(last=False)
+    return matcher
+
+
+def invalidate_vendor_matcher(user_id: int) -> None:
+    """Drop the cached matcher for a user."""
+    with _matcher_cache_lock:
+        _matcher_cache.pop(user_id, None)
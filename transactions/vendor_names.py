@@ -0,0 +1,121 @@
+"""
+Vendor name normalization for FundFlow transactions.
+
+Single home for the heuristics that turn raw transaction descriptions into vendor
+names. Used by the CSV upload, the Up Bank sync, manual transaction creation and
+vendor identification. Patterns are compiled once at import time and results are
+memoized per raw description, since bank exports repeat the same descriptions heavily.
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional
+
+# Bounded memo size (entries); each entry is one raw description string
+VENDOR_NAME_CACHE_SIZE = 65536
+
+# Transaction codes and noise removed before extracting a vendor name:
+# card numbers (1234****5678), dates (12/25), POS/EFTPOS/card scheme markers,
+# the AU country marker and alphanumeric transaction codes (AB1234).
+_NOISE_RE = re.compile(
+    r'\b\d{4}\*+\d{4}\b'
+    r'|\b\d{2}/\d{2}\b'
+    r'|\b(?:POS|EFTPOS|VISA|MC|MASTERCARD|AU)\b'
+    r'|\b[A-Z]{2,3}\d+\b',
+    re.IGNORECASE
+)
+
+# Delimiters tried in order; the first meaningful part before/after them is the vendor
+_DELIMITERS = (' - ', ' / ', ' \\ ', '  ', ' * ', ' # ')
+
+# Company/location suffixes stripped from the end of vendor names, in order
+_SUFFIXES = tuple(
+    (' ' + suffix, len(suffix) + 1)
+    for suffix in ('PTY LTD', 'LIMITED', 'LTD', 'AUSTRALIA', 'AU', 'STORE', 'SHOP')
+)
+# Last words of the suffixes above, used to skip the suffix loop for most names
+_SUFFIX_LAST_WORDS = frozenset(suffix.rsplit(' ', 1)[-1] for suffix, _ in _SUFFIXES)
+
+# Terms that are too generic to become vendors
+_GENERIC_TERMS = frozenset({
+    'PAYMENT', 'TRANSFER', 'WITHDRAWAL', 'DEPOSIT', 'CREDIT', 'DEBIT', 'REFUND',
+    'CASH', 'ATM', 'BANK', 'TRANSACTION', 'PURCHASE', 'SALE',
+})
+
+
+def clean_vendor_name(name: str) -> Optional[str]:
+    """Clean and validate a vendor name. Returns None for unusable names."""
+    if not name:
+        return None
+
+    # Remove extra whitespace
+    cleaned = ' '.join(name.split())
+
+    # Remove common suffixes (only when the last word could be one)
+    if cleaned.rsplit(' ', 1)[-1].upper() in _SUFFIX_LAST_WORDS:
+        for suffix, length in _SUFFIXES:
+            if cleaned.upper().endswith(suffix):
+                cleaned = cleaned[:-length].strip()
+
+    # Validate length and content
+    if len(cleaned) < 2 or len(cleaned) > 100:
+        return None
+
+    # Don't create vendors for generic terms
+    if cleaned.upper() in _GENERIC_TERMS:
+        return None
+
+    return cleaned
+
+
+@lru_cache(maxsize=VENDOR_NAME_CACHE_SIZE)
+def extract_vendor_name(description: str) -> Optional[str]:
+    """
+    Extract a vendor name from a raw transaction description.
+
+    Strips card numbers, dates and transaction codes, takes the first meaningful
+    part between common delimiters and cleans it. Memoized per raw description.
+    """
+    cleaned = _NOISE_RE.sub('', description.strip())
+
+    # Split by common delimiters and take the first meaningful part
+    for delimiter in _DELIMITERS:
+        if delimiter in cleaned:
+            for part in cleaned.split(delimiter):
+                part = part.strip()
+                if len(part) > 2 and not part.isdigit():
+                    return clean_vendor_name(part)
+
+    # If no delimiters, clean the whole description
+    return clean_vendor_name(cleaned)
+
+
+@lru_cache(maxsize=VENDOR_NAME_CACHE_SIZE)
+def leading_segment(description: str, split_on_colon: bool = False) -> str:
+    """
+    Return the leading segment of a description, e.g. 'Coles' for 'Coles - Sydney':
+    the text before ' - ', then before ' | ' (and ':' when split_on_colon is set),
+    stripped. Memoized per raw description.
+    """
+    segment = description.split(' - ', 1)[0].split(' | ', 1)[0]
+    if split_on_colon:
+        segment = segment.split(':', 1)[0]
+    return segment.strip()
+
+
+def extract_original_vendor_name(description: str, counterparty: str = '', default: str = 'Unknown Vendor',
+                                 split_on_colon: bool = False) -> str:
+    """
+    Vendor name as it appears in the source data: the counterparty when present,
+    otherwise the leading segment of the description, otherwise `default`.
+    """
+    name = counterparty.strip() if counterparty else ''
+    if not name and description:
+        name = leading_segment(description, split_on_colon)
+    return name or default
+
+
+def clear_vendor_name_caches() -> None:
+    """Clear the memoized extraction results (used by benchmarks and tests)."""
+    extract_vendor_name.cache_clear()
+    leading_segment.cache_clear()
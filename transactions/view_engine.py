@@ -0,0 +1,307 @@
+"""
+Materialized membership of custom views (CustomView): which of a user's transactions
+match a view's search_criteria, and the view's transaction count and AUD totals.
+
+search_criteria is compiled once into a ViewPlan, cached per distinct criteria, which
+both filters a queryset (to build a view's membership in one query) and tests a single
+transaction in memory. Membership rows (CustomViewMembership) record what each member
+contributed to the totals stored on the view, so inserting, editing or deleting a
+transaction adjusts the membership and totals by the difference without running any
+view's criteria against the database. Opening a view is then a join on the membership
+table, and reading its totals a single-row read, however complex its criteria are.
+
+Transaction saves and deletes are applied by the signal handlers in signals.py. Bulk
+inserts and updates, which send no signals, call sync_custom_view_membership() with the
+rows they wrote; writes that change many transactions at once (e.g. deleting a category
+or vendor) call invalidate_custom_view_membership() instead. A view's membership is
+built on first use and rebuilt when its criteria change.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+from django.db import transaction as db_transaction
+from django.db.models import F, Q
+
+from .models import CustomView, CustomViewMembership, Transaction
+
+logger = logging.getLogger(__name__)
+
+# Distinct search criteria whose compiled plans are kept per process
+VIEW_PLAN_CACHE_SIZE = int(os.getenv('VIEW_PLAN_CACHE_SIZE', '256'))
+# Membership rows inserted per query when building a view
+VIEW_MEMBERSHIP_BATCH_SIZE = int(os.getenv('VIEW_MEMBERSHIP_BATCH_SIZE', '1000'))
+
+# Transaction fields a ViewPlan matches on and a membership's totals are taken from;
+# saves that change none of them leave every view's membership as it is
+VIEW_TRANSACTION_FIELDS = (
+    'transaction_date', 'original_amount', 'vendor_id', 'category_id', 'direction', 'description', 'aud_amount',
+)
+
+ZERO = Decimal('0.00')
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_amount(value):
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+    # NaN and infinities can't bound an amount (comparing with sNaN raises), so are ignored
+    return amount if amount.is_finite() else None
+
+
+def _parse_ids(values):
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return frozenset(ids)
+
+
+class ViewPlan:
+    """
+    A view's search_criteria compiled into a Q for the database and a predicate for
+    single transactions, which agree on which transactions match. Malformed criteria
+    values are ignored, as get_matching_transactions() always did.
+    """
+
+    def __init__(self, criteria: Optional[Dict]):
+        criteria = criteria or {}
+        self.matches_nothing = not criteria
+        self.date_from = _parse_date(criteria.get('date_from')) if criteria.get('date_from') else None
+        self.date_to = _parse_date(criteria.get('date_to')) if criteria.get('date_to') else None
+        self.amount_min = _parse_amount(criteria.get('amount_min')) if criteria.get('amount_min') else None
+        self.amount_max = _parse_amount(criteria.get('amount_max')) if criteria.get('amount_max') else None
+        vendor_ids, category_ids = criteria.get('vendor_ids'), criteria.get('category_ids')
+        self.vendor_ids = _parse_ids(vendor_ids) if vendor_ids and isinstance(vendor_ids, list) else None
+        self.category_ids = _parse_ids(category_ids) if category_ids and isinstance(category_ids, list) else None
+        self.direction = criteria.get('direction') or None
+        self.description_contains = criteria.get('description_contains') or None
+        # Compared like icontains on PostgreSQL, which upper-cases both sides
+        self._description_upper = self.description_contains.upper() if self.description_contains else None
+
+        q = Q()
+        if self.date_from is not None:
+            q &= Q(transaction_date__gte=self.date_from)
+        if self.date_to is not None:
+            q &= Q(transaction_date__lte=self.date_to)
+        if self.amount_min is not None:
+            q &= Q(original_amount__gte=self.amount_min)
+        if self.amount_max is not None:
+            q &= Q(original_amount__lte=self.amount_max)
+        if self.vendor_ids is not None:
+            q &= Q(vendor_id__in=self.vendor_ids)
+        if self.category_ids is not None:
+            q &= Q(category_id__in=self.category_ids)
+        if self.direction:
+            q &= Q(direction=self.direction)
+        if self.description_contains:
+            q &= Q(description__icontains=self.description_contains)
+        self.q = q
+
+    def filter(self, queryset):
+        """Narrow a transaction queryset to the matching transactions."""
+        if self.matches_nothing:
+            return queryset.none()
+        if self.description_contains:
+            from .search import search_transactions
+            # The search index narrows the candidates; icontains in q keeps the phrase semantics
+            queryset = search_transactions(queryset, self.description_contains)
+        return queryset.filter(self.q)
+
+    def matches(self, transaction: Transaction) -> bool:
+        """Whether a single transaction matches, without querying the database."""
+        if self.matches_nothing:
+            return False
+        transaction_date = _field_value(transaction, 'transaction_date')
+        if self.date_from is not None and (transaction_date is None or transaction_date < self.date_from):
+            return False
+        if self.date_to is not None and (transaction_date is None or transaction_date > self.date_to):
+            return False
+        original_amount = _field_value(transaction, 'original_amount')
+        if self.amount_min is not None and (original_amount is None or original_amount < self.amount_min):
+            return False
+        if self.amount_max is not None and (original_amount is None or original_amount > self.amount_max):
+            return False
+        if self.vendor_ids is not None and transaction.vendor_id not in self.vendor_ids:
+            return False
+        if self.category_ids is not None and transaction.category_id not in self.category_ids:
+            return False
+        if self.direction and transaction.direction != self.direction:
+            return False
+        if self._description_upper and self._description_upper not in (transaction.description or '').upper():
+            return False
+        return True
+
+
+def _field_value(transaction: Transaction, name: str):
+    # Instances saved with string values (e.g. '2024-05-01') keep them until reloaded
+    return Transaction._meta.get_field(name).to_python(getattr(transaction, name))
+
+
+def _criteria_key(criteria) -> str:
+    return json.dumps(criteria or {}, sort_keys=True, default=str)
+
+
+@lru_cache(maxsize=VIEW_PLAN_CACHE_SIZE)
+def _compile(criteria_key: str) -> ViewPlan:
+    return ViewPlan(json.loads(criteria_key))
+
+
+def compile_criteria(criteria) -> ViewPlan:
+    """The compiled plan of a view's search_criteria, compiled once per distinct criteria."""
+    return _compile(_criteria_key(criteria))
+
+
+def criteria_fingerprint(criteria) -> str:
+    """Identifies the criteria a view's membership was built for."""
+    return hashlib.sha1(_criteria_key(criteria).encode('utf-8')).hexdigest()
+
+
+def _contribution(transaction: Transaction):
+    return transaction.direction, _field_value(transaction, 'aud_amount') or ZERO
+
+
+def _add_to_totals(totals: Dict[str, object], direction: str, aud_amount: Decimal, sign: int) -> None:
+    totals['transaction_count'] += sign
+    totals['total_debit' if direction == 'DEBIT' else 'total_credit'] += sign * aud_amount
+
+
+def build_custom_view_membership(view: CustomView) -> int:
+    """(Re)build a view's membership and totals from its criteria. Returns the member count."""
+    fingerprint = criteria_fingerprint(view.search_criteria)
+    plan = compile_criteria(view.search_criteria)
+    totals = {'transaction_count': 0, 'total_debit': ZERO, 'total_credit': ZERO}
+    with db_transaction.atomic():
+        CustomViewMembership.objects.filter(custom_view=view).delete()
+        rows = plan.filter(Transaction.objects.filter(user_id=view.user_id)).values_list('pk', 'direction', 'aud_amount')
+        batch = []
+        for transaction_id, direction, aud_amount in rows.iterator(chunk_size=VIEW_MEMBERSHIP_BATCH_SIZE):
+            aud_amount = aud_amount or ZERO
+            batch.append(CustomViewMembership(
+                custom_view_id=view.pk, transaction_id=transaction_id, direction=direction, aud_amount=aud_amount,
+            ))
+            _add_to_totals(totals, direction, aud_amount, 1)
+            if len(batch) >= VIEW_MEMBERSHIP_BATCH_SIZE:
+                CustomViewMembership.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            CustomViewMembership.objects.bulk_create(batch)
+        CustomView.objects.filter(pk=view.pk).update(membership_fingerprint=fingerprint, **totals)
+
+    view.membership_fingerprint = fingerprint
+    for field, value in totals.items():
+        setattr(view, field, value)
+    logger.info(f"User {view.user_id}: Built membership of custom view {view.pk} with {totals['transaction_count']} transactions")
+    return totals['transaction_count']
+
+
+def _ensure_built(view: CustomView) -> Dict[str, object]:
+    """The view's stored membership state, after building the membership if it is stale."""
+    # Read from the database: the membership may have been invalidated since the view was loaded
+    state = CustomView.objects.filter(pk=view.pk).values(
+        'membership_fingerprint', 'transaction_count', 'total_debit', 'total_credit'
+    ).first()
+    if state is None or state['membership_fingerprint'] != criteria_fingerprint(view.search_criteria):
+        build_custom_view_membership(view)
+        state = {
+            field: getattr(view, field)
+            for field in ('membership_fingerprint', 'transaction_count', 'total_debit', 'total_credit')
+        }
+    return state
+
+
+def get_custom_view_membership(view: CustomView):
+    """Queryset of the view's transactions, served from its materialized membership."""
+    _ensure_built(view)
+    return Transaction.objects.filter(custom_view_memberships__custom_view_id=view.pk)
+
+
+def get_custom_view_totals(view: CustomView) -> Dict[str, object]:
+    """The view's precomputed transaction count and AUD debit and credit totals."""
+    state = _ensure_built(view)
+    return {field: state[field] for field in ('transaction_count', 'total_debit', 'total_credit')}
+
+
+def sync_custom_view_membership(user_id: int, transactions: Iterable[Transaction], removed: bool = False) -> None:
+    """
+    Apply inserted or edited transactions of a user (removed=True: deleted ones) to the
+    membership and totals of the user's views whose membership is current. Views that
+    are stale are skipped; they are rebuilt on their next use.
+    """
+    views = [
+        view for view in CustomView.objects.filter(user_id=user_id).exclude(membership_fingerprint='')
+        .only('id', 'search_criteria', 'membership_fingerprint')
+        if view.membership_fingerprint == criteria_fingerprint(view.search_criteria)
+    ]
+    if not views:
+        return
+    transactions = [transaction for transaction in transactions if transaction.pk is not None]
+    if not transactions:
+        return
+
+    existing = {
+        (member.custom_view_id, member.transaction_id): member
+        for member in CustomViewMembership.objects.filter(
+            custom_view__in=views, transaction_id__in=[transaction.pk for transaction in transactions]
+        )
+    }
+    to_create, to_update, to_delete = [], [], []
+    deltas = defaultdict(lambda: {'transaction_count': 0, 'total_debit': ZERO, 'total_credit': ZERO})
+    for view in views:
+        plan = compile_criteria(view.search_criteria)
+        for transaction in transactions:
+            member = existing.get((view.pk, transaction.pk))
+            if not removed and plan.matches(transaction):
+                direction, aud_amount = _contribution(transaction)
+                if member is None:
+                    to_create.append(CustomViewMembership(
+                        custom_view_id=view.pk, transaction_id=transaction.pk, direction=direction, aud_amount=aud_amount,
+                    ))
+                elif (member.direction, member.aud_amount) != (direction, aud_amount):
+                    _add_to_totals(deltas[view.pk], member.direction, member.aud_amount, -1)
+                    member.direction, member.aud_amount = direction, aud_amount
+                    to_update.append(member)
+                else:
+                    continue
+                _add_to_totals(deltas[view.pk], direction, aud_amount, 1)
+            elif member is not None:
+                to_delete.append(member.pk)
+                _add_to_totals(deltas[view.pk], member.direction, member.aud_amount, -1)
+
+    if not deltas:
+        return
+    with db_transaction.atomic():
+        if to_create:
+            CustomViewMembership.objects.bulk_create(to_create, batch_size=VIEW_MEMBERSHIP_BATCH_SIZE)
+        if to_update:
+            CustomViewMembership.objects.bulk_update(to_update, ['direction', 'aud_amount'], batch_size=VIEW_MEMBERSHIP_BATCH_SIZE)
+        if to_delete:
+            CustomViewMembership.objects.filter(pk__in=to_delete).delete()
+        for view_id, delta in deltas.items():
+            CustomView.objects.filter(pk=view_id).update(**{field: F(field) + value for field, value in delta.items()})
+    logger.debug(f"User {user_id}: Applied {len(transactions)} transactions to {len(deltas)} custom views")
+
+
+def invalidate_custom_view_membership(user_id: Optional[int]) -> None:
+    """Mark a user's views (every user's, for None) for rebuilding on their next use."""
+    views = CustomView.objects.exclude(membership_fingerprint='')
+    if user_id is not None:
+        views = views.filter(user_id=user_id)
+    views.update(membership_fingerprint='')
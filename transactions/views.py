@@ -10,31 +10,36 @@ from rest_framework.views import APIView # Use APIView for custom logic
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser # For file uploads
 from rest_framework.response import Response
 from django.db.models import Q
-from .models import Category, Transaction, Vendor, VendorRule, VendorMapping, DescriptionMapping, BASE_CURRENCY_FOR_CONVERSION, HistoricalExchangeRate # Import Transaction model
-from .serializers import CategorySerializer, TransactionSerializer, TransactionUpdateSerializer, VendorSerializer, VendorRuleSerializer, VendorMappingSerializer, TransactionCreateSerializer # Add TransactionCreateSerializer
+from .models import Category, Transaction, Vendor, VendorRule, VendorMapping, DescriptionMapping, BASE_CURRENCY_FOR_CONVERSION, HistoricalExchangeRate, ImportJob # Import Transaction model
+from .serializers import CategorySerializer, TransactionSerializer, TransactionUpdateSerializer, VendorSerializer, VendorRuleSerializer, VendorMappingSerializer, TransactionCreateSerializer, ImportJobSerializer, serialize_transaction_rows, transaction_list_values # Add TransactionCreateSerializer
 from .permissions import IsOwnerOrSystemReadOnly, IsOwner # Import IsOwner
 import logging
 from django.db.models import Count, Min, Sum, Case, When, Value, DecimalField
+from django.db.models.functions import Abs
 from django.shortcuts import get_object_or_404 # Useful for getting the Category
+from django.urls import reverse
 from transactions import serializers # Added logging
 from django.db.models import Max # Import Max for aggregation
 from rest_framework.parsers import JSONParser
 from integrations.services import get_historical_exchange_rate
 from .services import get_historical_rate, get_current_exchange_rate # Import our new rate service
 from django_filters import rest_framework as filters # Import for filtering
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.filters import OrderingFilter
 from collections import defaultdict
 from django.utils import timezone as django_timezone
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
+from .csv_import import CSVImportError, CSVTransactionImporter, get_expected_headers
+from .export import EXPORT_FORMATS, iter_serialized_chunks
+from .fieldsets import SparseFieldsetViewMixin, parse_fieldset
+from .import_jobs import enqueue_csv_import
+from .pagination import StandardResultsSetPagination, TransactionListPagination
+from .category_tree import get_category_tree, get_category_tree_version, rollup_to_depth
+from .search import search_transactions
+from .typeahead import CATEGORY, VENDOR_SUGGESTIONS, get_typeahead_index
 
 logger = logging.getLogger(__name__)
 
-# --- Standard Pagination ---
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 25
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
 # --- Transaction Filters ---
 class TransactionFilter(filters.FilterSet):
     start_date = filters.DateFilter(field_name="transaction_date", lookup_expr='gte')
@@ -50,21 +55,27 @@ class TransactionFilter(filters.FilterSet):
     # Search filters for dashboard search bar
     vendor__name__icontains = filters.CharFilter(field_name="vendor__name", lookup_expr='icontains')
     category__name__icontains = filters.CharFilter(field_name="category__name", lookup_expr='icontains')
+    # Indexed full-text search over descriptions, vendor names and notes
+    search = filters.CharFilter(method='filter_search')
+
+    def filter_search(self, queryset, name, value):
+        return search_transactions(queryset, value)
 
     class Meta:
         model = Transaction
         fields = ['start_date', 'end_date', 'category', 'is_categorized', 'original_currency', 
-                 'vendor__name__icontains', 'category__name__icontains']
+                 'vendor__name__icontains', 'category__name__icontains', 'search']
 
 # --- Transaction List View ---
 class TransactionListView(generics.ListAPIView):
     """
     API endpoint to list transactions for the authenticated user.
-    Supports filtering, sorting, and pagination.
+    Supports filtering, sorting, and pagination (page numbers, or keyset with ?pagination=cursor),
+    and sparse fieldsets with ?fields= / ?omit=.
     """
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = StandardResultsSetPagination # Use standard pagination
+    pagination_class = TransactionListPagination
     filter_backends = [filters.DjangoFilterBackend, OrderingFilter] # Add OrderingFilter
     filterset_class = TransactionFilter 
     ordering_fields = ['transaction_date', 'description', 'original_amount', 'aud_amount', 'last_modified']
@@ -75,8 +86,66 @@ class TransactionListView(generics.ListAPIView):
         This view should return a list of all transactions
         owned by the currently authenticated user.
         """
+        return Transaction.objects.filter(user=self.request.user).select_related('category')
+
+    def list(self, request, *args, **kwargs):
+        """
+        Read-optimized listing: only the serialized columns are fetched, as values() rows
+        with the category name joined in, and turned into the same JSON as
+        TransactionSerializer without instantiating models or serializer fields.
+        """
+        fields = parse_fieldset(request.query_params, TransactionSerializer.Meta.fields)
+        rows = transaction_list_values(self.filter_queryset(self.get_queryset()), fields)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serialize_transaction_rows(page, fields))
+        return Response(serialize_transaction_rows(rows, fields))
+
+# --- Transaction Export View ---
+class TransactionExportView(generics.GenericAPIView):
+    """
+    API endpoint streaming every transaction of the authenticated user that matches
+    the TransactionFilter query parameters, as a file download.
+    ?export_format= is csv, ndjson or columnar (see transactions/export.py); without it
+    the first of those the Accept header lists, and csv otherwise.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [filters.DjangoFilterBackend]
+    filterset_class = TransactionFilter
+    format_query_param = 'export_format'
+
+    def get_queryset(self):
         return Transaction.objects.filter(user=self.request.user)
 
+    def perform_content_negotiation(self, request, force=False):
+        # The file is streamed whatever Accept lists (e.g. text/csv); the renderers only
+        # format error responses, so a request is never refused with a 406
+        return super().perform_content_negotiation(request, force=True)
+
+    def _accepted_export_format(self, request):
+        accepted = [media_range.split(';')[0].strip().lower() for media_range in request.META.get('HTTP_ACCEPT', '').split(',')]
+        for media_type in accepted:
+            for export_format, (_, content_type, _) in EXPORT_FORMATS.items():
+                if content_type.split(';')[0] == media_type:
+                    return export_format
+        return 'csv'
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get(self.format_query_param) or self._accepted_export_format(request)
+        export_format = export_format.lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"Unsupported export format '{export_format}'. Choose one of: {', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        write_export, content_type, extension = EXPORT_FORMATS[export_format]
+        queryset = self.filter_queryset(self.get_queryset())
+
+        response = StreamingHttpResponse(write_export(iter_serialized_chunks(queryset)), content_type=content_type)
+        filename = f"transactions-{django_timezone.localdate().isoformat()}.{extension}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
 # --- Transaction Update View ---
 class TransactionUpdateView(generics.RetrieveUpdateAPIView):
     """
@@ -653,28 +722,28 @@ class HiddenTransactionGroupView(APIView):
         logger.info(f"Found {len(sorted_groups)} groups of hidden transactions for user {user.id}, sorted by most recent.")
         return Response(sorted_groups, status=status.HTTP_200_OK)
     
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """
     API endpoint to list accessible categories (System + User's Own)
     and create new custom categories for the authenticated user.
     It now also includes 'vendor' nodes derived from DescriptionMappings.
+    CategoryTreeView serves the whole forest in one response.
     """
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = StandardResultsSetPagination # Added pagination
+    fieldset_columns = {'is_custom': ('user',)}
 
     def get_queryset(self):
         """
         This view should return a list of all system categories
         plus categories owned by the currently authenticated user.
-        Prefetch related description mappings for efficiency when constructing vendor nodes.
         """
         user = self.request.user
         # Use Q objects for OR condition: user is None OR user is the current user
-        # Prefetch description mappings assigned to these categories
         return Category.objects.filter(
             Q(user__isnull=True) | Q(user=user)
-        ).distinct().prefetch_related('mapped_descriptions')
+        ).distinct()
 
     def list(self, request, *args, **kwargs):
         """
@@ -706,6 +775,7 @@ class CategoryListCreateView(generics.ListCreateAPIView):
                     'is_custom': True,
                     'vendor_id': vendor.id,  # Include actual vendor ID for operations
                 })
+            vendor_nodes = self._apply_fieldset_to_vendor_nodes(vendor_nodes)
             
             # Combine categories and vendor nodes for this page
             combined_data_for_this_page = categories_data + vendor_nodes
@@ -733,9 +803,18 @@ class CategoryListCreateView(generics.ListCreateAPIView):
                 'is_custom': True,
                 'vendor_id': vendor.id,
             })
+        vendor_nodes = self._apply_fieldset_to_vendor_nodes(vendor_nodes)
         combined_data = categories_data + vendor_nodes
         return Response(combined_data)
 
+    def _apply_fieldset_to_vendor_nodes(self, vendor_nodes):
+        """Vendor nodes keep their 'type' and 'vendor_id' keys plus the fields selected for categories."""
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return vendor_nodes
+        keep = set(fieldset) | {'type', 'vendor_id'}
+        return [{key: value for key, value in node.items() if key in keep} for node in vendor_nodes]
+
     def perform_create(self, serializer):
         """
         Automatically set the user field to the logged-in user
@@ -754,7 +833,27 @@ class CategoryListCreateView(generics.ListCreateAPIView):
         """Pass request to serializer context for validation."""
         return {'request': self.request}
 
-class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryTreeView(APIView):
+    """
+    API endpoint returning the authenticated user's whole category forest (system +
+    own categories, nested through 'children', with their assigned vendors as leaves).
+    Cached per user and revalidated with ETag / If-None-Match.
+
+    GET /api/categories/tree/
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        version = get_category_tree_version(request.user)
+        etag = quote_etag(f"{version[0]}-{version[1]}")
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        # Weak comparison: compressed responses carry the ETag weakened (W/"...")
+        client_etags = {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}
+        if etag in client_etags or '*' in client_etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(get_category_tree(request.user, version), headers=headers)
+
+class CategoryDetailView(SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API endpoint to retrieve, update, or delete a specific category.
     Permissions ensure users can only modify their own custom categories.
@@ -763,6 +862,7 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     # Apply custom permission AFTER ensuring user is authenticated
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrSystemReadOnly]
     lookup_field = 'pk' # Default, explicit is fine
+    fieldset_columns = {'is_custom': ('user',)}
 
     def get_queryset(self):
         user = self.request.user
@@ -830,36 +930,18 @@ class CategoryNamesSearchView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = None  # Disable pagination for autocomplete
 
-    def get_queryset(self):
-        """
-        Return categories accessible to the user (system + their own)
-        filtered by search query.
-        """
-        user = self.request.user
-        search_query = self.request.query_params.get('q', '')
-        
-        if not search_query or len(search_query.strip()) < 1:
-            return Category.objects.none()
-        
-        # Search in both system categories and user's categories
-        queryset = Category.objects.filter(
-            Q(user__isnull=True) | Q(user=user)
-        ).filter(
-            name__icontains=search_query.strip()
-        ).distinct()
-        
-        return queryset
-
     def list(self, request, *args, **kwargs):
         """
-        Return a simple list of category names for autocomplete.
+        Return a simple list of category names (system + the user's own) for
+        autocomplete, best matches first, from the user's typeahead index.
         """
-        queryset = self.get_queryset()
-        category_names = list(queryset.values_list('name', flat=True).order_by('name'))
-        return Response(category_names)
+        search_query = request.query_params.get('q', '').strip()
+        if not search_query:
+            return Response([])
+        return Response(get_typeahead_index(request.user).search(search_query, CATEGORY))
 
 # --- Vendor Views ---
-class VendorListCreateView(generics.ListCreateAPIView):
+class VendorListCreateView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """
     API endpoint to list accessible vendors (System + User's Own)
     and create new custom vendors for the authenticated user.
@@ -900,7 +982,7 @@ class VendorListCreateView(generics.ListCreateAPIView):
         """Pass request to serializer context for validation."""
         return {'request': self.request}
 
-class VendorDetailView(generics.RetrieveUpdateDestroyAPIView):
+class VendorDetailView(SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API endpoint to retrieve, update, or delete a specific vendor.
     Permissions ensure users can only modify their own custom vendors.
@@ -973,7 +1055,8 @@ class VendorDetailView(generics.RetrieveUpdateDestroyAPIView):
 class VendorNamesSearchView(APIView):
     """
     API endpoint to search for vendor names for autocomplete functionality.
-    Returns only vendor names, not full vendor objects, for better performance.
+    Returns only vendor names, not full vendor objects, for better performance,
+    best matches first (see transactions/typeahead.py).
     
     GET /api/vendors/search_names/?q=search_term
     """
@@ -984,43 +1067,10 @@ class VendorNamesSearchView(APIView):
         if not search_query:
             return Response([], status=status.HTTP_200_OK)
 
-        user = request.user
-        
-        # Get vendor names from multiple sources:
-        # 1. Vendor objects, 2. VendorMapping mapped_vendor values, 3. Transaction descriptions
-        
-        # 1. Get names from Vendor objects (system + user's own)
-        vendor_names = set(
-            Vendor.objects.filter(
-                Q(user__isnull=True) | Q(user=user)
-            ).filter(
-                name__icontains=search_query
-            ).values_list('name', flat=True)
-        )
-        
-        # 2. Get mapped vendor names from VendorMapping (user's own mappings)
-        mapped_vendor_names = set(
-            VendorMapping.objects.filter(
-                user=user
-            ).filter(
-                mapped_vendor__icontains=search_query
-            ).values_list('mapped_vendor', flat=True)
-        )
-        
-        # 3. Get unique transaction descriptions that match (user's own transactions)
-        transaction_descriptions = set(
-            Transaction.objects.filter(
-                user=user
-            ).filter(
-                description__icontains=search_query
-            ).values_list('description', flat=True).distinct()
-        )
-        
-        # Combine and sort all unique names
-        all_names = sorted(vendor_names.union(mapped_vendor_names).union(transaction_descriptions))
-        
-        # Limit results to avoid overwhelming the UI
-        return Response(all_names[:20], status=status.HTTP_200_OK)
+        # Vendor names (system + user's own), mapped vendor names and the user's
+        # transaction descriptions, from the user's in-memory typeahead index
+        names = get_typeahead_index(request.user).search(search_query, VENDOR_SUGGESTIONS)
+        return Response(names, status=status.HTTP_200_OK)
 
 class TransactionCSVUploadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -1028,11 +1078,7 @@ class TransactionCSVUploadView(APIView):
 
     def get_expected_headers(self, currency_code):
         """Generate expected headers based on the account currency"""
-        return [
-            "Date", "Name / Description", "Account", "Counterparty",
-            "Code", "Debit/credit", f"Amount ({currency_code})", "Transaction type",
-            "Notifications"
-        ]
+        return get_expected_headers(currency_code)
 
     def post(self, request, *args, **kwargs):
         logger.info(f"CSV Upload initiated by user: {request.user.username} ({request.user.id})")
@@ -1046,303 +1092,116 @@ class TransactionCSVUploadView(APIView):
         if len(account_base_currency) != 3:
             return Response({'error': 'account_base_currency must be a 3-letter currency code'}, 
                           status=status.HTTP_400_BAD_REQUEST)
-        
-        # --- CSV Currency is now dynamic based on account ---
-        CSV_FILE_CURRENCY = account_base_currency
-        # Get dynamic expected headers based on currency
-        EXPECTED_HEADERS = self.get_expected_headers(account_base_currency)
-        # --- End Currency Setup ---
 
         if not file_obj: # ... (file validation as before) ...
             return Response({'error': 'No file provided.'}, status=status.HTTP_400_BAD_REQUEST)
         if not file_obj.name.lower().endswith('.csv'):
              return Response({'error': 'Invalid file type. Please upload a CSV file.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            decoded_file = file_obj.read().decode('utf-8')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.reader(io_string)
-            try:
-                headers = next(reader)
-            except StopIteration:
-                 return Response({'error': 'CSV file is empty or contains only headers.'}, status=status.HTTP_400_BAD_REQUEST)
-            # ... (header validation logic remains the same) ...
-            normalized_headers = [h.strip().lower() for h in headers]
-            normalized_expected = [h.strip().lower() for h in EXPECTED_HEADERS]
-            if normalized_headers != normalized_expected:
-                 error_detail = "CSV headers do not match expected format. Please ensure columns are: " + ", ".join(EXPECTED_HEADERS)
-                 return Response({'error': error_detail}, status=status.HTTP_400_BAD_REQUEST)
-
-            potential_transactions_data = []
-            errors = []
-            processed_rows = 0
-            min_date, max_date = None, None
-
-            logger.info(f"User {current_user.id}: Phase 1 - Parsing CSV (Assumed Currency: {CSV_FILE_CURRENCY})...")
-            for i, row in enumerate(reader, start=1):
-                processed_rows += 1
-                if len(row) != len(EXPECTED_HEADERS): # ... (skip row logic) ...
-                    errors.append(f"Row {i+1}: Incorrect number of columns ({len(row)}), expected {len(EXPECTED_HEADERS)}. Row skipped.")
-                    continue
-                try:
-                    raw_date_str, raw_description, raw_account, raw_counterparty, raw_code, raw_debit_credit_str, raw_amount_str, raw_type, raw_notify = [r.strip() for r in row]
-                    raw_debit_credit = raw_debit_credit_str.upper()
-                    
-                    transaction_date_obj = datetime.strptime(raw_date_str, '%Y%m%d').date()
-                    parsed_amount = Decimal(raw_amount_str.replace(',', '.'))
-                    if parsed_amount < 0: raise ValueError("Amount in CSV should be positive.")
-                    if raw_debit_credit not in ['DEBIT', 'CREDIT']: raise ValueError("Invalid direction.")
-                    direction = raw_debit_credit
-                    
-                    if min_date is None or transaction_date_obj < min_date: min_date = transaction_date_obj
-                    if max_date is None or transaction_date_obj > max_date: max_date = transaction_date_obj
-
-                    potential_transactions_data.append({
-                        'row_num': i + 1,
-                        'transaction_date': transaction_date_obj,
-                        'raw_description': raw_description,
-                        'original_amount': parsed_amount,
-                        'original_currency': CSV_FILE_CURRENCY, # Hardcoded EUR
-                        'direction': direction,
-                        'source_account_identifier': raw_account or None,
-                        'counterparty_identifier': raw_counterparty or None,
-                        'source_code': raw_code or None,
-                        'source_type': raw_type or None,
-                        'source_notifications': raw_notify or None,
-                    })
-                except ValueError as ve: errors.append(f"Row {i+1}: {str(ve)}")
-                except Exception as e:
-                    errors.append(f"Row {i+1}: Unexpected processing error.")
-                    logger.error(f"Row {i+1} CSV processing error: {e}", exc_info=True)
-
-            logger.info(f"User {current_user.id}: Phase 1 Complete - Processed {processed_rows} data rows from CSV.")
-
-            # --- Phase 2: Query Existing (Duplicate Check) ---
-            # ... (duplicate check logic remains the same, uses 'original_amount' and 'original_currency') ...
-            existing_keys_for_duplicate_check = set()
-            if potential_transactions_data:
-                logger.info(f"User {current_user.id}: Phase 2 - Querying database for potential duplicates...")
-                queryset = Transaction.objects.filter(user=current_user, source='csv')
-                if min_date and max_date: queryset = queryset.filter(transaction_date__range=(min_date, max_date))
-                existing_keys_for_duplicate_check = set(
-                    (tx.transaction_date, tx.original_amount, tx.direction, tx.description, tx.original_currency)
-                    for tx in queryset.only('transaction_date', 'original_amount', 'direction', 'description', 'original_currency')
-                )
-                logger.info(f"User {current_user.id}: Phase 2 Complete - Found {len(existing_keys_for_duplicate_check)} potentially relevant existing CSV transaction keys.")
-
-
-            # --- Phase 3: Filter, Convert, Build Final List ---
-            # ... (logic for description mapping, duplicate check using key, and currency conversion is largely the same) ...
-            # ... (The original_currency for conversion will now always be CSV_FILE_CURRENCY for items from this view) ...
-            logger.info(f"User {current_user.id}: Phase 3 - Filtering, converting, building transaction list...")
-            transactions_to_create = []
-            duplicate_count = 0
-            skipped_conversion_error_count = 0
-            applied_rules_count = 0
-            user_mappings = { m.original_description.strip().lower(): m for m in DescriptionMapping.objects.filter(user=current_user) }
-            
-            # Get vendor mappings for the user
-            from .models import VendorMapping
-            vendor_mappings = VendorMapping.objects.filter(user=current_user)
-            vendor_mapping_dict = {vm.original_name.lower(): vm.mapped_vendor for vm in vendor_mappings}
-
-            for data_item in potential_transactions_data:
-                raw_description = data_item['raw_description']
-                final_description = raw_description
-                assigned_category = None
-                matched_mapping = user_mappings.get(raw_description.strip().lower())
-                if matched_mapping:
-                    final_description = matched_mapping.clean_name
-                    assigned_category = matched_mapping.assigned_category
-                    if assigned_category: applied_rules_count += 1
-
-                duplicate_check_key = (
-                    data_item['transaction_date'], data_item['original_amount'],
-                    data_item['direction'], final_description, data_item['original_currency']
-                )
-                if duplicate_check_key in existing_keys_for_duplicate_check:
-                    duplicate_count += 1
-                    continue
-
-                aud_amount_val, exchange_rate_val = None, None
-                original_currency_code = data_item['original_currency']
-
-                # --- MODIFIED SECTION FOR CURRENCY CONVERSION ---
-                # ALWAYS attempt conversion, regardless of auto-categorization.
-                if original_currency_code == BASE_CURRENCY_FOR_CONVERSION:
-                    aud_amount_val = data_item['original_amount']
-                    exchange_rate_val = Decimal("1.0")
-                else:
-                    # It's okay to attempt conversion even for future dates here, 
-                    # get_historical_rate will handle date validation (e.g., max_days_gap)
-                    rate = get_historical_rate( 
-                        data_item['transaction_date'], 
-                        original_currency_code, 
-                        BASE_CURRENCY_FOR_CONVERSION
-                    )
-                    if rate is not None:
-                        aud_amount_val = (data_item['original_amount'] * rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                        exchange_rate_val = rate
-                    else:
-                        skipped_conversion_error_count += 1
-                        logger.warning(f"User {current_user.id} - Row {data_item['row_num']}: Rate fetch failed for {original_currency_code}->{BASE_CURRENCY_FOR_CONVERSION} on {data_item['transaction_date']}.")
-                # --- END OF MODIFIED SECTION ---
-
-                # --- NEW VENDOR MAPPING LOGIC ---
-                # Extract original vendor name from CSV data
-                counterparty = data_item.get('counterparty_identifier') or ''
-                original_vendor_name = counterparty.strip()
-                if not original_vendor_name:
-                    # Fallback to description if no counterparty
-                    original_vendor_name = final_description.split(' - ')[0].split(' | ')[0].strip()
-                if not original_vendor_name:
-                    original_vendor_name = 'Unknown Vendor'
-                
-                # Check for vendor mapping
-                mapped_vendor_name = vendor_mapping_dict.get(original_vendor_name.lower())
-                vendor_name = mapped_vendor_name if mapped_vendor_name else original_vendor_name
-                # --- END VENDOR MAPPING LOGIC ---
-
-                transactions_to_create.append(
-                    Transaction(
-                        user=current_user, category=assigned_category, description=final_description,
-                        transaction_date=data_item['transaction_date'],
-                        original_amount=data_item['original_amount'], original_currency=original_currency_code,
-                        direction=data_item['direction'], aud_amount=aud_amount_val, exchange_rate_to_aud=exchange_rate_val,
-                        account_base_currency=account_base_currency,
-                        source='csv', bank_transaction_id=None,
-                        source_account_identifier=data_item['source_account_identifier'],
-                        counterparty_identifier=data_item['counterparty_identifier'],
-                        source_code=data_item['source_code'], source_type=data_item['source_type'],
-                        source_notifications=data_item['source_notifications'],
-                        # New vendor name fields
-                        original_vendor_name=original_vendor_name,
-                        vendor_name=vendor_name,
-                        auto_categorized=False,  # Will be set to True by auto-categorization if a rule is applied
-                    )
-                )
-            # ... (Phase 4: Bulk Create and Phase 5: Prepare Response - logic remains the same) ...
-            logger.info(f"User {current_user.id}: Phase 3 Complete. Dups: {duplicate_count}. New: {len(transactions_to_create)}. Convert Errors: {skipped_conversion_error_count}.")
-            created_count = 0
-            auto_categorized_count = 0
-            if transactions_to_create:
-                try:
-                    with db_transaction.atomic():
-                        created_objects = Transaction.objects.bulk_create(transactions_to_create)
-                        created_count = len(created_objects)
-                    logger.info(f"User {current_user.id}: Phase 4 Complete - Created {created_count} transactions from CSV.")
-                    
-                    # Get the newly created transaction IDs for subsequent processing
-                    new_transaction_ids = [obj.id for obj in created_objects if obj.id] if created_count > 0 else []
-                    
-                    # Phase 4.5: Identify and assign vendors to newly created transactions
-                    vendor_identified_count = 0
-                    vendor_created_count = 0
-                    if created_count > 0:
-                        logger.info(f"User {current_user.id}: Phase 4.5 - Starting vendor identification for {created_count} new transactions...")
-                        try:
-                            from .vendor_identification_service import identify_vendors_for_user_transactions
-                            
-                            # Create queryset of newly created transactions for vendor identification
-                            new_transactions_qs = Transaction.objects.filter(
-                                id__in=new_transaction_ids,
-                                user=current_user
-                            )
-                            
-                            # Apply vendor identification to the new transactions
-                            vendor_result = identify_vendors_for_user_transactions(
-                                current_user,
-                                transactions=new_transactions_qs
-                            )
-                            vendor_identified_count = vendor_result.identified_count
-                            vendor_created_count = vendor_result.created_vendors_count
-                            
-                            logger.info(f"User {current_user.id}: Phase 4.5 Complete - Identified vendors for {vendor_identified_count} "
-                                       f"out of {created_count} new transactions. "
-                                       f"Created {vendor_created_count} new vendors. "
-                                       f"Skipped: {vendor_result.skipped_count}, "
-                                       f"Errors: {vendor_result.error_count}")
-                        except Exception as e:
-                            logger.error(f"User {current_user.id}: Vendor identification failed during CSV upload: {e}", exc_info=True)
-                            # Don't fail the upload if vendor identification fails
-                    
-                    # Phase 5: Apply auto-categorization to newly created transactions
-                    if created_count > 0:
-                        logger.info(f"User {current_user.id}: Phase 5 - Starting auto-categorization for {created_count} new transactions...")
-                        try:
-                            from .auto_categorization_service import auto_categorize_user_transactions
-                            
-                            if new_transaction_ids:
-                                # Create queryset of newly created transactions for auto-categorization
-                                new_transactions_qs = Transaction.objects.filter(
-                                    id__in=new_transaction_ids,
-                                    user=current_user
-                                )
-                                
-                                # Apply auto-categorization only to the new transactions
-                                categorization_result = auto_categorize_user_transactions(
-                                    current_user,
-                                    transactions=new_transactions_qs
-                                )
-                                auto_categorized_count = categorization_result.categorized_count
-                                
-                                logger.info(f"User {current_user.id}: Phase 5 Complete - Auto-categorized {auto_categorized_count} "
-                                           f"out of {created_count} new transactions. "
-                                           f"Skipped: {categorization_result.skipped_count}, "
-                                           f"Errors: {categorization_result.error_count}")
-                            else:
-                                logger.warning(f"User {current_user.id}: Phase 5 - No transaction IDs available for auto-categorization")
-                                
-                        except Exception as e:
-                            logger.error(f"User {current_user.id}: Auto-categorization failed during CSV upload: {e}", exc_info=True)
-                            # Don't fail the entire upload if auto-categorization fails
-                            
-                except Exception as e:
-                    errors.append(f"Database error: {str(e)}.")
-                    logger.error(f"User {current_user.id}: DB error CSV txns: {e}", exc_info=True)
-
-            error_count = len(errors)
-            message = f"CSV (Assumed {CSV_FILE_CURRENCY}) processed. Found {processed_rows} data rows."
-            if created_count > 0: message += f" Imported {created_count} new transactions."
-            else: message += " No new transactions were imported."
-            if duplicate_count > 0: message += f" Skipped {duplicate_count} potential duplicates."
-            if applied_rules_count > 0: message += f" Applied {applied_rules_count} description rules."
-            if vendor_identified_count > 0: message += f" Identified vendors for {vendor_identified_count} transactions."
-            if vendor_created_count > 0: message += f" Created {vendor_created_count} new vendors."
-            if auto_categorized_count > 0: message += f" Auto-categorized {auto_categorized_count} transactions using vendor rules."
-            if skipped_conversion_error_count > 0: message += f" Failed to convert currency for {skipped_conversion_error_count} transactions to {BASE_CURRENCY_FOR_CONVERSION}."
-            if error_count > 0: message += f" Encountered {error_count} errors."
-
-            response_status = status.HTTP_200_OK
-            if created_count > 0: response_status = status.HTTP_201_CREATED
-            elif error_count > 0 and not transactions_to_create and processed_rows > 0: response_status = status.HTTP_400_BAD_REQUEST
-
+        # Large files can be queued for the import worker; the client polls the job for progress
+        if str(request.data.get('background', '')).lower() in ('1', 'true', 'yes'):
+            job = enqueue_csv_import(current_user, file_obj, account_base_currency)
             return Response({
-                'message': message, 
-                'imported_count': created_count, 
-                'duplicate_count': duplicate_count,
-                'vendor_identified_count': vendor_identified_count,  # New: vendor identification count
-                'vendor_created_count': vendor_created_count,  # New: new vendors created count
-                'auto_categorized_count': auto_categorized_count,  # New: vendor rule auto-categorization count
-                'description_rules_applied_count': applied_rules_count,  # Renamed for clarity 
-                'conversion_error_count': skipped_conversion_error_count,
-                'total_rows_processed': processed_rows, 
-                'errors': errors
-            }, status=response_status)
+                'job_id': job.id,
+                'status': job.status,
+                'progress_url': reverse('import-job-detail', kwargs={'pk': job.id}),
+            }, status=status.HTTP_202_ACCEPTED)
 
+        try:
+            # The file is decoded, parsed and imported in chunks (see csv_import.py). Parsing
+            # stays in this process: web workers must not fork process pools
+            importer = CSVTransactionImporter(current_user, account_base_currency)
+            result = importer.import_file(file_obj)
+            return Response(result.to_dict(), status=result.response_status)
+
+        except CSVImportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except UnicodeDecodeError: # ... (exception handling as before) ...
             logger.error(f"User {current_user.id}: CSV Upload failed due to encoding error.")
             return Response({'error': 'Failed to decode file. Please ensure it is UTF-8 encoded.'}, status=status.HTTP_400_BAD_REQUEST)
         except csv.Error as e:
             logger.error(f"User {current_user.id}: CSV parsing error: {e}")
             return Response({'error': f'Error parsing CSV file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
-        except StopIteration:
-             logger.warning(f"User {current_user.id}: CSV file was empty after headers.")
-             return Response({'error': 'CSV file appears to be empty or contain only headers.'}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.exception(f"User {current_user.id}: Unexpected error during CSV upload processing: {str(e)}")
             return Response({'error': 'An unexpected server error occurred during CSV processing.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class TransactionCSVBatchUploadView(APIView):
+    """
+    Imports several CSV exports (e.g. a year of monthly statements) in one request.
+    Mappings and rates are loaded once, rows repeated across files are imported only
+    once, and the response reports the outcome of every file.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, *args, **kwargs):
+        current_user = request.user
+        files = request.FILES.getlist('files')
+        logger.info(f"CSV batch upload of {len(files)} files initiated by user: {current_user.username} ({current_user.id})")
+
+        account_base_currency = request.data.get('account_base_currency', 'EUR').upper()
+        if len(account_base_currency) != 3:
+            return Response({'error': 'account_base_currency must be a 3-letter currency code'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        if not files:
+            return Response({'error': 'No files provided.'}, status=status.HTTP_400_BAD_REQUEST)
+        invalid_names = [f.name for f in files if not f.name.lower().endswith('.csv')]
+        if invalid_names:
+            return Response({'error': f"Invalid file type for {', '.join(invalid_names)}. Please upload CSV files."},
+                          status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            importer = CSVTransactionImporter(current_user, account_base_currency)
+            outcomes = importer.import_files((f.name, f) for f in files)
+        except Exception as e:
+            logger.exception(f"User {current_user.id}: Unexpected error during CSV batch upload processing: {str(e)}")
+            return Response({'error': 'An unexpected server error occurred during CSV processing.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        file_results = []
+        imported_count = duplicate_count = failed_files = 0
+        for name, result, error in outcomes:
+            if result is None:
+                failed_files += 1
+                file_results.append({'file': name, 'error': error})
+                continue
+            imported_count += result.created_count
+            duplicate_count += result.duplicate_count
+            file_results.append({'file': name, **result.to_dict()})
+
+        message = f"Processed {len(files)} CSV files. Imported {imported_count} new transactions."
+        if duplicate_count > 0: message += f" Skipped {duplicate_count} potential duplicates."
+        if failed_files > 0: message += f" {failed_files} files could not be imported."
+
+        response_status = status.HTTP_200_OK
+        if imported_count > 0: response_status = status.HTTP_201_CREATED
+        elif failed_files == len(files): response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response({
+            'message': message,
+            'imported_count': imported_count,
+            'duplicate_count': duplicate_count,
+            'files': file_results,
+        }, status=response_status)
+
+
+class ImportJobListView(generics.ListAPIView):
+    """Lists the authenticated user's background import jobs, newest first."""
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(user=self.request.user)
+
+
+class ImportJobDetailView(generics.RetrieveAPIView):
+    """Reports the status and progress counts of one background import job."""
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(user=self.request.user)
+
 # --- NEW: Dashboard Balance API View ---
 class DashboardBalanceView(views.APIView):
     """
@@ -1539,6 +1398,8 @@ class BalanceOverTimeView(views.APIView):
 class CategorySpendingView(views.APIView):
     """
     API endpoint to return spending breakdown by category for pie charts.
+    ?level= is 'subcategory' (each transaction's own category, the default), 'category'
+    (rolled up to the top-level category) or a depth (0 = top level) to roll up to.
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -1549,7 +1410,16 @@ class CategorySpendingView(views.APIView):
         # Get date range parameters
         start_date = request.GET.get('start_date')
         end_date = request.GET.get('end_date')
-        category_level = request.GET.get('level', 'subcategory')  # 'category' or 'subcategory'
+        category_level = request.GET.get('level', 'subcategory')  # 'category', 'subcategory' or a depth
+        if category_level == 'subcategory':
+            rollup_depth = None
+        elif category_level == 'category':
+            rollup_depth = 0
+        elif category_level.isdigit():
+            rollup_depth = int(category_level)
+        else:
+            return Response({'error': "Invalid level. Use 'category', 'subcategory' or a depth (0 = top level)."},
+                          status=status.HTTP_400_BAD_REQUEST)
         
         logger.info(f"User {user.id}: Getting category spending breakdown")
         
@@ -1559,7 +1429,7 @@ class CategorySpendingView(views.APIView):
             category__isnull=False,
             is_hidden=False,
             direction='DEBIT'  # Only expenses
-        ).select_related('category', 'category__parent')
+        )
         
         if start_date:
             try:
@@ -1577,45 +1447,44 @@ class CategorySpendingView(views.APIView):
                 return Response({'error': 'Invalid end_date format. Use YYYY-MM-DD'}, 
                               status=status.HTTP_400_BAD_REQUEST)
         
-        # Aggregate spending by category
+        # Aggregate spending per category and account currency in one query. Up Bank
+        # amounts are already in AUD; other amounts are converted from the account currency.
+        groups = transactions.values('category_id', 'account_base_currency').annotate(
+            up_bank_total=Sum(Abs('aud_amount'), filter=Q(source='up_bank')),
+            account_total=Sum(Abs('original_amount'), filter=~Q(source='up_bank')),
+        )
+        rates = {}
+        amounts_by_category = defaultdict(Decimal)
+        for group in groups:
+            amount = group['up_bank_total'] or Decimal('0.00')
+            account_total = group['account_total'] or Decimal('0.00')
+            currency = group['account_base_currency']
+            if account_total and currency != target_currency:
+                if currency not in rates:
+                    rates[currency] = get_current_exchange_rate(currency, target_currency)
+                if rates[currency]:
+                    account_total = account_total * rates[currency]
+            amounts_by_category[group['category_id']] += amount + account_total
+
+        # Roll up to the requested level across any depth, using the materialized paths
+        category_amounts = rollup_to_depth(amounts_by_category, rollup_depth)
         category_totals = defaultdict(Decimal)
         category_details = {}
-        
-        for tx in transactions:
-            # Determine which category level to use
-            if category_level == 'category':
-                # Use parent category if it exists, otherwise the category itself
-                category = tx.category.parent if tx.category.parent else tx.category
-            else:
-                # Use the actual category (subcategory level)
-                category = tx.category
-            
-            category_name = category.name
-            
-            # Get transaction amount in target currency
-            if tx.source == 'up_bank':
-                amount = abs(tx.aud_amount or Decimal('0.00'))
-            else:
-                amount = abs(tx.original_amount or Decimal('0.00'))
-                # Convert to target currency if needed
-                if tx.account_base_currency != target_currency:
-                    rate = get_current_exchange_rate(tx.account_base_currency, target_currency)
-                    if rate:
-                        amount = amount * rate
-            
-            category_totals[category_name] += amount
+        for category in Category.objects.filter(pk__in=category_amounts).select_related('parent'):
+            category_totals[category.name] += category_amounts[category.id]
             
             # Store category details for frontend
-            category_details[category_name] = {
+            category_details[category.name] = {
                 'id': category.id,
                 'name': category.name,
                 'parent_name': category.parent.name if category.parent else None,
-                'level': 'parent' if not category.parent else 'child'
+                'level': 'parent' if not category.parent else 'child',
+                'depth': category.depth,
             }
         
         # Convert to list format for pie chart
         spending_data = []
-        total_spending = sum(category_totals.values())
+        total_spending = sum(category_totals.values(), Decimal('0.00'))
         
         for category_name, amount in sorted(category_totals.items(), key=lambda x: x[1], reverse=True):
             percentage = (amount / total_spending * 100) if total_spending > 0 else 0